@@ -0,0 +1,117 @@
+"""
+用户对宝宝的访问权限缓存
+
+BabyDate.can_be_edited_by, can_be_accessed_by 和 BabyRelation.can_be_approved_by
+都通过 get_acl 获取用户的 {baby_date_id: 关系状态} 映射,
+同一个请求中第一次使用时用一次查询加载, 缓存在 user 实例上。
+设置 BABYCARE_ACL_CACHE_TIMEOUT 后还会以版本号为键缓存在 Django cache 中跨请求复用,
+多进程部署时需要使用共享的 cache 后端, 否则撤销的权限在其他进程中要等缓存过期才生效。
+BabyRelation 增删改时由 babycare.signals 调用 invalidate_acl。
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+
+
+# user 实例上缓存 ACL 的属性名
+USER_ACL_ATTR = '_baby_acl'
+
+
+class BabyACL:
+    """某个用户与各个宝宝的关系状态"""
+
+    def __init__(self, statuses: dict[int, frozenset[int]]):
+        self.statuses = statuses
+
+    @classmethod
+    def load(cls, user_id: int) -> 'BabyACL':
+        from .models import BabyRelation
+        statuses: dict[int, set[int]] = dict()
+        relations = BabyRelation.objects.filter(
+            request_by=user_id).values_list('baby_date', 'status')
+        for baby_date_id, status in relations:
+            statuses.setdefault(baby_date_id, set()).add(status)
+        return cls({pk: frozenset(s) for pk, s in statuses.items()})
+
+    def has_status(self, baby_date_id: int, statuses) -> bool:
+        return not self.statuses.get(baby_date_id, frozenset()).isdisjoint(statuses)
+
+    def can_access(self, baby_date_id: int) -> bool:
+        from .models import BabyRelation
+        return self.has_status(baby_date_id, BabyRelation.accessible_status())
+
+    def can_edit(self, baby_date_id: int) -> bool:
+        from .models import BabyRelation
+        return self.has_status(baby_date_id, BabyRelation.editable_status())
+
+    def can_grant(self, baby_date_id: int) -> bool:
+        from .models import BabyRelation
+        return self.has_status(baby_date_id, BabyRelation.grantable_status())
+
+    def accessible_ids(self) -> list[int]:
+        from .models import BabyRelation
+        return [
+            pk for pk in self.statuses
+            if self.has_status(pk, BabyRelation.accessible_status())
+        ]
+
+    def grantable_ids(self) -> list[int]:
+        from .models import BabyRelation
+        return [
+            pk for pk in self.statuses
+            if self.has_status(pk, BabyRelation.grantable_status())
+        ]
+
+
+def _version_key(user_id: int) -> str:
+    return f'babycare:acl-version:{user_id}'
+
+
+def _acl_key(user_id: int, version: int) -> str:
+    return f'babycare:acl:{user_id}:{version}'
+
+
+def get_acl(user) -> BabyACL:
+    """
+    获取用户的 ACL, 同一个 user 实例只加载一次
+    :param user: request.user 或 User 实例
+    """
+    if user is None or not user.is_authenticated:
+        return BabyACL(dict())
+    acl = getattr(user, USER_ACL_ATTR, None)
+    if acl is not None:
+        return acl
+    timeout = getattr(settings, 'BABYCARE_ACL_CACHE_TIMEOUT', 0)
+    if timeout:
+        version = cache.get_or_set(_version_key(user.pk), 0, None)
+        key = _acl_key(user.pk, version)
+        acl = cache.get(key)
+        if acl is None:
+            acl = BabyACL.load(user.pk)
+            cache.set(key, acl, timeout)
+    else:
+        acl = BabyACL.load(user.pk)
+    setattr(user, USER_ACL_ATTR, acl)
+    return acl
+
+
+async def aget_acl(user) -> BabyACL:
+    """get_acl 的异步版本, 供异步视图使用"""
+    acl = getattr(user, USER_ACL_ATTR, None)
+    if acl is not None:
+        return acl
+    return await sync_to_async(get_acl)(user)
+
+
+def invalidate_acl(user_id: int, user=None) -> None:
+    """
+    用户的关系变化后使其 ACL 失效
+    :param user_id: 关系变化的用户 id
+    :param user: 已加载的 user 实例, 传入时同时清除该实例上本请求的缓存
+    """
+    if user is not None and getattr(user, USER_ACL_ATTR, None) is not None:
+        delattr(user, USER_ACL_ATTR)
+    if getattr(settings, 'BABYCARE_ACL_CACHE_TIMEOUT', 0):
+        key = _version_key(user_id)
+        cache.add(key, 0, None)
+        cache.incr(key)
@@ -21,3 +21,5 @@ class GrowthDataAdmin(admin.ModelAdmin):
 @admin.register(models.Feeding)
 class FeedingAdmin(admin.ModelAdmin):
     fields = ('baby_date', 'feed_at', 'amount', 'note')
+admin.site.register(models.DailyBabySummary)
+admin.site.register(models.FeedingStats)
@@ -0,0 +1,130 @@
+"""
+在数据库中按时间桶汇总宝宝的记录
+
+趋势图和热力图只需要每小时、每天、每周或每月的汇总值, 一条 GROUP BY 查询代替逐条取回记录。
+日、周、月的桶和日期范围都基于记录的 local_date, 与 DailyBabySummary 的本地日期一致, 周从周一开始;
+小时桶在数据库中按 UTC 截断时间字段, 不需要 MySQL 加载时区表 (没有时区表时 CONVERT_TZ 返回 NULL),
+取回后再转换为 settings.TIME_ZONE 的本地时间; 只适用于与 UTC 相差整小时的时区, 例如 Asia/Shanghai。
+结果为列式 JSON: {"t": [桶, ...], "count": [...], "sum": [...]}, 没有记录的桶不出现。
+"""
+import datetime
+from typing import Any
+from zoneinfo import ZoneInfo
+
+from django.conf import settings
+from django.db.models import Avg, Count, F, IntegerField, Max, Min, Sum
+from django.db.models.functions import Cast, TruncHour, TruncMonth, TruncWeek
+from django.utils import timezone
+
+from . import models
+
+
+# {模型名: (模型, 时间字段, {可汇总的字段: 表达式})}
+SERIES_MODELS = {
+    'feeding': (models.Feeding, 'feed_at', {'amount': 'amount'}),
+    'breastbumping': (models.BreastBumping, 'date', {'amount': 'amount'}),
+    'bodytemperature': (models.BodyTemperature, 'measure_at', {'temperature': 'temperature'}),
+    'diaper': (models.Diaper, 'create_at', {
+        # 0 无 到 3 大量
+        'pee_amount': Cast('pee_amount', IntegerField()),
+        'pooh_amount': Cast('pooh_amount', IntegerField()),
+    }),
+    'miscrecord': (models.MiscRecord, 'record_at', {}),
+}
+
+AGGREGATES = {
+    'count': Count,
+    'sum': Sum,
+    'min': Min,
+    'max': Max,
+    'avg': Avg,
+}
+
+# {时间桶: (截断函数, 每个桶的大约天数, 未指定 start 时默认的天数)}, 日桶直接使用 local_date
+BUCKETS = {
+    'hour': (TruncHour, 1 / 24, 7),
+    'day': (None, 1, 90),
+    'week': (TruncWeek, 7, 365),
+    'month': (TruncMonth, 28, 3 * 365),
+}
+
+# 一次最多返回的桶数
+MAX_BUCKETS = 5000
+
+
+def aggregate_series(
+        baby_date_id: int,
+        model_name: str,
+        bucket: str = 'day',
+        aggregates: list[str] | None = None,
+        field: str | None = None,
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+    ) -> dict[str, Any]:
+    """
+    按时间桶汇总一个宝宝的某种记录, 只有一次查询
+    :param model_name: SERIES_MODELS 中的模型名
+    :param bucket: hour, day, week 或 month
+    :param aggregates: AGGREGATES 中的汇总函数名, 默认只计数
+    :param field: 汇总的字段, 模型只有一个可汇总字段时可以省略, 只计数时不需要
+    :param start: 起始本地日期(包含), 默认为 end 之前 BUCKETS 中的默认天数
+    :param end: 结束本地日期(包含), 默认为今天
+    :return: 列式结果, t 为桶的本地时间, 小时桶为 ISO 时间, 其他为 ISO 日期
+    :raises ValueError: 参数无效
+    """
+    if model_name not in SERIES_MODELS:
+        raise ValueError(f'不支持的记录类型 {model_name}')
+    if bucket not in BUCKETS:
+        raise ValueError(f'不支持的时间桶 {bucket}')
+    aggregates = aggregates or ['count']
+    for name in aggregates:
+        if name not in AGGREGATES:
+            raise ValueError(f'不支持的汇总函数 {name}')
+    model, time_field, fields = SERIES_MODELS[model_name]
+    if field is None and len(fields) == 1:
+        field = next(iter(fields))
+    if aggregates != ['count'] and field not in fields:
+        raise ValueError(f'{model_name} 可以汇总的字段为 {", ".join(fields) or "无"}')
+
+    trunc, bucket_days, default_days = BUCKETS[bucket]
+    end = end or timezone.localdate()
+    start = start or end - datetime.timedelta(days=default_days - 1)
+    if start > end:
+        raise ValueError('start 不能晚于 end')
+    if ((end - start).days + 1) / bucket_days > MAX_BUCKETS:
+        raise ValueError(f'时间范围过大, 最多 {MAX_BUCKETS} 个桶')
+
+    tz = ZoneInfo(settings.TIME_ZONE)
+    if trunc is TruncHour:
+        truncated = trunc(time_field, tzinfo=datetime.timezone.utc)
+    elif trunc is None:
+        truncated = F('local_date')
+    else:
+        truncated = trunc('local_date')
+    rows = model.objects.filter(
+        baby_date=baby_date_id,
+        local_date__range=(start, end),
+    ).annotate(t=truncated).values('t').annotate(**{
+        name: AGGREGATES[name]('pk' if name == 'count' else fields[field])
+        for name in aggregates
+    }).order_by('t')
+
+    result: dict[str, Any] = {
+        'model': model_name,
+        'bucket': bucket,
+        'field': field,
+        'timezone': settings.TIME_ZONE,
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        't': [],
+        **{name: [] for name in aggregates},
+    }
+    for row in rows:
+        t = row['t']
+        if t is None:
+            # 截断失败的记录不能归入任何桶
+            continue
+        result['t'].append(t.astimezone(tz).isoformat() if isinstance(t, datetime.datetime) else t.isoformat())
+        for name in aggregates:
+            result[name].append(row[name])
+    return result
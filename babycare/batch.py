@@ -0,0 +1,184 @@
+"""
+一次提交多条不同类型、不同宝宝的记录
+
+每条记录用与单条提交相同的 ModelForm 校验, 权限来自请求的 ACL (一次查询),
+baby_date 和 misc_item 从预先加载的对象中取值, 校验时不再逐条查询外键。
+校验通过的记录按模型在各自的事务中 bulk_create, 返回每一条的结果;
+写入后发送 records_bulk_changed 信号更新每日汇总等派生数据。
+"""
+from typing import Any
+
+from django import forms
+from django.core.exceptions import ValidationError
+from django.db import DatabaseError, transaction
+
+from . import models
+from .acl import BabyACL
+from .loaders import load_misc_items
+from .modelforms import BodyTemperatureForm, DiaperForm, FeedingForm, GrowthDataForm, MiscRecordForm
+from .signals import records_bulk_changed
+
+
+# 单次提交的最多条数
+MAX_BATCH_SIZE = 500
+
+# 从预先加载的对象中取值的外键字段, 跳过模型校验中的外键存在性查询
+PRELOADED_FIELDS = ('baby_date', 'misc_item')
+
+
+class PreloadedChoiceField(forms.ModelChoiceField):
+    """从 {pk: 对象} 中取值的 ModelChoiceField, 校验时不查询数据库"""
+
+    def __init__(self, objects: dict, model, **kwargs):
+        super().__init__(queryset=model.objects.none(), **kwargs)
+        self.objects = objects
+
+    def to_python(self, value):
+        if value in self.empty_values:
+            return None
+        try:
+            return self.objects[int(value)]
+        except (KeyError, TypeError, ValueError):
+            raise ValidationError(
+                self.error_messages['invalid_choice'],
+                code='invalid_choice',
+                params={'value': value},
+            )
+
+
+def _batch_form(form_class):
+    class BatchForm(form_class):
+        def __init__(self, *args, preloaded: dict[str, forms.Field], **kwargs):
+            """
+            :param preloaded: {字段名: PreloadedChoiceField} 替换表单中的外键字段
+            """
+            super().__init__(*args, **kwargs)
+            for name, field in preloaded.items():
+                if name in self.fields:
+                    self.fields[name] = field
+                    # 原表单的 __init__ 可能已经访问过该字段, 丢弃缓存的 BoundField
+                    self._bound_fields_cache.pop(name, None)
+
+        def _get_validation_exclusions(self):
+            exclude = super()._get_validation_exclusions()
+            exclude.update(PRELOADED_FIELDS)
+            return exclude
+
+    BatchForm.__name__ = f'Batch{form_class.__name__}'
+    return BatchForm
+
+
+# {记录类型: (表单, 时间字段)}
+BATCH_FORMS = {
+    'feeding': (_batch_form(FeedingForm), 'feed_at'),
+    'bodytemperature': (_batch_form(BodyTemperatureForm), 'measure_at'),
+    'growthdata': (_batch_form(GrowthDataForm), 'record_at'),
+    'diaper': (_batch_form(DiaperForm), 'create_at'),
+    'miscrecord': (_batch_form(MiscRecordForm), 'record_at'),
+}
+
+_TIME_FIELD = forms.DateTimeField()
+
+
+def _parse_baby_date_id(value) -> int | None:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def submit_batch(acl: BabyACL, items: list) -> list[dict[str, Any]]:
+    """
+    校验并保存一批记录
+    :param acl: 提交用户的权限, 如 request.baby_acl
+    :param items: [{'type': 'feeding', 'fields': {...}, 'client_id': 可选}, ...]
+        fields 与对应单条提交表单的字段相同, 可以额外包含记录时间(如 feed_at), 默认为当前时间
+    :return: 与 items 一一对应的结果
+        {'index': 序号, 'client_id': ..., 'status': 'created' | 'invalid' | 'forbidden' | 'error',
+         'id': 新记录的 id (数据库不返回时为 None), 'errors': {字段: [错误, ...]}}
+    """
+    results: list[dict[str, Any]] = []
+    fields_list: list[dict | None] = []
+    baby_date_ids: set[int] = set()
+    for index, item in enumerate(items):
+        result: dict[str, Any] = {'index': index}
+        results.append(result)
+        fields = None
+        if isinstance(item, dict):
+            result['client_id'] = item.get('client_id')
+            if isinstance(item.get('fields'), dict):
+                fields = item['fields']
+        fields_list.append(fields)
+        if fields is None:
+            result.update(status='invalid', errors={'__all__': ["记录应为包含 type 和 fields 的对象"]})
+            continue
+        if item.get('type') not in BATCH_FORMS:
+            result.update(status='invalid', errors={'type': [f"不支持的记录类型: {item.get('type')}"]})
+            continue
+        baby_date_id = _parse_baby_date_id(fields.get('baby_date'))
+        if baby_date_id is None:
+            result.update(status='invalid', errors={'baby_date': ["缺少或无效的 baby_date"]})
+        elif not acl.can_edit(baby_date_id):
+            result.update(status='forbidden')
+        else:
+            baby_date_ids.add(baby_date_id)
+
+    babies = {pk: models.BabyDate(pk=pk) for pk in baby_date_ids}
+    misc_items = dict()
+    if any(isinstance(item, dict) and item.get('type') == 'miscrecord' for item in items):
+        misc_items = load_misc_items(list(baby_date_ids))
+
+    pending: dict[str, list[tuple[dict, Any]]] = {name: [] for name in BATCH_FORMS}
+    for item, fields, result in zip(items, fields_list, results):
+        if 'status' in result:
+            continue
+        form_class, time_field = BATCH_FORMS[item['type']]
+        baby_date_id = _parse_baby_date_id(fields['baby_date'])
+        form = form_class(fields, preloaded={
+            'baby_date': PreloadedChoiceField(babies, models.BabyDate),
+            'misc_item': PreloadedChoiceField(
+                {misc_item.pk: misc_item for misc_item in misc_items.get(baby_date_id, [])},  # type: ignore[arg-type]
+                models.MiscItem,
+            ),
+        })
+        if not form.is_valid():
+            result.update(status='invalid', errors=form.errors.get_json_data())
+            continue
+        record = form.save(commit=False)
+        if fields.get(time_field):
+            try:
+                setattr(record, time_field, _TIME_FIELD.clean(fields[time_field]))
+            except ValidationError as e:
+                result.update(status='invalid', errors={time_field: e.messages})
+                continue
+        pending[item['type']].append((result, record))
+
+    # {baby_date_id: [最早本地日期, 最晚本地日期, 有新记录的模型]}
+    changed: dict[int, list] = dict()
+    for record_type, entries in pending.items():
+        if not entries:
+            continue
+        model = BATCH_FORMS[record_type][0]._meta.model
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([record for _, record in entries])
+        except DatabaseError as e:
+            for result, _ in entries:
+                result.update(status='error', errors={'__all__': [str(e)]})
+            continue
+        for result, record in entries:
+            result.update(status='created', id=record.pk)
+            date = record.local_date
+            span = changed.setdefault(record.baby_date_id, [date, date, set()])
+            span[0], span[1] = min(span[0], date), max(span[1], date)
+            span[2].add(model)
+
+    for baby_date_id, (start, end, changed_models) in changed.items():
+        records_bulk_changed.send(
+            sender=submit_batch,
+            baby_date_id=baby_date_id,
+            models=frozenset(changed_models),
+            start=start,
+            end=end,
+        )
+    return results
@@ -0,0 +1,228 @@
+"""
+热点视图的性能基准
+
+用 SyntheticDataGenerator 生成不同规模的数据, 测量各视图的耗时、查询次数和内存峰值。
+测试用的账号与所有宝宝都有监护人关系, dashboard 等页面会显示全部宝宝,
+因此查询次数随宝宝数增长即说明出现了 N+1 查询。
+QUERY_BUDGETS 是各视图允许的最多查询次数, 由 babycare.tests 和 benchmark_views 命令检查。
+ASYNC_CASES 中的视图另外通过 AsyncClient (ASGIHandler) 调用其异步版本, 名称加上 ASGI_SUFFIX,
+与同一份数据上经 WSGI 调用的同步版本比较。
+"""
+from dataclasses import dataclass
+from typing import Any, Callable
+
+from django.contrib.auth import get_user_model
+from django.db.models import Count
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, Client
+from django.urls import reverse
+
+from relation.models import Member, Relation
+from relation.utils import calc_blood_relation, get_ancestors
+from shopping_list.models import ShoppingList
+from utils.benchmark import Measurement, measure
+
+from . import models
+from .synthetic import SyntheticDataGenerator
+
+
+# 数据规模: SyntheticDataGenerator 的参数, 宝宝出生日期在 years 年内随机分布
+SIZES = {
+    '1-baby': {'users': 4, 'babies': 1, 'years': 0.2},  # 约 1 千条记录
+    '10-babies': {'users': 40, 'babies': 10, 'years': 1.5},  # 约 5 万条记录
+    '50-babies': {'users': 200, 'babies': 50, 'years': 6},  # 约 100 万条记录
+}
+
+PEDIGREE_DEPTH = 4  # calc_blood_relation 使用的家谱代数
+
+QUERY_BUDGETS: dict[str, int | Callable[['BenchmarkContext'], int]] = {
+    'dashboard.index': 15,
+    'babycare.index': 8,
+    'babycare.feeding_list': 5,
+    'babycare.body_temperatures_list': 4,
+    'babycare.growth_datas_list': 4,
+    'babycare.diapers_list': 4,
+    'babycare.misc_records_list': 4,
+    'babycare.fetch_fenton_data': 5,
+    'shopping_list.shopping_list_edit': 5,
+    # 每个祖先查询一次其父母
+    'relation.calc_blood_relation': lambda ctx: ctx.pedigree_size,
+}
+
+
+# {同步视图的名称: 异步版本的 URL 名}
+ASYNC_CASES = {
+    'dashboard.index': 'dashboard:async_index',
+    'babycare.index': 'babycare:async_index',
+}
+ASGI_SUFFIX = '[asgi]'
+
+
+@dataclass
+class BenchmarkContext:
+    user: Any
+    baby: models.BabyDate  # 记录最多的宝宝
+    shopping_list: ShoppingList  # 条目最多的清单
+    cousins: tuple[Member, Member]
+    pedigree_size: int  # 两人的祖先(含本人)总数
+    rows: int  # 生成的记录总数
+
+
+def build_pedigree(prefix: str, depth: int = PEDIGREE_DEPTH) -> tuple[Member, Member, int]:
+    """
+    建立一对堂兄弟的家谱: 两人的父亲是亲兄弟, 每个祖先都有父母, 共 depth 代
+    :return: (堂兄弟1, 堂兄弟2, 两人的祖先(含本人)总数)
+    """
+    User = get_user_model()
+    count = 0
+
+    def new_member(gender: str) -> Member:
+        nonlocal count
+        count += 1
+        user = User.objects.create(username=f'{prefix}m{count}')
+        return Member.objects.create(user=user, gender=gender)
+
+    def add_parents(child: Member, generations: int) -> None:
+        if generations <= 0:
+            return
+        for gender in 'MF':
+            parent = new_member(gender)
+            Relation.objects.create(member1=parent, member2=child, relation_type='P')
+            add_parents(parent, generations - 1)
+
+    grandfather, grandmother = new_member('M'), new_member('F')
+    add_parents(grandfather, depth - 3)
+    add_parents(grandmother, depth - 3)
+    cousins = []
+    for _ in range(2):
+        father, mother = new_member('M'), new_member('F')
+        for grandparent in (grandfather, grandmother):
+            Relation.objects.create(member1=grandparent, member2=father, relation_type='P')
+        add_parents(mother, depth - 2)
+        child = new_member('M')
+        for parent in (father, mother):
+            Relation.objects.create(member1=parent, member2=child, relation_type='P')
+        cousins.append(child)
+    size = len(get_ancestors(cousins[0])) + len(get_ancestors(cousins[1]))
+    return cousins[0], cousins[1], size
+
+
+def prepare(
+        size: str,
+        seed: int = 0,
+        log: Callable[[str], None] | None = None,
+        **params,
+    ) -> BenchmarkContext:
+    """
+    在当前数据库中生成某个规模的数据
+    :param size: SIZES 中的键
+    :param params: 覆盖 SIZES 中的生成参数, 如测试中用较小的 years
+    """
+    prefix = f'bench-{size}-'
+    generator = SyntheticDataGenerator(
+        seed=seed, prefix=prefix, log=log, **{**SIZES[size], **params})
+    counts = generator.generate()
+    babies = models.BabyDate.objects.filter(nickname__startswith=generator.prefix)
+
+    user = get_user_model().objects.create(username=f'{generator.prefix}viewer')
+    models.BabyRelation.objects.bulk_create([
+        models.BabyRelation(baby_date=baby, request_by=user, status=2) for baby in babies
+    ])
+    baby = babies.order_by('birthday').first()
+    shopping_list = ShoppingList.objects.filter(
+        name__startswith=generator.prefix,
+    ).annotate(n=Count('categories__items')).order_by('-n').first()
+    cousin1, cousin2, pedigree_size = build_pedigree(generator.prefix)
+    return BenchmarkContext(
+        user=user,
+        baby=baby,  # type: ignore[arg-type]
+        shopping_list=shopping_list,  # type: ignore[arg-type]
+        cousins=(cousin1, cousin2),
+        pedigree_size=pedigree_size,
+        rows=sum(counts.values()),
+    )
+
+
+def get_cases(
+        ctx: BenchmarkContext,
+        client: Client,
+        async_client: AsyncClient | None = None,
+    ) -> dict[str, Callable[[], Any]]:
+    """
+    {视图名: 调用一次视图的函数}
+    :param async_client: 传入时包含 ASYNC_CASES 中异步视图的用例
+    """
+    baby_id = ctx.baby.pk
+
+    def get(url: str, **params) -> Callable[[], Any]:
+        def request():
+            response = client.get(url, params)
+            assert response.status_code == 200, (url, response.status_code)
+            # 流式响应要读完才会执行全部查询
+            return b''.join(response) if response.streaming else response.content
+        return request
+
+    def aget(url: str) -> Callable[[], Any]:
+        def request():
+            response = async_to_sync(async_client.get)(url)  # type: ignore[union-attr]
+            assert response.status_code == 200, (url, response.status_code)
+            return response.content
+        return request
+
+    cases = {
+        'dashboard.index': get(reverse('dashboard:index')),
+        'babycare.index': get(reverse('babycare:index')),
+        'babycare.feeding_list': get(reverse('babycare:feedings_list', args=[baby_id])),
+        'babycare.body_temperatures_list': get(reverse('babycare:body_temperatures_list', args=[baby_id])),
+        'babycare.growth_datas_list': get(reverse('babycare:growth_datas_list', args=[baby_id])),
+        'babycare.diapers_list': get(reverse('babycare:diapers_list', args=[baby_id])),
+        'babycare.misc_records_list': get(reverse('babycare:misc_records_list', args=[baby_id])),
+        'babycare.fetch_fenton_data': get(reverse('babycare:fetch_fenton_data', args=['weight', baby_id])),
+        'shopping_list.shopping_list_edit': get(
+            reverse('shopping_list_edit', args=[ctx.shopping_list.pk])),
+        'relation.calc_blood_relation': lambda: calc_blood_relation(*ctx.cousins),
+    }
+    if async_client is not None:
+        for name, url_name in ASYNC_CASES.items():
+            cases[name + ASGI_SUFFIX] = aget(reverse(url_name))
+    return cases
+
+
+def get_budget(name: str, ctx: BenchmarkContext) -> int | None:
+    """异步版本使用同步视图的预算"""
+    budget = QUERY_BUDGETS.get(name.removesuffix(ASGI_SUFFIX))
+    return budget(ctx) if callable(budget) else budget
+
+
+def run(size: str, ctx: BenchmarkContext, repeat: int = 3) -> list[Measurement]:
+    client = Client()
+    client.force_login(ctx.user)
+    async_client = AsyncClient()
+    async_client.force_login(ctx.user)
+    results = []
+    for name, func in get_cases(ctx, client, async_client).items():
+        result = measure(name, size, func, repeat=repeat, budget=get_budget(name, ctx))
+        result.extra['rows'] = ctx.rows
+        results.append(result)
+    return results
+
+
+def compare_async(results: list[Measurement]) -> list[dict[str, Any]]:
+    """
+    同一数据规模下同步(WSGI)与异步(ASGI)版本的耗时比较
+    :return: [{'name', 'size', 'wsgi_ms', 'asgi_ms', 'ratio'}, ...] ratio 为异步耗时 / 同步耗时
+    """
+    by_key = {(r.name, r.size): r for r in results}
+    comparison = []
+    for r in results:
+        sync = by_key.get((r.name.removesuffix(ASGI_SUFFIX), r.size))
+        if not r.name.endswith(ASGI_SUFFIX) or sync is None:
+            continue
+        comparison.append({
+            'name': sync.name,
+            'size': r.size,
+            'wsgi_ms': sync.wall_ms,
+            'asgi_ms': r.wall_ms,
+            'ratio': round(r.wall_ms / sync.wall_ms, 3) if sync.wall_ms else None,
+        })
+    return comparison
@@ -0,0 +1,170 @@
+"""
+服务端渲染的 Fenton 生长曲线 SVG
+
+与 babycare_curve.js 画出相同的百分位曲线、生长数据折线和数据点, 浏览器不需要再请求参考数据和运行 d3,
+页面以 <img> 引用, 渲染失败时 babycare_curve.js 仍在客户端绘制。
+渲染结果以 (宝宝, 指标, 生长数据版本, 主题) 为键缓存, 生长数据版本由 views.growth_chart_version 计算,
+记录或宝宝的性别、末次月经变化后版本改变, 旧的图不再被使用。
+BABYCARE_CHART_CACHE_TIMEOUT 为 0 时不缓存。
+"""
+import datetime
+import math
+
+from django.conf import settings
+from django.core.cache import cache
+from django.template.loader import render_to_string
+
+from utils.datetime import get_local_date
+from utils.downsample import lttb
+
+from . import fenton, models
+
+
+WIDTH = 640
+HEIGHT = 300
+MARGIN_TOP = 30
+MARGIN_RIGHT = 30
+MARGIN_BOTTOM = 30
+MARGIN_LEFT = 40
+# 数据点多于此数时用 LTTB 降采样, 约每 3 像素一个点
+MAX_POINTS = WIDTH // 3
+
+# 与 babycare_curve.js 的 pctMapping 一致, 颜色为 CSS 类名
+PERCENTILE_STYLES = {
+    3: ('danger', '7,5,2,5'),
+    10: ('warning', '7,3'),
+    50: ('success', '5,5'),
+    90: ('warning', '7,3'),
+    97: ('danger', '7,5,2,5'),
+}
+
+UNITS = {'weight': 'kg', 'height': 'cm', 'head_circumference': 'cm'}
+
+# auto 跟随系统的 prefers-color-scheme
+THEMES = ('light', 'dark', 'auto')
+
+
+def get_cache_key(baby_date_id: int, metric: str, version: str, theme: str) -> str:
+    return f'babycare:growth-chart:{baby_date_id}:{metric}:{version}:{theme}'
+
+
+def get_growth_chart(baby_date: models.BabyDate, metric: str, version: str, theme: str) -> str:
+    """
+    获取生长曲线 SVG, 优先使用缓存
+    :param metric: 'weight', 'height' 或 'head_circumference'
+    :param version: 生长数据版本, 包含记录和宝宝信息的变化
+    :param theme: THEMES 之一
+    """
+    timeout = getattr(settings, 'BABYCARE_CHART_CACHE_TIMEOUT', 0)
+    key = get_cache_key(baby_date.pk, metric, version, theme)
+    svg = cache.get(key) if timeout else None
+    if svg is None:
+        values = list(models.GrowthData.objects.filter(
+            baby_date=baby_date.pk, **{f'{metric}__isnull': False},
+        ).order_by('record_at').values_list('record_at', metric))
+        indexes = lttb(
+            [record_at.timestamp() for record_at, _ in values],
+            [value for _, value in values],
+            MAX_POINTS,
+        )
+        svg = render_growth_chart(baby_date, metric, [values[i] for i in indexes], theme)
+        if timeout:
+            cache.set(key, svg, timeout)
+    return svg
+
+
+def render_growth_chart(
+        baby_date: models.BabyDate,
+        metric: str,
+        values: list[tuple[datetime.datetime, float]],
+        theme: str,
+    ) -> str:
+    """
+    渲染生长曲线 SVG, 不查询数据库
+    :param values: 按时间正序的 (测量时间, 测量值), 最后一个点(最新)会被突出显示
+    """
+    context = {'width': WIDTH, 'height': HEIGHT, 'theme': theme}
+    if baby_date.gender not in fenton.SEX_PREFIXES:
+        context['message'] = '填入宝宝性别后才能查看曲线'
+    elif not values:
+        context['message'] = '尚未记录宝宝相关数据'
+    else:
+        context.update(_get_chart_context(baby_date, metric, values))
+    return render_to_string('babycare/charts/growth_chart.svg', context)
+
+
+def _get_chart_context(baby_date: models.BabyDate, metric: str, values: list) -> dict:
+    lmp = baby_date.last_menstrual_period
+    points = [
+        (fenton.get_pma_weeks(lmp, record_at), value, record_at)
+        for record_at, value in values
+    ]
+    weeks = [week for week, _, _ in points]
+    min_week = math.floor(max(min(weeks) - 1, 22))
+    max_week = math.ceil(min(max(weeks) + 1, 50))
+
+    table = fenton.get_table(baby_date.gender, metric)
+    columns = [
+        (percentile, j) for j, percentile in enumerate(table.percentiles)
+        if percentile in PERCENTILE_STYLES
+    ]
+    rows = [
+        (week, row) for week, row in zip(table.weeks, table.values)
+        if min_week <= week <= max_week
+    ]
+    data_values = [value for _, value, _ in points]
+    min_value = math.floor(min(data_values + [row[j] for _, row in rows for _, j in columns]))
+    max_value = math.ceil(max(data_values + [row[j] for _, row in rows for _, j in columns]))
+    if max_week == min_week:
+        max_week += 1
+    if max_value == min_value:
+        max_value += 1
+
+    def x(week: float) -> float:
+        return round(MARGIN_LEFT + (week - min_week) / (max_week - min_week) * (WIDTH - MARGIN_LEFT - MARGIN_RIGHT), 1)
+
+    def y(value: float) -> float:
+        return round(HEIGHT - MARGIN_BOTTOM - (value - min_value) / (max_value - min_value) * (HEIGHT - MARGIN_TOP - MARGIN_BOTTOM), 1)
+
+    unit = UNITS[metric]
+    return {
+        'curves': [
+            {
+                'color': PERCENTILE_STYLES[percentile][0],
+                'dash_array': PERCENTILE_STYLES[percentile][1],
+                'points': ' '.join(f'{x(week)},{y(row[j])}' for week, row in rows),
+            }
+            for percentile, j in columns
+        ],
+        'line': ' '.join(f'{x(week)},{y(value)}' for week, value, _ in points),
+        'points': [
+            {
+                'x': x(week),
+                'y': y(value),
+                'title': f"{get_local_date(record_at):%y/%m/%d} {value} {unit}",
+            }
+            for week, value, record_at in points
+        ],
+        'x_ticks': [(x(tick), _format_tick(tick)) for tick in get_ticks(min_week, max_week, WIDTH // 64)],
+        'y_ticks': [(y(tick), _format_tick(tick)) for tick in get_ticks(min_value, max_value, 10)],
+        'x_axis_y': HEIGHT - MARGIN_BOTTOM,
+        'y_axis_x': MARGIN_LEFT,
+        'x_range': (MARGIN_LEFT, WIDTH - MARGIN_RIGHT),
+        'y_range': (MARGIN_TOP, HEIGHT - MARGIN_BOTTOM),
+    }
+
+
+def get_ticks(start: float, stop: float, count: int) -> list[float]:
+    """与 d3.ticks 相同, 取 1, 2, 5 乘以 10 的幂为间隔的刻度"""
+    step = (stop - start) / max(count, 1)
+    power = math.floor(math.log10(step))
+    error = step / 10 ** power
+    factor = 10 if error >= math.sqrt(50) else 5 if error >= math.sqrt(10) else 2 if error >= math.sqrt(2) else 1
+    step = factor * 10 ** power
+    first = math.ceil(start / step)
+    last = math.floor(stop / step)
+    return [round(i * step, 10) for i in range(first, last + 1)]
+
+
+def _format_tick(tick: float) -> str:
+    return f'{tick:g}'
@@ -0,0 +1,138 @@
+"""
+流式导出某个宝宝的全部记录
+
+各模型依次用 .values_list().iterator(chunk_size) 分块读取, 逐行生成 NDJSON 或 CSV,
+攒够约 64KB 再交给 StreamingHttpResponse 或写入文件, 可选 gzip 压缩,
+内存占用与记录条数无关。
+导出的格式与 babycare.importers 兼容: NDJSON 每行一个 fixture 对象,
+CSV 的时间列统一为 time, 用品记录的 misc_item 为用品名称。
+"""
+import csv
+import datetime
+import io
+import json
+import zlib
+from typing import Iterable, Iterator
+
+from django.utils import timezone
+
+from .importers import IMPORT_MODELS
+from utils.datetime import get_range_of_date
+
+
+FORMATS = ('ndjson', 'csv')
+
+CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+# CSV 的列, 包含所有模型的字段, 某个模型没有的列留空
+CSV_COLUMNS = ['model', 'pk', 'baby_date', 'time', 'misc_item', *dict.fromkeys(
+    name for _, _, fields in IMPORT_MODELS.values() for name in fields)]
+
+CHUNK_SIZE = 2000  # 每次从数据库读取的行数
+BUFFER_SIZE = 64 * 1024  # 每次输出的字符数
+
+
+def _format_value(value):
+    if isinstance(value, datetime.datetime):
+        return timezone.localtime(value).isoformat()
+    return value
+
+
+def iter_records(
+        baby_date_id: int,
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+    ) -> Iterator[tuple[str, int, dict]]:
+    """
+    按模型依次生成宝宝的记录, 每个模型内按时间排序
+    :param start: 起始本地日期(包含), 默认不限
+    :param end: 结束本地日期(包含), 默认不限
+    :return: (模型名, 主键, {字段: 值}) 时间字段使用模型中的字段名
+    """
+    for model_name, (model, time_field, fields) in IMPORT_MODELS.items():
+        queryset = model.objects.filter(baby_date=baby_date_id)
+        if start is not None:
+            queryset = queryset.filter(**{f'{time_field}__gte': get_range_of_date(start)[0]})
+        if end is not None:
+            queryset = queryset.filter(**{f'{time_field}__lte': get_range_of_date(end)[1]})
+        columns = ['pk', time_field, *fields]
+        if model_name == 'miscrecord':
+            columns.append('misc_item__item_name')
+        rows = queryset.order_by(time_field, 'pk').values_list(*columns)
+        for pk, *values in rows.iterator(chunk_size=CHUNK_SIZE):
+            record = {'baby_date': baby_date_id}
+            for name, value in zip(columns[1:], values):
+                record[name.removesuffix('__item_name')] = _format_value(value)
+            yield model_name, pk, record
+
+
+def iter_ndjson(records: Iterable[tuple[str, int, dict]]) -> Iterator[str]:
+    for model_name, pk, fields in records:
+        yield json.dumps(
+            {'model': f'babycare.{model_name}', 'pk': pk, 'fields': fields},
+            ensure_ascii=False,
+        ) + '\n'
+
+
+def iter_csv(records: Iterable[tuple[str, int, dict]]) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, CSV_COLUMNS)
+    writer.writeheader()
+    for model_name, pk, fields in records:
+        _, time_field, _ = IMPORT_MODELS[model_name]
+        row = dict(fields, model=f'babycare.{model_name}', pk=pk)
+        row['time'] = row.pop(time_field)
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+
+
+def iter_buffered(lines: Iterable[str], size: int = BUFFER_SIZE) -> Iterator[bytes]:
+    """把逐行的文本合并成较大的块, 减少响应的写入次数"""
+    parts: list[str] = []
+    length = 0
+    for line in lines:
+        parts.append(line)
+        length += len(line)
+        if length >= size:
+            yield ''.join(parts).encode()
+            parts.clear()
+            length = 0
+    if parts:
+        yield ''.join(parts).encode()
+
+
+def iter_gzip(chunks: Iterable[bytes]) -> Iterator[bytes]:
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export_records(
+        baby_date_id: int,
+        fmt: str = 'ndjson',
+        start: datetime.date | None = None,
+        end: datetime.date | None = None,
+        gzip: bool = False,
+    ) -> Iterator[bytes]:
+    """
+    生成导出文件的内容, 调用方负责检查权限
+    :param fmt: 'ndjson' 或 'csv'
+    :param gzip: 是否 gzip 压缩
+    """
+    records = iter_records(baby_date_id, start, end)
+    lines = iter_csv(records) if fmt == 'csv' else iter_ndjson(records)
+    chunks = iter_buffered(lines)
+    return iter_gzip(chunks) if gzip else chunks
+
+
+def get_filename(baby_date_id: int, fmt: str, gzip: bool = False) -> str:
+    name = f'babycare-{baby_date_id}-{timezone.localdate().isoformat()}.{fmt}'
+    return f'{name}.gz' if gzip else name
@@ -0,0 +1,170 @@
+"""
+Fenton 早产儿生长曲线的参考数据与百分位/Z 值计算
+
+参考数据与前端 babycare_curve.js 使用的是同一份 static/json/babycare/*.json,
+每个进程只读取一次, 转换为按孕周排序的紧凑数组。
+某孕周的测量值先在相邻两周之间线性插值出各百分位曲线的值,
+再在相邻的两条百分位曲线之间按对应的 Z 值线性插值得到 Z 值,
+超出 3% 或 97% 曲线的部分沿最外侧两条曲线的斜率外推。
+"""
+import bisect
+import datetime
+import json
+from dataclasses import dataclass
+from functools import cache
+from pathlib import Path
+from statistics import NormalDist
+
+from utils.datetime import get_local_date
+
+
+REFERENCE_DIR = Path(__file__).resolve().parent / 'static' / 'json' / 'babycare'
+
+# BabyDate.gender 与参考文件名前缀的对应
+SEX_PREFIXES = {'M': 'boys', 'F': 'girls'}
+
+# GrowthData 字段与参考文件名后缀的对应
+METRIC_SUFFIXES = {
+    'weight': 'weight',
+    'height': 'length',
+    'head_circumference': 'head_circumference',
+}
+
+# 生长迟缓的判断阈值: Z 值较此前最高值下降超过 0.67, 即跨过一条主要百分位线
+FALTERING_Z_DROP = 0.67
+
+_STANDARD_NORMAL = NormalDist()
+
+
+@dataclass(frozen=True, slots=True)
+class FentonTable:
+    """
+    一种性别一项指标的参考表
+    values[i][j] 是第 weeks[i] 周第 percentiles[j] 百分位的值
+    """
+    weeks: tuple[float, ...]
+    percentiles: tuple[float, ...]  # 0 到 100
+    z_scores: tuple[float, ...]  # 各百分位对应的标准正态分布 Z 值
+    values: tuple[tuple[float, ...], ...]
+
+    def curves_at(self, week: float) -> tuple[float, ...] | None:
+        """
+        获取某孕周各百分位曲线的值
+        :return: 超出参考数据的孕周范围时返回 None
+        """
+        if not self.weeks[0] <= week <= self.weeks[-1]:
+            return None
+        i = bisect.bisect_right(self.weeks, week) - 1
+        if i == len(self.weeks) - 1:
+            return self.values[i]
+        ratio = (week - self.weeks[i]) / (self.weeks[i + 1] - self.weeks[i])
+        return tuple(
+            low + (high - low) * ratio
+            for low, high in zip(self.values[i], self.values[i + 1])
+        )
+
+    def z_score(self, week: float, value: float) -> float | None:
+        curves = self.curves_at(week)
+        if curves is None:
+            return None
+        j = bisect.bisect_right(curves, value) - 1
+        j = min(max(j, 0), len(curves) - 2)
+        z_low, z_high = self.z_scores[j], self.z_scores[j + 1]
+        return z_low + (value - curves[j]) * (z_high - z_low) / (curves[j + 1] - curves[j])
+
+    def percentile(self, week: float, value: float) -> float | None:
+        z = self.z_score(week, value)
+        return None if z is None else _STANDARD_NORMAL.cdf(z) * 100
+
+
+@cache
+def get_table(sex: str, metric: str) -> FentonTable:
+    """
+    读取参考表, 每个进程每种表只读取一次
+    :param sex: BabyDate.gender, 'M' 或 'F'
+    :param metric: 'weight', 'height' 或 'head_circumference'
+    """
+    path = REFERENCE_DIR / f'{SEX_PREFIXES[sex]}_{METRIC_SUFFIXES[metric]}.json'
+    with open(path, encoding='utf-8') as f:
+        rows = json.load(f)
+    points: dict[float, dict[float, float]] = dict()
+    for row in rows:
+        percentile = float(row['type'].rstrip('%'))
+        points.setdefault(row['week'], dict())[percentile] = row['yData']
+    weeks = tuple(sorted(points))
+    percentiles = tuple(sorted(points[weeks[0]]))
+    return FentonTable(
+        weeks=weeks,
+        percentiles=percentiles,
+        z_scores=tuple(_STANDARD_NORMAL.inv_cdf(p / 100) for p in percentiles),
+        values=tuple(tuple(points[week][p] for p in percentiles) for week in weeks),
+    )
+
+
+def get_pma_weeks(last_menstrual_period: datetime.date, measured_at: datetime.datetime) -> float:
+    """与 babycare_curve.js 的 getWeek 一致, 以末次月经为起点的周数"""
+    return (get_local_date(measured_at) - last_menstrual_period).days / 7
+
+
+def z_score(sex: str | None, metric: str, week: float, value: float | None) -> float | None:
+    """
+    计算测量值的 Z 值
+    :return: 性别未知、没有测量值或孕周超出参考范围时返回 None
+    """
+    if sex not in SEX_PREFIXES or value is None:
+        return None
+    return get_table(sex, metric).z_score(week, value)
+
+
+def percentile(sex: str | None, metric: str, week: float, value: float | None) -> float | None:
+    z = z_score(sex, metric, week, value)
+    return None if z is None else _STANDARD_NORMAL.cdf(z) * 100
+
+
+def annotate_growth_data(queryset) -> list:
+    """
+    一次遍历为 GrowthData 查询集中的每条记录计算 PMA 周数及各项指标的 Z 值和百分位
+    结果写在记录的 pma_weeks, <指标>_z, <指标>_percentile 属性上
+    :param queryset: GrowthData 查询集, 可以包含多个宝宝
+    :return: 按宝宝和测量时间排序的记录列表
+    """
+    records = list(
+        queryset.select_related('baby_date').order_by('baby_date', 'record_at'))
+    for record in records:
+        baby_date = record.baby_date
+        record.pma_weeks = get_pma_weeks(
+            baby_date.last_menstrual_period, record.record_at)
+        for metric in METRIC_SUFFIXES:
+            z = z_score(baby_date.gender, metric,
+                        record.pma_weeks, getattr(record, metric))
+            setattr(record, f'{metric}_z', z)
+            setattr(record, f'{metric}_percentile',
+                    None if z is None else _STANDARD_NORMAL.cdf(z) * 100)
+    return records
+
+
+def find_growth_faltering(
+        records: list,
+        metric: str = 'weight',
+        z_drop: float = FALTERING_Z_DROP,
+    ) -> dict[int, tuple[float, float]]:
+    """
+    找出最新 Z 值较此前最高 Z 值下降超过 z_drop 的宝宝
+    :param records: annotate_growth_data 的结果
+    :return: {baby_date_id: (此前最高 Z 值, 最新 Z 值)}
+    """
+    peaks: dict[int, float] = dict()
+    latest: dict[int, float] = dict()
+    for record in records:
+        z = getattr(record, f'{metric}_z')
+        if z is None:
+            continue
+        pk = record.baby_date_id
+        if pk in latest:
+            peaks[pk] = max(peaks.get(pk, latest[pk]), latest[pk])
+        latest[pk] = z
+    return {
+        pk: (peak, latest[pk])
+        for pk, peak in peaks.items()
+        if peak - latest[pk] > z_drop
+    }
@@ -0,0 +1,182 @@
+"""
+dashboard 上每个宝宝记录分区的 HTML 片段缓存
+
+每个分区(喂奶、体温、生长数据、尿布、其他)渲染后以 (宝宝, 分区, data_version, 权限) 为键缓存,
+宝宝的记录或关系变化时 data_version 递增, 旧的片段不再被使用, 等待过期即可, 不需要主动删除。
+所有分区都命中缓存的宝宝不再查询最近记录和用品, 也不再渲染表单和表格。
+与请求相关的内容不能缓存, 模板中以注释占位, 取出后再替换:
+    <!--live:csrf-->  当前请求的 CSRF 表单字段
+    <!--live:last-feeding-->  距离上次喂奶的时间
+    <!--live:feeding-stats-->  最近 24 小时和 7 天的喂奶统计, 窗口随时间移动,
+        缓存的是 FeedingStats, 喂奶记录变化时 data_version 同样递增
+BabyDate 要先于记录读取, 这样缓存在某个版本下的片段不会比该版本更旧。
+BABYCARE_FRAGMENT_CACHE_TIMEOUT 为 0 时不缓存。
+"""
+import asyncio
+from typing import Any
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpRequest
+from django.template.backends.utils import csrf_input
+from django.template.loader import render_to_string
+from django.utils.safestring import mark_safe
+
+from . import models
+from .loaders import load_feeding_stats, load_misc_items, load_recent_sections
+from .modelforms import BodyTemperatureForm, DiaperForm, FeedingForm, GrowthDataForm, MiscRecordForm
+from .templatetags.babycare_tags import zh_timesince
+
+
+# (分区名, 模板)
+SECTIONS = (
+    ('feeding', 'babycare/includes/sections/feeding.html'),
+    ('body_temperature', 'babycare/includes/sections/body_temperature.html'),
+    ('growth_data', 'babycare/includes/sections/growth_data.html'),
+    ('diaper', 'babycare/includes/sections/diaper.html'),
+    ('misc_record', 'babycare/includes/sections/misc_record.html'),
+)
+
+LIVE_CSRF = '<!--live:csrf-->'
+LIVE_LAST_FEEDING = '<!--live:last-feeding-->'
+LIVE_FEEDING_STATS = '<!--live:feeding-stats-->'
+
+
+def get_cache_key(baby_date: models.BabyDate, section: str, perm: str) -> str:
+    return f'babycare:section:{baby_date.pk}:{section}:{baby_date.data_version}:{perm}'
+
+
+def get_section_context(
+        baby_date: models.BabyDate,
+        recent: dict[str, list],
+        misc_items: list[models.MiscItem],
+        can_edit: bool,
+    ) -> dict[str, Any]:
+    """渲染一个宝宝各分区模板的上下文"""
+    initial = {'baby_date': baby_date.pk}
+    return {
+        'baby_date': baby_date,
+        'can_edit': can_edit,
+        **recent,
+        'feeding_form': FeedingForm(initial=initial),
+        'body_temperature_form': BodyTemperatureForm(initial=initial),
+        'growth_data_form': GrowthDataForm(initial=initial),
+        'diaper_form': DiaperForm(initial=initial),
+        'misc_record_form': MiscRecordForm(initial=initial, misc_items=misc_items),
+    }
+
+
+def render_baby_sections(
+        request: HttpRequest,
+        baby_dates: list[models.BabyDate],
+    ) -> dict[int, dict[str, str]]:
+    """
+    渲染多个宝宝的记录分区, 优先使用缓存
+    缓存未命中的宝宝一起加载最近记录和用品, 查询次数与宝宝数量无关
+    :param baby_dates: 当前用户可以访问的宝宝
+    :return: {baby_date_id: {分区名: html}}
+    """
+    timeout = getattr(settings, 'BABYCARE_FRAGMENT_CACHE_TIMEOUT', 0)
+    perms, keys = _get_keys(request.baby_acl, baby_dates)  # type: ignore[attr-defined]
+    cached = cache.get_many(keys.values()) if timeout else dict()
+    missing = _get_missing(baby_dates, keys, cached)
+    if missing:
+        missing_ids = [baby_date.pk for baby_date in missing]
+        rendered = _render_missing(
+            missing, perms, keys, cached,
+            load_recent_sections(missing_ids), load_misc_items(missing_ids),
+            load_feeding_stats(missing_ids))
+        cached.update(rendered)
+        if timeout:
+            cache.set_many(rendered, timeout)
+    return _fill_live(request, keys, cached)
+
+
+async def arender_baby_sections(
+        request: HttpRequest,
+        baby_dates: list[models.BabyDate],
+    ) -> dict[int, dict[str, str]]:
+    """render_baby_sections 的异步版本, 最近记录和用品并发加载"""
+    timeout = getattr(settings, 'BABYCARE_FRAGMENT_CACHE_TIMEOUT', 0)
+    perms, keys = _get_keys(await request.ababy_acl(), baby_dates)  # type: ignore[attr-defined]
+    cached = await cache.aget_many(keys.values()) if timeout else dict()
+    missing = _get_missing(baby_dates, keys, cached)
+    if missing:
+        missing_ids = [baby_date.pk for baby_date in missing]
+        recent_sections, misc_items, feeding_stats = await asyncio.gather(
+            sync_to_async(load_recent_sections)(missing_ids),
+            sync_to_async(load_misc_items)(missing_ids),
+            sync_to_async(load_feeding_stats)(missing_ids),
+        )
+        rendered = _render_missing(
+            missing, perms, keys, cached, recent_sections, misc_items, feeding_stats)
+        cached.update(rendered)
+        if timeout:
+            await cache.aset_many(rendered, timeout)
+    return _fill_live(request, keys, cached)
+
+
+def _get_keys(acl, baby_dates: list[models.BabyDate]):
+    perms = {
+        baby_date.pk: 'edit' if acl.can_edit(baby_date.pk) else 'view'
+        for baby_date in baby_dates
+    }
+    keys = {
+        (baby_date.pk, section): get_cache_key(baby_date, section, perms[baby_date.pk])
+        for baby_date in baby_dates
+        for section, _ in SECTIONS
+    }
+    return perms, keys
+
+
+def _get_missing(baby_dates: list[models.BabyDate], keys: dict, cached: dict) -> list[models.BabyDate]:
+    return [
+        baby_date for baby_date in baby_dates
+        if any(keys[(baby_date.pk, section)] not in cached for section, _ in SECTIONS)
+    ]
+
+
+def _render_missing(
+        missing: list[models.BabyDate],
+        perms: dict[int, str],
+        keys: dict,
+        cached: dict,
+        recent_sections: dict[int, dict[str, list]],
+        misc_items: dict[int, list[models.MiscItem]],
+        feeding_stats: dict[int, models.FeedingStats | None],
+    ) -> dict[str, tuple[str, dict]]:
+    """渲染未命中缓存的分区, 不查询数据库"""
+    rendered = dict()
+    for baby_date in missing:
+        recent = recent_sections[baby_date.pk]
+        context = get_section_context(
+            baby_date, recent, misc_items[baby_date.pk], perms[baby_date.pk] == 'edit')
+        feedings = recent.get('feedings')
+        live = {
+            'last_feeding': feedings[0].feed_at if feedings else None,
+            'feeding_stats': feeding_stats[baby_date.pk],
+        }
+        for section, template_name in SECTIONS:
+            key = keys[(baby_date.pk, section)]
+            if key not in cached:
+                rendered[key] = (render_to_string(template_name, context), live)
+    return rendered
+
+
+def _fill_live(request: HttpRequest, keys: dict, cached: dict) -> dict[int, dict[str, str]]:
+    """替换片段中与请求相关的占位"""
+    csrf = csrf_input(request)
+    result: dict[int, dict[str, str]] = dict()
+    for (baby_date_id, section), key in keys.items():
+        html, live = cached[key]
+        html = html.replace(LIVE_CSRF, csrf)
+        if live['last_feeding'] is not None:
+            html = html.replace(LIVE_LAST_FEEDING, zh_timesince(live['last_feeding']))
+        if LIVE_FEEDING_STATS in html:
+            stats = live['feeding_stats']
+            html = html.replace(LIVE_FEEDING_STATS, render_to_string(
+                'babycare/includes/feeding_stats.html',
+                {'metrics': stats.get_metrics()}) if stats is not None else '')
+        result.setdefault(baby_date_id, dict())[section] = mark_safe(html)
+    return result
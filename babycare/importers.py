@@ -0,0 +1,325 @@
+"""
+批量导入宝宝的记录
+
+支持 CSV 和 Django fixture 格式的 JSON (babycare/utils/generate_data.py 生成的格式),
+以及每行一个 fixture 对象的 NDJSON。
+逐行读取和校验, 不会把整个文件读入内存;
+每个宝宝的权限只检查一次, 校验通过的记录按模型攒够 batch_size 条后
+在一个事务中 bulk_create, 某一行的错误只记录下来, 不影响其他行的导入。
+bulk_create 不会触发 post_save, 导入结束后发送 records_bulk_changed 信号
+由 babycare.signals 重建受影响日期的每日汇总等派生数据。
+"""
+import csv
+import json
+from dataclasses import dataclass, field
+from typing import IO, Any, Iterable, Iterator
+
+from django.db import DatabaseError, transaction
+from django.forms import modelform_factory
+
+from . import models
+from .acl import get_acl
+from .modelforms import DiaperForm
+from .signals import records_bulk_changed
+
+
+# 可导入的模型: {fixture 中的模型名: (模型, 时间字段, 其余字段)}
+IMPORT_MODELS = {
+    'feeding': (models.Feeding, 'feed_at', ['amount', 'note']),
+    'breastbumping': (models.BreastBumping, 'date', ['amount', 'notes']),
+    'diaper': (models.Diaper, 'create_at', [
+        'pooh_amount', 'pooh_color', 'pee_amount', 'pee_color', 'notes']),
+    'bodytemperature': (models.BodyTemperature, 'measure_at', [
+        'temperature', 'measurement', 'notes']),
+    'growthdata': (models.GrowthData, 'record_at', [
+        'weight', 'height', 'head_circumference', 'notes']),
+    'miscrecord': (models.MiscRecord, 'record_at', ['notes']),
+}
+
+# 时间字段的别名, 旧版 generate_data.py 生成的记录时间字段名为 date
+TIME_FIELD_ALIASES = ('time', 'date')
+
+FORMATS = ('csv', 'json', 'ndjson')
+
+
+def _get_import_form(model_name: str):
+    """
+    校验用的 ModelForm, 不含 baby_date 和 misc_item
+    这两个外键由导入器按宝宝缓存后检查, 避免每行一次查询
+    """
+    model, time_field, fields = IMPORT_MODELS[model_name]
+    # 尿布记录沿用 DiaperForm 中清除颜色的逻辑
+    form = DiaperForm if model is models.Diaper else None
+    kwargs = {'form': form} if form is not None else {}
+    return modelform_factory(model, fields=[time_field, *fields], **kwargs)
+
+
+IMPORT_FORMS = {name: _get_import_form(name) for name in IMPORT_MODELS}
+
+
+def guess_format(filename: str) -> str | None:
+    suffix = filename.rsplit('.', 1)[-1].lower() if '.' in filename else ''
+    return suffix if suffix in FORMATS else None
+
+
+def iter_json_array(stream: IO[str], chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    逐个读取 JSON 数组中的元素, 内存中只保留当前元素附近的内容
+    :raise ValueError: 文件不是 JSON 数组或格式错误
+    """
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    state = 'start'  # start: 等待 [, item: 等待元素, next: 等待 , 或 ]
+
+    while True:
+        if not eof and len(buffer) < chunk_size:
+            chunk = stream.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+        buffer = buffer.lstrip()
+        if not buffer:
+            if eof:
+                raise ValueError("JSON 数组不完整")
+            continue
+        if state == 'start':
+            if buffer[0] != '[':
+                raise ValueError("JSON 文件的内容应为数组")
+            buffer = buffer[1:]
+            state = 'item'
+        elif buffer[0] == ']' and state in ('item', 'next'):
+            return
+        elif state == 'next':
+            if buffer[0] != ',':
+                raise ValueError("JSON 数组的元素之间缺少逗号")
+            buffer = buffer[1:]
+            state = 'item'
+        else:
+            try:
+                obj, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # 当前元素还没有读完整
+                chunk = stream.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield obj
+            buffer = buffer[end:]
+            state = 'next'
+
+
+@dataclass
+class ImportResult:
+    created: dict[str, int] = field(default_factory=dict)
+    errors: list[tuple[int, str]] = field(default_factory=list)
+    error_count: int = 0  # errors 只保留前 max_errors 条
+
+    @property
+    def created_count(self) -> int:
+        return sum(self.created.values())
+
+    def as_dict(self) -> dict:
+        return {
+            'created': self.created,
+            'created_count': self.created_count,
+            'error_count': self.error_count,
+            'errors': [{'row': row, 'error': error} for row, error in self.errors],
+        }
+
+
+class EventImporter:
+    """
+    :param user: 导入记录的用户, 只能导入其有编辑权限的宝宝; 为 None 时不检查权限(管理命令)
+    :param baby_date_id: 指定后所有记录都导入到该宝宝, 忽略文件中的 baby_date
+    :param default_model: 行中没有 model 时使用的模型名, 如 'feeding'
+    :param batch_size: 每个事务 bulk_create 的记录数
+    :param max_errors: 结果中最多保留的错误数
+    """
+
+    def __init__(
+            self,
+            user=None,
+            baby_date_id: int | None = None,
+            default_model: str | None = None,
+            batch_size: int = 500,
+            max_errors: int = 1000,
+        ):
+        self.user = user
+        self.baby_date_id = baby_date_id
+        self.default_model = default_model
+        self.batch_size = batch_size
+        self.max_errors = max_errors
+        self.result = ImportResult()
+        self._pending: dict[str, list[tuple[int, Any]]] = {
+            name: [] for name in IMPORT_MODELS}
+        self._babies: dict[int, bool] = dict()
+        self._misc_items: dict[int, dict[str, int]] = dict()
+        # {baby_date_id: [最早本地日期, 最晚本地日期, 有新记录的模型]}
+        self._changed: dict[int, list] = dict()
+
+    def add_error(self, row: int, error: str) -> None:
+        self.result.error_count += 1
+        if len(self.result.errors) < self.max_errors:
+            self.result.errors.append((row, error))
+
+    def can_import_to(self, baby_date_id: int) -> bool:
+        """每个宝宝只检查一次"""
+        allowed = self._babies.get(baby_date_id)
+        if allowed is None:
+            if self.user is None:
+                allowed = models.BabyDate.objects.filter(pk=baby_date_id).exists()
+            else:
+                allowed = get_acl(self.user).can_edit(baby_date_id)
+            self._babies[baby_date_id] = allowed
+        return allowed
+
+    def get_misc_item_id(self, baby_date_id: int, value: str) -> int | None:
+        """misc_item 可以是该宝宝的用品 id 或名称"""
+        items = self._misc_items.get(baby_date_id)
+        if items is None:
+            items = dict()
+            for pk, name in models.MiscItem.objects.filter(
+                    baby_date=baby_date_id).values_list('pk', 'item_name'):
+                items[str(pk)] = pk
+                items.setdefault(name, pk)
+            self._misc_items[baby_date_id] = items
+        return items.get(str(value).strip())
+
+    def add_row(self, row: int, data: Any) -> None:
+        """
+        校验一行数据, 通过后放入待插入的批次
+        :param row: 行号, 用于错误报告
+        :param data: fixture 对象 {'model': ..., 'fields': {...}} 或 CSV 的一行
+        """
+        if not isinstance(data, dict):
+            self.add_error(row, "记录应为对象")
+            return
+        values = data.get('fields', data)
+        if not isinstance(values, dict):
+            self.add_error(row, "fields 应为对象")
+            return
+        model_name = (data.get('model') or values.get('model') or self.default_model or '')
+        model_name = model_name.lower().removeprefix('babycare.')
+        if model_name not in IMPORT_MODELS:
+            self.add_error(row, f"不支持的记录类型: {model_name or '(空)'}")
+            return
+        model, time_field, _ = IMPORT_MODELS[model_name]
+
+        baby_date_id = self.baby_date_id
+        if baby_date_id is None:
+            try:
+                baby_date_id = int(values.get('baby_date'))  # type: ignore[arg-type]
+            except (TypeError, ValueError):
+                self.add_error(row, "缺少或无效的 baby_date")
+                return
+        if not self.can_import_to(baby_date_id):
+            self.add_error(row, f"没有权限导入到宝宝 {baby_date_id}")
+            return
+
+        form_data = {k: v for k, v in values.items() if v not in ('', None)}
+        if time_field not in form_data:
+            for alias in TIME_FIELD_ALIASES:
+                if alias in form_data:
+                    form_data[time_field] = form_data[alias]
+                    break
+        for name in IMPORT_FORMS[model_name].base_fields:
+            # CSV 中缺少的列使用模型的默认值, 如体温的测量方式
+            model_field = model._meta.get_field(name)
+            if name not in form_data and name != time_field and model_field.has_default():
+                form_data[name] = model_field.get_default()
+        form = IMPORT_FORMS[model_name](form_data)
+        if not form.is_valid():
+            errors = '; '.join(
+                f"{name}: {' '.join(messages)}" for name, messages in form.errors.items())
+            self.add_error(row, errors)
+            return
+        record = form.save(commit=False)
+        record.baby_date_id = baby_date_id
+        if model is models.MiscRecord:
+            misc_item_id = self.get_misc_item_id(baby_date_id, values.get('misc_item', ''))
+            if misc_item_id is None:
+                self.add_error(row, "misc_item: 该宝宝没有这个用品")
+                return
+            record.misc_item_id = misc_item_id
+
+        pending = self._pending[model_name]
+        pending.append((row, record))
+        if len(pending) >= self.batch_size:
+            self.flush(model_name)
+
+    def flush(self, model_name: str) -> None:
+        """在一个事务中插入某个模型待插入的记录"""
+        pending = self._pending[model_name]
+        if not pending:
+            return
+        self._pending[model_name] = []
+        model = IMPORT_MODELS[model_name][0]
+        try:
+            with transaction.atomic():
+                model.objects.bulk_create([record for _, record in pending])
+        except DatabaseError as e:
+            for row, _ in pending:
+                self.add_error(row, f"写入失败: {e}")
+            return
+        self.result.created[model_name] = self.result.created.get(model_name, 0) + len(pending)
+        for _, record in pending:
+            date = record.local_date
+            span = self._changed.get(record.baby_date_id)
+            if span is None:
+                self._changed[record.baby_date_id] = [date, date, {model}]
+            else:
+                span[0] = min(span[0], date)
+                span[1] = max(span[1], date)
+                span[2].add(model)
+
+    def finish(self) -> ImportResult:
+        """插入剩余的记录, 通知派生数据更新"""
+        for model_name in IMPORT_MODELS:
+            self.flush(model_name)
+        for baby_date_id, (start, end, changed_models) in self._changed.items():
+            records_bulk_changed.send(
+                sender=type(self),
+                baby_date_id=baby_date_id,
+                models=frozenset(changed_models),
+                start=start,
+                end=end,
+            )
+        self._changed.clear()
+        return self.result
+
+    def import_rows(self, rows: Iterable[tuple[int, Any]]) -> ImportResult:
+        for row, data in rows:
+            self.add_row(row, data)
+        return self.finish()
+
+    def import_stream(self, stream: IO[str], fmt: str) -> ImportResult:
+        """
+        :param stream: 文本流
+        :param fmt: 'csv', 'json' 或 'ndjson'
+        :raise ValueError: 文件格式错误, 此前读取的记录已经导入
+        """
+        if fmt == 'csv':
+            reader = csv.DictReader(stream)
+            rows: Iterable[tuple[int, Any]] = ((reader.line_num, r) for r in reader)
+        elif fmt == 'json':
+            rows = enumerate(iter_json_array(stream), start=1)
+        elif fmt == 'ndjson':
+            rows = self._iter_ndjson(stream)
+        else:
+            raise ValueError(f"不支持的文件格式: {fmt}")
+        try:
+            return self.import_rows(rows)
+        except (ValueError, csv.Error):
+            self.finish()
+            raise
+
+    def _iter_ndjson(self, stream: IO[str]) -> Iterator[tuple[int, Any]]:
+        for row, line in enumerate(stream, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield row, json.loads(line)
+            except json.JSONDecodeError as e:
+                self.add_error(row, f"JSON 格式错误: {e}")
@@ -0,0 +1,119 @@
+"""
+批量加载多个宝宝的最近记录
+
+dashboard 首页需要每个宝宝各个记录分区的最近若干条记录,
+逐个宝宝调用 get_recent_* 会产生 分区数 x 宝宝数 次查询,
+这里每个分区只用一次查询取回所有宝宝的最近记录。
+"""
+from django.db.models import F, QuerySet, Window
+from django.db.models.functions import RowNumber
+
+from . import models
+
+
+# (上下文中的键, 模型, 排序的时间字段, 条数)
+# 条数与各模型 get_recent_* 的默认值保持一致
+RECENT_SECTIONS = (
+    ('feedings', models.Feeding, 'feed_at', 9),
+    ('body_temperatures', models.BodyTemperature, 'measure_at', 7),
+    ('growth_data', models.GrowthData, 'record_at', 10),
+    ('diapers', models.Diaper, 'create_at', 9),
+    ('misc_records', models.MiscRecord, 'record_at', 10),
+)
+
+
+def get_recent_by_baby(
+        queryset: QuerySet,
+        baby_date_ids: list[int],
+        order_field: str,
+        limit: int,
+    ) -> dict[int, list]:
+    """
+    一次查询获取每个宝宝按时间倒序的前 limit 条记录
+    使用 ROW_NUMBER() OVER (PARTITION BY baby_date), Django 支持的数据库版本
+    (SQLite 3.31+, MySQL 8.0.11+, MariaDB 10.5+) 都支持窗口函数
+    时间相同的记录按 id 倒序, 导入和批量提交的记录时间经常相同
+    :param queryset: 记录的查询集, 可以预先 select_related
+    :param baby_date_ids: 宝宝的 id 列表
+    :param order_field: 排序的时间字段名
+    :param limit: 每个宝宝返回的记录数量
+    :return: {baby_date_id: [记录, ...]} 每个列表按时间倒序
+    """
+    result: dict[int, list] = {pk: [] for pk in baby_date_ids}
+    if not result:
+        return result
+    queryset = queryset.filter(baby_date__in=result.keys()).annotate(
+        row_number=Window(
+            RowNumber(),
+            partition_by=F('baby_date'),
+            order_by=[F(order_field).desc(), F('pk').desc()],
+        )
+    ).filter(row_number__lte=limit)
+    for record in queryset.order_by('baby_date', f'-{order_field}', '-pk'):
+        result[record.baby_date_id].append(record)
+    return result
+
+
+def load_recent_sections(baby_date_ids: list[int]) -> dict[int, dict[str, list]]:
+    """
+    获取每个宝宝所有记录分区的最近记录, 查询次数与宝宝数量无关
+    :param baby_date_ids: 宝宝的 id 列表
+    :return: {baby_date_id: {'feedings': [...], 'body_temperatures': [...], ...}}
+    """
+    baby_date_ids = list(baby_date_ids)
+    sections: dict[int, dict[str, list]] = {pk: {} for pk in baby_date_ids}
+    for key, model, order_field, limit in RECENT_SECTIONS:
+        recent = get_recent_by_baby(_section_queryset(model), baby_date_ids, order_field, limit)
+        for pk, records in recent.items():
+            sections[pk][key] = records
+    return sections
+
+
+def load_recent_section(baby_date_id: int, key: str) -> list:
+    """
+    获取一个宝宝某个记录分区的最近记录, 用于提交记录后只重新渲染该分区的表格
+    :param key: RECENT_SECTIONS 中的键, 如 feedings
+    :return: 按时间倒序的记录列表, 时间相同时按 pk 倒序, 与 get_recent_by_baby 一致
+    """
+    for section_key, model, order_field, limit in RECENT_SECTIONS:
+        if section_key == key:
+            return list(_section_queryset(model).filter(
+                baby_date=baby_date_id).order_by(f'-{order_field}', '-pk')[:limit])
+    raise KeyError(key)
+
+
+async def alist(queryset: QuerySet) -> list:
+    """用异步 ORM 执行查询集, 供 asyncio.gather 并发加载"""
+    return [obj async for obj in queryset]
+
+
+def _section_queryset(model) -> QuerySet:
+    queryset = model.objects.all()
+    if model is models.MiscRecord:
+        # 表格中会显示用品名
+        queryset = queryset.select_related('misc_item')
+    return queryset
+
+
+def load_misc_items(baby_date_ids: list[int]) -> dict[int, list[models.MiscItem]]:
+    """
+    一次查询获取每个宝宝的用品, 供 MiscRecordForm 的 misc_items 参数使用
+    :return: {baby_date_id: [用品, ...]}
+    """
+    items: dict[int, list[models.MiscItem]] = {pk: [] for pk in baby_date_ids}
+    if items:
+        for item in models.MiscItem.objects.filter(baby_date__in=items.keys()).order_by('pk'):
+            items[item.baby_date_id].append(item)
+    return items
+
+
+def load_feeding_stats(baby_date_ids: list[int]) -> dict[int, models.FeedingStats | None]:
+    """
+    一次查询获取每个宝宝的喂奶滚动统计, 还没有统计的宝宝为 None
+    :return: {baby_date_id: FeedingStats 或 None}
+    """
+    stats: dict[int, models.FeedingStats | None] = {pk: None for pk in baby_date_ids}
+    if stats:
+        for item in models.FeedingStats.objects.filter(baby_date__in=stats.keys()):
+            stats[item.baby_date_id] = item
+    return stats
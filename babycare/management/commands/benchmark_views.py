@@ -0,0 +1,61 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_test_environment, teardown_test_environment
+
+from babycare import benchmarks
+from utils.benchmark import write_report
+
+
+class Command(BaseCommand):
+    help = (
+        "在临时的测试数据库中生成不同规模的数据, "
+        "测量热点视图的耗时、查询次数和内存峰值, 比较同步与异步版本, 写入 JSON 报告"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--sizes', nargs='+', choices=list(benchmarks.SIZES),
+            default=list(benchmarks.SIZES), help="数据规模")
+        parser.add_argument('--repeat', type=int, default=3, help="每个视图运行的次数")
+        parser.add_argument('--seed', type=int, default=0, help="随机种子")
+        parser.add_argument(
+            '-o', '--output', default='benchmark-report.json', help="报告文件")
+        parser.add_argument(
+            '--keepdb', action='store_true', help="保留测试数据库")
+
+    def handle(self, *args, **options):
+        setup_test_environment(debug=False)
+        old_name = connection.settings_dict['NAME']
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, keepdb=options['keepdb'])
+        try:
+            results = []
+            rows = dict()
+            for size in options['sizes']:
+                call_command('flush', interactive=False, verbosity=0)
+                self.stdout.write(f"生成 {size} 的数据...")
+                ctx = benchmarks.prepare(size, seed=options['seed'])
+                rows[size] = ctx.rows
+                for result in benchmarks.run(size, ctx, repeat=options['repeat']):
+                    results.append(result)
+                    budget = '' if result.budget is None else f"/{result.budget}"
+                    line = (
+                        f"{size:>10} {result.name:<36} {result.wall_ms:>10.1f}ms "
+                        f"{result.queries:>4}{budget:<5} queries {result.peak_kb:>10.1f}KB"
+                    )
+                    self.stdout.write(self.style.ERROR(line) if result.over_budget else line)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0, keepdb=options['keepdb'])
+            teardown_test_environment()
+
+        comparison = benchmarks.compare_async(results)
+        for item in comparison:
+            self.stdout.write(
+                f"{item['size']:>10} {item['name']:<36} WSGI {item['wsgi_ms']:>10.1f}ms "
+                f"ASGI {item['asgi_ms']:>10.1f}ms x{item['ratio']}")
+        write_report(options['output'], results, rows=rows, async_comparison=comparison)
+        self.stdout.write(self.style.SUCCESS(f"报告已写入 {options['output']}"))
+        over = [r for r in results if r.over_budget]
+        if over:
+            raise CommandError(
+                "超出查询预算: " + ', '.join(f"{r.name} ({r.size}) {r.queries}>{r.budget}" for r in over))
@@ -0,0 +1,47 @@
+import datetime
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from babycare import exporters
+from babycare.models import BabyDate
+
+
+class Command(BaseCommand):
+    help = "流式导出某个宝宝的全部记录为 NDJSON 或 CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument('baby_date_id', type=int, help="BabyDate id")
+        parser.add_argument(
+            '--format', choices=exporters.FORMATS, default='ndjson',
+            help="导出格式, 默认 ndjson")
+        parser.add_argument(
+            '--start', type=datetime.date.fromisoformat,
+            help="起始本地日期 YYYY-MM-DD (包含)")
+        parser.add_argument(
+            '--end', type=datetime.date.fromisoformat,
+            help="结束本地日期 YYYY-MM-DD (包含)")
+        parser.add_argument(
+            '--gzip', action='store_true', help="gzip 压缩")
+        parser.add_argument(
+            '-o', '--output', help="输出文件, 默认为标准输出")
+
+    def handle(self, *args, **options):
+        baby_date_id = options['baby_date_id']
+        if not BabyDate.objects.filter(pk=baby_date_id).exists():
+            raise CommandError(f"宝宝 {baby_date_id} 不存在")
+        chunks = exporters.export_records(
+            baby_date_id,
+            options['format'],
+            start=options['start'],
+            end=options['end'],
+            gzip=options['gzip'],
+        )
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from babycare.synthetic import SyntheticDataGenerator
+
+
+class Command(BaseCommand):
+    help = "按随机种子批量生成用于压测的用户、宝宝、各类记录、购物清单和任务"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=50, help="用户数")
+        parser.add_argument('--babies', type=int, default=20, help="宝宝数")
+        parser.add_argument(
+            '--years', type=float, default=1,
+            help="每个宝宝最多的记录年数")
+        parser.add_argument('--seed', type=int, default=0, help="随机种子")
+        parser.add_argument(
+            '--prefix', default='syn',
+            help="用户名、宝宝昵称和清单名的前缀, 与种子一起组成唯一的名字")
+        parser.add_argument(
+            '--batch-size', type=int, default=5000,
+            help="每个事务写入的记录数")
+        parser.add_argument(
+            '--no-rebuild', action='store_true',
+            help="不重建每日汇总等派生数据")
+
+    def handle(self, *args, **options):
+        try:
+            generator = SyntheticDataGenerator(
+                users=options['users'],
+                babies=options['babies'],
+                years=options['years'],
+                seed=options['seed'],
+                prefix=options['prefix'],
+                batch_size=options['batch_size'],
+                log=self.stdout.write,
+            )
+        except ValueError as e:
+            raise CommandError(str(e))
+        counts = generator.generate(rebuild=not options['no_rebuild'])
+        for label, count in sorted(counts.items()):
+            self.stdout.write(f"{label}: {count}")
+        self.stdout.write(self.style.SUCCESS("模拟数据已生成"))
@@ -0,0 +1,59 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from babycare.importers import FORMATS, IMPORT_MODELS, EventImporter, guess_format
+
+
+class Command(BaseCommand):
+    help = "从 CSV 或 fixture 格式的 JSON 文件批量导入喂养、尿布、体温等记录"
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help="要导入的文件")
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help="文件格式, 默认根据扩展名判断")
+        parser.add_argument(
+            '--user',
+            help="以该用户名导入, 只能导入其有编辑权限的宝宝; 默认不检查权限")
+        parser.add_argument(
+            '--baby', type=int, dest='baby_date_id',
+            help="所有记录都导入到该 BabyDate id")
+        parser.add_argument(
+            '--model', choices=sorted(IMPORT_MODELS),
+            help="行中没有 model 时使用的记录类型")
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help="每个事务写入的记录数")
+
+    def handle(self, *args, **options):
+        user = None
+        if options['user']:
+            try:
+                user = get_user_model().objects.get(username=options['user'])
+            except get_user_model().DoesNotExist:
+                raise CommandError(f"用户 {options['user']} 不存在")
+
+        for path in options['paths']:
+            fmt = options['format'] or guess_format(path)
+            if fmt is None:
+                raise CommandError(f"无法判断 {path} 的格式, 请指定 --format")
+            importer = EventImporter(
+                user=user,
+                baby_date_id=options['baby_date_id'],
+                default_model=options['model'],
+                batch_size=options['batch_size'],
+            )
+            with open(path, encoding='utf-8-sig', newline='') as f:
+                try:
+                    result = importer.import_stream(f, fmt)
+                except ValueError as e:
+                    raise CommandError(f"{path}: 文件格式错误: {e}")
+            for row, error in result.errors:
+                self.stderr.write(f"{path}:{row}: {error}")
+            if result.error_count > len(result.errors):
+                self.stderr.write(
+                    f"{path}: 另有 {result.error_count - len(result.errors)} 个错误未显示")
+            created = ', '.join(f"{name} {count}" for name, count in result.created.items())
+            self.stdout.write(self.style.SUCCESS(
+                f"{path}: 已导入 {result.created_count} 条记录 ({created or '无'}), "
+                f"{result.error_count} 行有错误"))
@@ -0,0 +1,28 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+
+from babycare.models import DailyBabySummary
+
+
+class Command(BaseCommand):
+    help = "从原始记录重建每日汇总 DailyBabySummary"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--baby', type=int, dest='baby_date_id',
+            help="只重建该 BabyDate id 的汇总")
+        parser.add_argument(
+            '--start', type=datetime.date.fromisoformat,
+            help="起始本地日期 YYYY-MM-DD (包含)")
+        parser.add_argument(
+            '--end', type=datetime.date.fromisoformat,
+            help="结束本地日期 YYYY-MM-DD (包含)")
+
+    def handle(self, *args, **options):
+        count = DailyBabySummary.rebuild(
+            baby_date_id=options['baby_date_id'],
+            start=options['start'],
+            end=options['end'],
+        )
+        self.stdout.write(self.style.SUCCESS(f"已重建 {count} 条每日汇总"))
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from babycare.models import FeedingStats
+
+
+class Command(BaseCommand):
+    help = "从原始记录重建最近 7 天的喂奶滚动统计 FeedingStats"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--baby', type=int, dest='baby_date_id',
+            help="只重建该 BabyDate id 的统计")
+
+    def handle(self, *args, **options):
+        count = FeedingStats.rebuild(baby_date_id=options['baby_date_id'])
+        self.stdout.write(self.style.SUCCESS(f"已重建 {count} 个宝宝的喂奶统计"))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from babycare.models import RecordTimeZone
+
+
+class Command(BaseCommand):
+    help = "按当前的 TIME_ZONE 重新计算所有记录的 local_date 并重建每日汇总"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--if-changed', action='store_true',
+            help="只在 TIME_ZONE 与上次计算时不同时重新计算")
+
+    def handle(self, *args, **options):
+        if RecordTimeZone.sync(force=not options['if_changed']):
+            self.stdout.write(self.style.SUCCESS("已按 TIME_ZONE 重新计算记录的本地日期"))
+        else:
+            self.stdout.write("TIME_ZONE 未改变, 不需要重新计算")
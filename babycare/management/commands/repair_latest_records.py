@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from babycare.models import BabyDate
+
+
+class Command(BaseCommand):
+    help = "把 BabyDate 的最近记录字段(喂奶、体温、尿布、生长数据)重新指向各自最新的一条"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--baby', type=int, dest='baby_date_id',
+            help="只修复该 BabyDate id 的最近记录")
+
+    def handle(self, *args, **options):
+        count = BabyDate.refresh_latest_records(baby_date_id=options['baby_date_id'])
+        self.stdout.write(self.style.SUCCESS(f"已修复 {count} 个宝宝的最近记录"))
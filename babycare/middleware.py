@@ -0,0 +1,30 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.http import HttpRequest
+from django.utils.functional import SimpleLazyObject
+
+from .acl import aget_acl, get_acl
+
+
+class BabyACLMiddleware:
+    """
+    为请求提供 request.baby_acl
+    首次使用时才加载, 与 BabyDate/BabyRelation 的权限方法共用同一份 ACL
+    异步视图中不能同步加载, 使用 await request.ababy_acl()
+    需要放在 AuthenticationMiddleware 之后
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request: HttpRequest):
+        # 异步模式下 get_response 返回协程, 由调用方 await
+        request.baby_acl = SimpleLazyObject(lambda: get_acl(request.user))  # type: ignore
+
+        async def ababy_acl():
+            return await aget_acl(await request.auser())  # type: ignore[attr-defined]
+        request.ababy_acl = ababy_acl  # type: ignore
+        return self.get_response(request)
@@ -0,0 +1,87 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:13
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_daily_summaries(apps, schema_editor):
+    """从已有记录计算每日汇总, 与 DailyBabySummary.rebuild 相同, 使用迁移时的模型"""
+    DailyBabySummary = apps.get_model('babycare', 'DailyBabySummary')
+    summaries = {}
+
+    def get_summary(baby_date_id, record_at):
+        key = (baby_date_id, timezone.localtime(record_at).date())
+        summary = summaries.get(key)
+        if summary is None:
+            summary = summaries[key] = DailyBabySummary(baby_date_id=key[0], date=key[1])
+        return summary
+
+    Feeding = apps.get_model('babycare', 'Feeding')
+    for baby_date_id, feed_at, amount in Feeding.objects.values_list(
+            'baby_date_id', 'feed_at', 'amount').iterator(chunk_size=2000):
+        summary = get_summary(baby_date_id, feed_at)
+        summary.feeding_count += 1
+        summary.feeding_total += amount
+    Diaper = apps.get_model('babycare', 'Diaper')
+    for baby_date_id, create_at, pee_amount, pooh_amount in Diaper.objects.values_list(
+            'baby_date_id', 'create_at', 'pee_amount', 'pooh_amount').iterator(chunk_size=2000):
+        summary = get_summary(baby_date_id, create_at)
+        summary.diaper_count += 1
+        summary.wet_diaper_count += int(pee_amount != '0')
+        summary.dirty_diaper_count += int(pooh_amount != '0')
+    BodyTemperature = apps.get_model('babycare', 'BodyTemperature')
+    for baby_date_id, measure_at, temperature in BodyTemperature.objects.order_by(
+            'measure_at').values_list('baby_date_id', 'measure_at', 'temperature').iterator(chunk_size=2000):
+        summary = get_summary(baby_date_id, measure_at)
+        summary.temperature_count += 1
+        if summary.temperature_min is None or temperature < summary.temperature_min:
+            summary.temperature_min = temperature
+        if summary.temperature_max is None or temperature > summary.temperature_max:
+            summary.temperature_max = temperature
+        summary.temperature_last = temperature
+        summary.temperature_last_at = measure_at
+    MiscRecord = apps.get_model('babycare', 'MiscRecord')
+    for baby_date_id, record_at in MiscRecord.objects.values_list(
+            'baby_date_id', 'record_at').iterator(chunk_size=2000):
+        get_summary(baby_date_id, record_at).misc_record_count += 1
+    DailyBabySummary.objects.bulk_create(summaries.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('babycare', '0021_babydate_gender'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='babydate',
+            name='gender',
+            field=models.CharField(blank=True, choices=[('M', '男'), ('F', '女')], max_length=1, null=True),
+        ),
+        migrations.CreateModel(
+            name='DailyBabySummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('feeding_count', models.PositiveIntegerField(default=0)),
+                ('feeding_total', models.FloatField(default=0)),
+                ('diaper_count', models.PositiveIntegerField(default=0)),
+                ('wet_diaper_count', models.PositiveIntegerField(default=0)),
+                ('dirty_diaper_count', models.PositiveIntegerField(default=0)),
+                ('temperature_count', models.PositiveIntegerField(default=0)),
+                ('temperature_min', models.FloatField(blank=True, null=True)),
+                ('temperature_max', models.FloatField(blank=True, null=True)),
+                ('temperature_last', models.FloatField(blank=True, null=True)),
+                ('temperature_last_at', models.DateTimeField(blank=True, null=True)),
+                ('misc_record_count', models.PositiveIntegerField(default=0)),
+                ('baby_date', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_summaries', to='babycare.babydate')),
+            ],
+            options={
+                'get_latest_by': 'date',
+                'constraints': [models.UniqueConstraint(fields=('baby_date', 'date'), name='unique_daily_summary')],
+            },
+        ),
+        migrations.RunPython(backfill_daily_summaries, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('babycare', '0022_dailybabysummary'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bodytemperature',
+            index=models.Index(fields=['baby_date', 'measure_at'], name='bodytemp_baby_measure_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diaper',
+            index=models.Index(fields=['baby_date', 'create_at'], name='diaper_baby_create_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='feeding',
+            index=models.Index(fields=['baby_date', 'feed_at'], name='feeding_baby_feed_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='growthdata',
+            index=models.Index(fields=['baby_date', 'record_at'], name='growth_baby_record_at_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='miscrecord',
+            index=models.Index(fields=['baby_date', 'record_at'], name='misc_baby_record_at_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('babycare', '0024_growthdata_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='babydate',
+            name='data_version',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
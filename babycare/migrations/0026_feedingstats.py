@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-18 10:55
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('babycare', '0025_babydate_data_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FeedingStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('current_hour', models.BigIntegerField(default=0)),
+                ('hour_buckets', models.JSONField(default=list)),
+                ('last_feed_at', models.DateTimeField(blank=True, null=True)),
+                ('baby_date', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='feeding_stats', to='babycare.babydate')),
+            ],
+        ),
+    ]
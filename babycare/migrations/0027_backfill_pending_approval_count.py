@@ -0,0 +1,29 @@
+from django.db import migrations
+
+
+def backfill_pending_approval_count(apps, schema_editor):
+    """根据已有的关系计算每个监护人的待审批申请数"""
+    BabyRelation = apps.get_model('babycare', 'BabyRelation')
+    User = apps.get_model('iuser', 'User')
+    pending_by_baby = {}
+    for baby_date_id in BabyRelation.objects.filter(status=0).values_list('baby_date_id', flat=True):
+        pending_by_baby[baby_date_id] = pending_by_baby.get(baby_date_id, 0) + 1
+    counts = {}
+    for user_id, baby_date_id in BabyRelation.objects.filter(status=2).values_list('request_by_id', 'baby_date_id'):
+        counts[user_id] = counts.get(user_id, 0) + pending_by_baby.get(baby_date_id, 0)
+    users = list(User.objects.filter(pk__in=[user_id for user_id, count in counts.items() if count]))
+    for user in users:
+        user.pending_approval_count = counts[user.pk]
+    User.objects.bulk_update(users, ['pending_approval_count'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('babycare', '0026_feedingstats'),
+        ('iuser', '0002_user_pending_approval_count'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_pending_approval_count, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:04
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_latest_records(apps, schema_editor):
+    """把每个宝宝的最近记录字段指向已有记录中最新的一条"""
+    BabyDate = apps.get_model('babycare', 'BabyDate')
+    updates = {}
+    for field, model_name, time_field in (
+        ('last_feeding', 'Feeding', 'feed_at'),
+        ('last_body_temperature', 'BodyTemperature', 'measure_at'),
+        ('last_diaper', 'Diaper', 'create_at'),
+        ('last_growth_data', 'GrowthData', 'record_at'),
+    ):
+        model = apps.get_model('babycare', model_name)
+        updates[field] = models.Subquery(
+            model.objects.filter(
+                baby_date=models.OuterRef('pk'),
+            ).order_by(f'-{time_field}', '-pk').values('pk')[:1]
+        )
+    BabyDate.objects.update(**updates)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('babycare', '0027_backfill_pending_approval_count'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='diaper',
+            options={'get_latest_by': 'create_at'},
+        ),
+        migrations.AddField(
+            model_name='babydate',
+            name='last_body_temperature',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='babycare.bodytemperature'),
+        ),
+        migrations.AddField(
+            model_name='babydate',
+            name='last_diaper',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='babycare.diaper'),
+        ),
+        migrations.AddField(
+            model_name='babydate',
+            name='last_feeding',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='babycare.feeding'),
+        ),
+        migrations.AddField(
+            model_name='babydate',
+            name='last_growth_data',
+            field=models.ForeignKey(editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='babycare.growthdata'),
+        ),
+        migrations.RunPython(backfill_latest_records, migrations.RunPython.noop),
+    ]
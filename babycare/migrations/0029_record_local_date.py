@@ -0,0 +1,137 @@
+from django.conf import settings
+from django.db import migrations, models
+from django.utils import timezone
+
+
+# (模型, 确定本地日期的时间字段)
+RECORD_TIME_FIELDS = (
+    ('Feeding', 'feed_at'),
+    ('BreastBumping', 'date'),
+    ('Diaper', 'create_at'),
+    ('BodyTemperature', 'measure_at'),
+    ('GrowthData', 'record_at'),
+    ('MiscRecord', 'record_at'),
+)
+
+BATCH_SIZE = 1000
+
+
+def backfill_local_date(apps, schema_editor):
+    """
+    按当前的 TIME_ZONE 计算已有记录的本地日期, 并记录使用的时区
+    在 Python 中转换时区, 不依赖数据库的时区表
+    """
+    for model_name, time_field in RECORD_TIME_FIELDS:
+        model = apps.get_model('babycare', model_name)
+        batch = []
+        for pk, record_at in model.objects.values_list('pk', time_field).iterator(chunk_size=BATCH_SIZE):
+            batch.append(model(pk=pk, local_date=timezone.localtime(record_at).date()))
+            if len(batch) >= BATCH_SIZE:
+                model.objects.bulk_update(batch, ['local_date'])
+                batch = []
+        model.objects.bulk_update(batch, ['local_date'])
+        if model.objects.filter(local_date__isnull=True).exists():
+            raise RuntimeError(f"{model_name} 仍有记录没有 local_date")
+    apps.get_model('babycare', 'RecordTimeZone').objects.create(name=settings.TIME_ZONE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('babycare', '0028_babydate_latest_records'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecordTimeZone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=64)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='feeding',
+            name='local_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='breastbumping',
+            name='local_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='diaper',
+            name='local_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='bodytemperature',
+            name='local_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='growthdata',
+            name='local_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='miscrecord',
+            name='local_date',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_local_date, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='feeding',
+            name='local_date',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='breastbumping',
+            name='local_date',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='diaper',
+            name='local_date',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='bodytemperature',
+            name='local_date',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='growthdata',
+            name='local_date',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AlterField(
+            model_name='miscrecord',
+            name='local_date',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='feeding',
+            index=models.Index(fields=['baby_date', 'local_date', 'feed_at'], name='feeding_baby_local_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='breastbumping',
+            index=models.Index(fields=['baby_date', 'local_date', 'date'], name='bumping_baby_local_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='diaper',
+            index=models.Index(fields=['baby_date', 'local_date', 'create_at'], name='diaper_baby_local_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bodytemperature',
+            index=models.Index(fields=['baby_date', 'local_date', 'measure_at'], name='bodytemp_baby_local_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='growthdata',
+            index=models.Index(fields=['baby_date', 'local_date', 'record_at'], name='growth_baby_local_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='miscrecord',
+            index=models.Index(fields=['baby_date', 'local_date', 'record_at'], name='misc_baby_local_date_idx'),
+        ),
+    ]
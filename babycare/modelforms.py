@@ -161,8 +161,17 @@ class MiscRecordForm(forms.ModelForm):
             'notes': '备注',
         }
 
-    def __init__(self, *args, **kwargs):
+    def __init__(self, *args, misc_items=None, **kwargs):
+        """
+        :param misc_items: 预先加载的该宝宝的用品列表, 传入后渲染时不再查询
+        """
         super().__init__(*args, **kwargs)
         baby_date = self['baby_date'].initial
+        field = self.fields['misc_item']
         if baby_date:
-            self.fields['misc_item'].queryset = models.MiscItem.objects.filter(baby_date=baby_date) # pyright: ignore[reportAttributeAccessIssue]
+            field.queryset = models.MiscItem.objects.filter(baby_date=baby_date) # pyright: ignore[reportAttributeAccessIssue]
+        if misc_items is not None:
+            field.choices = [  # pyright: ignore[reportAttributeAccessIssue]
+                ('', field.empty_label),  # pyright: ignore[reportAttributeAccessIssue]
+                *((item.pk, field.label_from_instance(item)) for item in misc_items),  # pyright: ignore[reportAttributeAccessIssue]
+            ]
@@ -1,11 +1,15 @@
 import datetime
+from dataclasses import dataclass
 
-from django.db import models
+from django.db import models, router, transaction
+from django.db.models.functions import Coalesce, Greatest, Least
 from django.utils import timezone
 from django.conf import settings
 
 from utils.datetime import get_local_date
 
+from .acl import get_acl
+
 
 class EarlierThanLMPError(Exception):
     """Exception raised when the date is earlier than the last menstrual period."""
@@ -22,6 +26,44 @@ class NotBornError(Exception):
     pass
 
 
+@dataclass(frozen=True, slots=True)
+class AgeSnapshot:
+    """
+    宝宝在某一天的各种年龄, 由 BabyDate.get_age_snapshot 一次计算
+    未出生时实际年龄和矫正年龄为 None
+    """
+    date: datetime.date  # 计算所用的日期
+    due_date: datetime.date  # 预产期
+    days_to_due: int  # 距离预产期的天数(足月后为负数)
+    gestational_age_days: int  # 孕周天数, 出生后即 PMA
+    ultrasound_gestational_age_days: int  # 超声矫正后的孕周天数
+    is_born: bool
+    is_preterm: bool
+    chronological_age_days: int | None  # 实际年龄天数
+    corrected_age_days: int | None  # 矫正年龄天数
+
+    @property
+    def is_due_passed(self) -> bool:
+        """是否已过预产期"""
+        return self.days_to_due < 0
+
+
+class AtomicSaveModel(models.Model):
+    """
+    保存和 post_save 的信号处理函数在同一事务中执行
+    babycare.signals 在保存后更新每日汇总、喂奶统计、最近记录和 data_version 等派生数据,
+    中途失败时连同记录一起回滚, 并发的写入也不会交错; 删除时 Django 已在同一事务中发送 post_delete
+    """
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        using = kwargs.get('using') or router.db_for_write(type(self), instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+
 class BabyDate(models.Model):
     last_menstrual_period = models.DateField()  # 末次月经
     nickname = models.CharField(max_length=20, null=True, unique=True)
@@ -35,6 +77,22 @@ class BabyDate(models.Model):
     )
     ultrasound_fixed_days = models.IntegerField(
         default=0)  # 超声定位矫正的天数 正数代表比末次月经晚，负数代表比末次月经早
+    # 宝宝的记录或关系每次变化都递增, 作为页面片段缓存键的一部分, 由 babycare.signals 维护
+    data_version = models.PositiveBigIntegerField(default=0, editable=False)
+    # 各种记录的最近一条, 首页的卡片只需要读取宝宝这一行, 由 babycare.signals 维护
+    last_feeding = models.ForeignKey(
+        'Feeding', on_delete=models.SET_NULL, null=True, editable=False, related_name='+')
+    last_body_temperature = models.ForeignKey(
+        'BodyTemperature', on_delete=models.SET_NULL, null=True, editable=False, related_name='+')
+    last_diaper = models.ForeignKey(
+        'Diaper', on_delete=models.SET_NULL, null=True, editable=False, related_name='+')
+    last_growth_data = models.ForeignKey(
+        'GrowthData', on_delete=models.SET_NULL, null=True, editable=False, related_name='+')
+
+    # 指向最近记录的字段, 记录模型的 get_latest_by 为排序字段
+    LATEST_RECORD_FIELDS = ('last_feeding', 'last_body_temperature', 'last_diaper', 'last_growth_data')
+    # 只在数据库中维护的字段
+    DB_MAINTAINED_FIELDS = ('data_version', *LATEST_RECORD_FIELDS)
 
     def days_to_lmp(self, date: datetime.date | None = None) -> int:
         """
@@ -158,25 +216,94 @@ class BabyDate(models.Model):
         """
         return self.is_born() and self.get_gestational_age_days(get_local_date(self.birthday)) < 259  # type: ignore
 
+    def get_age_snapshot(self, date: datetime.date | None = None) -> AgeSnapshot:
+        """
+        一次计算宝宝在某一天的各种年龄
+        结果与分别调用各个 get_*_days 方法一致, 但只取一次当前日期
+        早于末次月经的日期抛出异常 EarlierThanLMPError
+        :param date: 计算年龄的日期，默认为当前日期
+        :return: AgeSnapshot
+        """
+        if date is None:
+            date = get_local_date(timezone.now())
+        gestational_age_days = self.days_to_lmp(date)
+        due_date = self.get_due_date()
+        days_to_due = (due_date - date).days
+        is_born = self.is_born(date)
+        if is_born:
+            birth_date = get_local_date(self.birthday)  # type: ignore
+            is_preterm = (birth_date - self.last_menstrual_period).days + 1 < 259
+            chronological_age_days = (date - birth_date).days + 1
+            corrected_age_days = (
+                -days_to_due + 1 if is_preterm else chronological_age_days)
+        else:
+            is_preterm = False
+            chronological_age_days = None
+            corrected_age_days = None
+        return AgeSnapshot(
+            date=date,
+            due_date=due_date,
+            days_to_due=days_to_due,
+            gestational_age_days=gestational_age_days,
+            ultrasound_gestational_age_days=gestational_age_days - self.ultrasound_fixed_days,
+            is_born=is_born,
+            is_preterm=is_preterm,
+            chronological_age_days=chronological_age_days,
+            corrected_age_days=corrected_age_days,
+        )
+
     def __str__(self):
         return self.nickname
+
+    def save(self, *args, **kwargs):
+        # data_version 和最近记录只在数据库中更新, 用旧实例保存时不能把它们写回去
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                f.name for f in self._meta.concrete_fields
+                if not f.primary_key and f.name not in self.DB_MAINTAINED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def bump_data_version(cls, *baby_date_ids: int) -> None:
+        """
+        递增宝宝的数据版本, 使以旧版本为键缓存的页面片段不再被使用
+        """
+        cls.objects.filter(pk__in=baby_date_ids).update(data_version=models.F('data_version') + 1)
+
+    @classmethod
+    def refresh_latest_records(cls, baby_date_id: int | None = None, record_models=None) -> int:
+        """
+        用相关子查询把最近记录字段重新指向每种记录的最新一条, 一条 UPDATE 完成
+        记录的新增、修改、删除后调用, 删除的正是最新一条时会指向前一条
+        :param baby_date_id: 为 None 时更新所有宝宝, 用于修复
+        :param record_models: 只更新这些记录模型对应的字段, 默认全部
+        :return: 更新的宝宝数
+        """
+        updates = {}
+        for name in cls.LATEST_RECORD_FIELDS:
+            model = cls._meta.get_field(name).related_model
+            if record_models is not None and model not in record_models:
+                continue
+            latest_by = model._meta.get_latest_by
+            updates[name] = models.Subquery(
+                model.objects.filter(
+                    baby_date=models.OuterRef('pk'),
+                ).order_by(f'-{latest_by}', '-pk').values('pk')[:1]
+            )
+        if not updates:
+            return 0
+        queryset = cls.objects.all() if baby_date_id is None else cls.objects.filter(pk=baby_date_id)
+        return queryset.update(**updates)
     
     def can_be_edited_by(self, user) -> bool:
-        return BabyRelation.objects.filter(
-            baby_date=self.pk,
-            status__in=BabyRelation.editable_status(),
-            request_by=user,
-        ).exists()
+        return get_acl(user).can_edit(self.pk)
     
     def  can_be_accessed_by(self, user) -> bool:
-        return BabyRelation.objects.filter(
-            baby_date=self.pk,
-            status__in=BabyRelation.accessible_status(),
-            request_by=user,
-        ).exists()
+        return get_acl(user).can_access(self.pk)
 
 
-class BabyRelation(models.Model):
+class BabyRelation(AtomicSaveModel):
     REQUEST_STATUS = (
         (0, "申请中"),
         (1, "已拒绝"),
@@ -206,11 +333,7 @@ class BabyRelation(models.Model):
         """用户是否可以审批该申请
         即当前baby_date的关系中存在一个该用户为grantable_status的关系
         """
-        return BabyRelation.objects.filter(
-            baby_date=self.baby_date,
-            status__in=BabyRelation.grantable_status(),
-            request_by=user,
-        ).exists()
+        return get_acl(user).can_grant(self.baby_date_id)
     
     def status_css_class(self):
         STATUS_CSS_CLASSES ={
@@ -252,8 +375,106 @@ class BabyRelation(models.Model):
         """拒绝的状态"""
         return (1, )
 
+    @classmethod
+    def get_pending_inbox(cls, grantable_ids: list[int]) -> models.QuerySet:
+        """
+        一次查询获取用户可以审批的所有宝宝的待处理申请
+        :param grantable_ids: 用户可以授权的宝宝, 即 BabyACL.grantable_ids()
+        """
+        return cls.objects.filter(
+            baby_date__in=grantable_ids,
+            status__in=cls.pending_status(),
+        ).select_related('request_by', 'baby_date').order_by('request_at')
+
+    @classmethod
+    def refresh_pending_counts(cls, baby_date_id: int, *user_ids: int) -> None:
+        """
+        重新计算宝宝的监护人以及 user_ids 的待审批申请数 User.pending_approval_count
+        关系变化时调用, 一条 UPDATE 完成, 导航栏显示数量时不需要查询
+        :param user_ids: 关系变化的申请人, 其授权权限可能刚刚获得或失去
+        """
+        from django.contrib.auth import get_user_model
+        grantable_baby_dates = cls.objects.filter(
+            request_by=models.OuterRef(models.OuterRef('pk')),
+            status__in=cls.grantable_status(),
+        ).values('baby_date')
+        pending_count = cls.objects.filter(
+            baby_date__in=models.Subquery(grantable_baby_dates),
+            status__in=cls.pending_status(),
+        ).order_by().annotate(
+            count=models.Func(models.F('pk'), function='COUNT'),
+        ).values('count')
+        guardians = cls.objects.filter(
+            baby_date=baby_date_id,
+            status__in=cls.grantable_status(),
+        ).values('request_by')
+        get_user_model().objects.filter(
+            models.Q(pk__in=guardians) | models.Q(pk__in=user_ids)
+        ).update(pending_approval_count=Coalesce(models.Subquery(pending_count), 0))
+
+
+class LocalDateQuerySet(models.QuerySet):
+    """bulk_create 不调用 save, 写入前计算 local_date"""
+
+    def bulk_create(self, objs, *args, **kwargs):
+        objs = list(objs)
+        for obj in objs:
+            obj.set_local_date()
+        return super().bulk_create(objs, *args, **kwargs)
+
+
+class LocalDateRecord(AtomicSaveModel):
+    """
+    带有本地日期的记录
+    local_date 为 TIME_FIELD 在 settings.TIME_ZONE 下的日期, 保存和 bulk_create 时计算,
+    按天筛选和分组时用 (baby_date, local_date) 的等值查询代替时间范围
+    时区改变后由 RecordTimeZone.sync 重新计算
+    """
+    # 确定本地日期的时间字段
+    TIME_FIELD = ''
+
+    local_date = models.DateField(editable=False)
+
+    objects = LocalDateQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def set_local_date(self) -> None:
+        self.local_date = get_local_date(getattr(self, self.TIME_FIELD))
+
+    def save(self, *args, **kwargs):
+        self.set_local_date()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and self.TIME_FIELD in update_fields:
+            kwargs['update_fields'] = {*update_fields, 'local_date'}
+        super().save(*args, **kwargs)
+
+    @classmethod
+    def refresh_local_dates(cls, batch_size: int = 1000) -> int:
+        """
+        按当前的 settings.TIME_ZONE 重新计算所有记录的 local_date
+        在 Python 中转换时区, 不依赖数据库的时区表, 只写回日期改变的记录
+        :return: 更新的记录数
+        """
+        count = 0
+        batch = []
+        rows = cls.objects.values_list('pk', cls.TIME_FIELD, 'local_date').iterator(chunk_size=batch_size)
+        for pk, record_at, local_date in rows:
+            date = get_local_date(record_at)
+            if date != local_date:
+                batch.append(cls(pk=pk, local_date=date))
+            if len(batch) >= batch_size:
+                count += cls.objects.bulk_update(batch, ['local_date'])
+                batch = []
+        if batch:
+            count += cls.objects.bulk_update(batch, ['local_date'])
+        return count
+
+
+class Feeding(LocalDateRecord):
+    TIME_FIELD = 'feed_at'
 
-class Feeding(models.Model):
     baby_date = models.ForeignKey(
         BabyDate, on_delete=models.CASCADE, related_name='feedings')
     feed_at = models.DateTimeField(default=timezone.now)
@@ -261,6 +482,10 @@ class Feeding(models.Model):
     note = models.TextField(blank=True, null=True)
     class Meta:
         get_latest_by = 'feed_at'
+        indexes = [
+            models.Index(fields=['baby_date', 'feed_at'], name='feeding_baby_feed_at_idx'),
+            models.Index(fields=['baby_date', 'local_date', 'feed_at'], name='feeding_baby_local_date_idx'),
+        ]
 
     def __str__(self):
         feed_at_local = timezone.localtime(self.feed_at)
@@ -276,21 +501,30 @@ class Feeding(models.Model):
         :param limit: 返回的记录数量，默认为9
         :return: 最近的喂养记录列表
         """
-        return cls.objects.filter(baby_date=baby_date_id).order_by('-feed_at')[:limit]
+        return cls.objects.filter(baby_date=baby_date_id).order_by('-feed_at', '-pk')[:limit]
+
 
+class BreastBumping(LocalDateRecord):
+    TIME_FIELD = 'date'
 
-class BreastBumping(models.Model):
     baby_date = models.ForeignKey(
         BabyDate, on_delete=models.CASCADE, related_name='breast_bumpings')
     date = models.DateTimeField(default=timezone.now)
     amount = models.FloatField()  # 挤奶量，单位为毫升
     notes = models.TextField(blank=True, null=True)  # 备注
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['baby_date', 'local_date', 'date'], name='bumping_baby_local_date_idx'),
+        ]
+
     def __str__(self):
         return f"Breast Bumping on {self.date} - {self.amount}ml"
 
 
-class Diaper(models.Model):
+class Diaper(LocalDateRecord):
+    TIME_FIELD = 'create_at'
+
     POOH_AMOUNT_CHOICES = [
         ('0', '无'),
         ('1', '少量'),
@@ -362,12 +596,19 @@ class Diaper(models.Model):
         blank=True,
     )
 
+    class Meta:
+        get_latest_by = 'create_at'
+        indexes = [
+            models.Index(fields=['baby_date', 'create_at'], name='diaper_baby_create_at_idx'),
+            models.Index(fields=['baby_date', 'local_date', 'create_at'], name='diaper_baby_local_date_idx'),
+        ]
+
     def __str__(self):
         return f"Change Diaper at {self.create_at}"
 
     @classmethod
     def get_recent_diapers(cls, baby_date_id, limit=9):
-        return cls.objects.filter(baby_date=baby_date_id).order_by('-create_at')[:limit]
+        return cls.objects.filter(baby_date=baby_date_id).order_by('-create_at', '-pk')[:limit]
     
     def get_pooh_style(self):
         if self.pooh_color is not None:
@@ -391,7 +632,9 @@ class Diaper(models.Model):
         return self.PEE_COLOR_MAPPING.get(self.pee_color, 'inherit')
 
 
-class BodyTemperature(models.Model):
+class BodyTemperature(LocalDateRecord):
+    TIME_FIELD = 'measure_at'
+
     MEASUREMENT_CHOICES = [
         ('temporal', '额温'),
         ('tympanic', '耳温'),
@@ -409,6 +652,10 @@ class BodyTemperature(models.Model):
 
     class Meta:
         get_latest_by = 'measure_at'
+        indexes = [
+            models.Index(fields=['baby_date', 'measure_at'], name='bodytemp_baby_measure_at_idx'),
+            models.Index(fields=['baby_date', 'local_date', 'measure_at'], name='bodytemp_baby_local_date_idx'),
+        ]
 
     @classmethod
     def get_recent_temp(cls, baby_date_id, limit=7):
@@ -417,13 +664,15 @@ class BodyTemperature(models.Model):
         :param limit: 返回的记录数量，默认为7
         :return: 最近的体温记录列表
         """
-        return cls.objects.filter(baby_date=baby_date_id).order_by('-measure_at')[:limit]
+        return cls.objects.filter(baby_date=baby_date_id).order_by('-measure_at', '-pk')[:limit]
 
     def __str__(self):
         return f"Body Temperature on {self.measure_at} - {self.temperature}°C"
 
 
-class GrowthData(models.Model):
+class GrowthData(LocalDateRecord):
+    TIME_FIELD = 'record_at'
+
     baby_date = models.ForeignKey(
         BabyDate, on_delete=models.CASCADE, related_name='growth_datas')
     record_at = models.DateTimeField(default=timezone.now)
@@ -431,9 +680,14 @@ class GrowthData(models.Model):
     height = models.FloatField(blank=True, null=True)  # 身高，单位为厘米
     head_circumference = models.FloatField(blank=True, null=True)  # 头围，单位为厘米
     notes = models.TextField(blank=True, null=True)
+    updated_at = models.DateTimeField(auto_now=True)  # 用于生长曲线接口的条件请求
 
     class Meta:
         get_latest_by = 'record_at'
+        indexes = [
+            models.Index(fields=['baby_date', 'record_at'], name='growth_baby_record_at_idx'),
+            models.Index(fields=['baby_date', 'local_date', 'record_at'], name='growth_baby_local_date_idx'),
+        ]
 
     @classmethod
     def get_recent_growth_data(cls, baby_date_id, limit=10):
@@ -442,13 +696,13 @@ class GrowthData(models.Model):
         :param limit: 返回的记录数量，默认为10
         :return: 最近的生长数据记录列表
         """
-        return cls.objects.filter(baby_date=baby_date_id).order_by('-record_at')[:limit]
+        return cls.objects.filter(baby_date=baby_date_id).order_by('-record_at', '-pk')[:limit]
 
     def __str__(self):
         return f"Growth Data on {self.record_at} - Weight: {self.weight}kg, Height: {self.height}cm, Head Circumference: {self.head_circumference}cm"
 
 
-class MiscItem(models.Model):
+class MiscItem(AtomicSaveModel):
     baby_date = models.ForeignKey(
         BabyDate, on_delete=models.CASCADE, related_name='misc_items')
     item_name = models.CharField(max_length=40)
@@ -459,7 +713,9 @@ class MiscItem(models.Model):
         return f"{self.item_name}"
 
 
-class MiscRecord(models.Model):
+class MiscRecord(LocalDateRecord):
+    TIME_FIELD = 'record_at'
+
     baby_date = models.ForeignKey(
         BabyDate, on_delete=models.CASCADE, related_name="misc_records"
     )
@@ -468,9 +724,424 @@ class MiscRecord(models.Model):
     record_at = models.DateTimeField(default=timezone.now)
     notes = models.TextField(null=True, blank=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['baby_date', 'record_at'], name='misc_baby_record_at_idx'),
+            models.Index(fields=['baby_date', 'local_date', 'record_at'], name='misc_baby_local_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.misc_item.item_name} for {self.baby_date} at {self.record_at}"
     
     @classmethod
     def get_recent_records(cls, baby_date_id, limit=10):
-        return cls.objects.filter(baby_date=baby_date_id).order_by('-record_at')[:limit]
\ No newline at end of file
+        return cls.objects.filter(baby_date=baby_date_id).order_by('-record_at', '-pk')[:limit]
+
+class DailyBabySummary(models.Model):
+    """
+    每个宝宝每个本地日期的记录汇总
+    由 babycare.signals 在记录增删改时增量维护
+    可以用 rebuild_daily_summaries 命令从原始记录重建
+    """
+    baby_date = models.ForeignKey(
+        BabyDate, on_delete=models.CASCADE, related_name='daily_summaries')
+    date = models.DateField()  # settings.TIME_ZONE 下的本地日期
+    feeding_count = models.PositiveIntegerField(default=0)
+    feeding_total = models.FloatField(default=0)  # 喂养总量，单位为毫升
+    diaper_count = models.PositiveIntegerField(default=0)
+    wet_diaper_count = models.PositiveIntegerField(default=0)
+    dirty_diaper_count = models.PositiveIntegerField(default=0)
+    temperature_count = models.PositiveIntegerField(default=0)
+    temperature_min = models.FloatField(null=True, blank=True)
+    temperature_max = models.FloatField(null=True, blank=True)
+    temperature_last = models.FloatField(null=True, blank=True)
+    temperature_last_at = models.DateTimeField(null=True, blank=True)
+    misc_record_count = models.PositiveIntegerField(default=0)
+
+    # 计入汇总的记录模型及其确定本地日期的时间字段
+    RECORD_TIME_FIELDS = {
+        model: model.TIME_FIELD for model in (Feeding, Diaper, BodyTemperature, MiscRecord)
+    }
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['baby_date', 'date'], name='unique_daily_summary'),
+        ]
+        get_latest_by = 'date'
+
+    def __str__(self):
+        return f"Summary of {self.baby_date} on {self.date}"
+
+    @staticmethod
+    def get_counters(record) -> dict[str, float]:
+        """
+        获取一条记录对汇总计数字段的贡献
+        体温的最值和最后一次读数不是计数, 单独处理
+        :param record: Feeding, Diaper, BodyTemperature 或 MiscRecord 实例
+        :return: {字段名: 增量}
+        """
+        if isinstance(record, Feeding):
+            return {'feeding_count': 1, 'feeding_total': record.amount}
+        elif isinstance(record, Diaper):
+            return {
+                'diaper_count': 1,
+                'wet_diaper_count': int(record.pee_amount != '0'),
+                'dirty_diaper_count': int(record.pooh_amount != '0'),
+            }
+        elif isinstance(record, BodyTemperature):
+            return {'temperature_count': 1}
+        elif isinstance(record, MiscRecord):
+            return {'misc_record_count': 1}
+        raise TypeError(f"Unsupported record type: {type(record).__name__}")
+
+    @classmethod
+    def get_record_time(cls, record) -> datetime.datetime:
+        return getattr(record, cls.RECORD_TIME_FIELDS[type(record)])
+
+    @classmethod
+    def add_record(cls, record) -> None:
+        """
+        将一条记录计入所在日期的汇总
+        使用 F 表达式更新, 与该日的记录数量无关
+        """
+        record_at = cls.get_record_time(record)
+        summary, _ = cls.objects.get_or_create(
+            baby_date_id=record.baby_date_id,
+            date=record.local_date,
+        )
+        updates = {
+            field: models.F(field) + value
+            for field, value in cls.get_counters(record).items()
+        }
+        if isinstance(record, BodyTemperature):
+            temperature = models.Value(float(record.temperature), output_field=models.FloatField())
+            updates['temperature_min'] = Least(
+                Coalesce('temperature_min', temperature), temperature)
+            updates['temperature_max'] = Greatest(
+                Coalesce('temperature_max', temperature), temperature)
+            is_last = (
+                models.Q(temperature_last_at__isnull=True)
+                | models.Q(temperature_last_at__lte=record_at)
+            )
+            updates['temperature_last'] = models.Case(
+                models.When(is_last, then=temperature),
+                default=models.F('temperature_last'),
+            )
+            updates['temperature_last_at'] = models.Case(
+                models.When(is_last, then=models.Value(record_at)),
+                default=models.F('temperature_last_at'),
+            )
+        cls.objects.filter(pk=summary.pk).update(**updates)
+
+    @classmethod
+    def remove_record(cls, record) -> None:
+        """
+        将一条记录从所在日期的汇总中扣除
+        体温的最值和最后一次读数无法增量扣除, 从当日的原始体温记录重新计算
+        """
+        summaries = cls.objects.filter(
+            baby_date_id=record.baby_date_id,
+            date=record.local_date,
+        )
+        # 在汇总建立之前就存在的记录被删除时不应减为负数
+        summaries.update(**{
+            field: Greatest(models.F(field) - value, models.Value(0))
+            for field, value in cls.get_counters(record).items()
+        })
+        if isinstance(record, BodyTemperature):
+            temperatures = BodyTemperature.objects.filter(
+                baby_date_id=record.baby_date_id,
+                local_date=record.local_date,
+            )
+            aggregated = temperatures.aggregate(
+                temperature_min=models.Min('temperature'),
+                temperature_max=models.Max('temperature'),
+            )
+            last = temperatures.order_by('-measure_at').first()
+            summaries.update(
+                temperature_last=last.temperature if last else None,
+                temperature_last_at=last.measure_at if last else None,
+                **aggregated,
+            )
+
+    @classmethod
+    def rebuild(
+            cls,
+            baby_date_id: int | None = None,
+            start: datetime.date | None = None,
+            end: datetime.date | None = None,
+        ) -> int:
+        """
+        从原始记录重建汇总
+        :param baby_date_id: 只重建该宝宝的汇总，默认为所有宝宝
+        :param start: 重建的起始本地日期(包含)，默认不限
+        :param end: 重建的结束本地日期(包含)，默认不限
+        :return: 重建后的汇总条数
+        """
+        stale = cls.objects.all()
+        if baby_date_id is not None:
+            stale = stale.filter(baby_date_id=baby_date_id)
+        if start is not None:
+            stale = stale.filter(date__gte=start)
+        if end is not None:
+            stale = stale.filter(date__lte=end)
+
+        summaries: dict[tuple[int, datetime.date], DailyBabySummary] = dict()
+        for model, field in cls.RECORD_TIME_FIELDS.items():
+            records = model.objects.all()
+            if baby_date_id is not None:
+                records = records.filter(baby_date_id=baby_date_id)
+            if start is not None:
+                records = records.filter(local_date__gte=start)
+            if end is not None:
+                records = records.filter(local_date__lte=end)
+            for record in records.order_by(field).iterator(chunk_size=2000):
+                record_at = cls.get_record_time(record)
+                key = (record.baby_date_id, record.local_date)
+                summary = summaries.get(key)
+                if summary is None:
+                    summary = summaries[key] = cls(
+                        baby_date_id=key[0], date=key[1])
+                for counter, value in cls.get_counters(record).items():
+                    setattr(summary, counter, getattr(summary, counter) + value)
+                if isinstance(record, BodyTemperature):
+                    if summary.temperature_min is None or record.temperature < summary.temperature_min:
+                        summary.temperature_min = record.temperature
+                    if summary.temperature_max is None or record.temperature > summary.temperature_max:
+                        summary.temperature_max = record.temperature
+                    summary.temperature_last = record.temperature
+                    summary.temperature_last_at = record_at
+
+        with transaction.atomic():
+            stale.delete()
+            cls.objects.bulk_create(summaries.values(), batch_size=1000)
+        return len(summaries)
+
+
+@dataclass(frozen=True, slots=True)
+class FeedingMetrics:
+    """某一时刻的喂奶滚动统计, 间隔和日均量在记录不足时为 None"""
+    last_feed_at: datetime.datetime | None
+    count_24h: int
+    total_24h: float
+    interval_24h: datetime.timedelta | None  # 最近 24 小时的平均喂奶间隔
+    interval_7d: datetime.timedelta | None
+    daily_total_7d: float | None  # 最近 7 天的日均喂奶量, 单位为毫升
+
+
+class FeedingStats(models.Model):
+    """
+    每个宝宝最近 7 天的喂奶滚动统计
+    hour_buckets 是按小时的环形缓冲, 共 WINDOW_HOURS 格, 第 h % WINDOW_HOURS 格保存第 h 小时
+    (从 epoch 起的整点小时数) 的 [次数, 总量, 最早喂奶时间戳, 最晚喂奶时间戳],
+    current_hour 是缓冲中最新的小时, 更早 WINDOW_HOURS 小时以前的格子已被覆盖
+    由 babycare.signals 在喂奶记录增删改时增量维护, 读取时只遍历固定的格数, 与记录数量无关
+    可以用 rebuild_feeding_stats 命令从原始记录重建
+    """
+    WINDOW_HOURS = 7 * 24
+
+    baby_date = models.OneToOneField(
+        BabyDate, on_delete=models.CASCADE, related_name='feeding_stats')
+    current_hour = models.BigIntegerField(default=0)
+    hour_buckets = models.JSONField(default=list)
+    last_feed_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Feeding stats of {self.baby_date}"
+
+    @staticmethod
+    def get_hour(dt: datetime.datetime) -> int:
+        return int(dt.timestamp() // 3600)
+
+    def get_bucket(self, hour: int) -> list | None:
+        """第 hour 小时的格子, 不在缓冲范围内时返回 None"""
+        if not self.current_hour - self.WINDOW_HOURS < hour <= self.current_hour:
+            return None
+        return self.hour_buckets[hour % self.WINDOW_HOURS]
+
+    def advance(self, hour: int) -> None:
+        """把缓冲推进到第 hour 小时, 清空被覆盖的格子"""
+        if len(self.hour_buckets) != self.WINDOW_HOURS:
+            self.hour_buckets = [[0, 0.0, None, None] for _ in range(self.WINDOW_HOURS)]
+        if hour <= self.current_hour:
+            return
+        for h in range(max(self.current_hour + 1, hour - self.WINDOW_HOURS + 1), hour + 1):
+            self.hour_buckets[h % self.WINDOW_HOURS] = [0, 0.0, None, None]
+        self.current_hour = hour
+
+    def add_feeding(self, feeding: Feeding) -> None:
+        """将一条喂奶记录计入统计, 早于缓冲范围的记录只影响最后一次喂奶"""
+        hour = self.get_hour(feeding.feed_at)
+        self.advance(hour)
+        bucket = self.get_bucket(hour)
+        if bucket is not None:
+            timestamp = feeding.feed_at.timestamp()
+            bucket[0] += 1
+            bucket[1] += feeding.amount
+            bucket[2] = timestamp if bucket[2] is None else min(bucket[2], timestamp)
+            bucket[3] = timestamp if bucket[3] is None else max(bucket[3], timestamp)
+        if self.last_feed_at is None or feeding.feed_at > self.last_feed_at:
+            self.last_feed_at = feeding.feed_at
+
+    def refresh_hours(self, hours) -> None:
+        """
+        从原始记录重新计算若干小时的格子
+        删除和修改无法增量扣除最早和最晚时间, 只重算受影响的小时, 查询范围只有一小时
+        """
+        for hour in hours:
+            bucket = self.get_bucket(hour)
+            if bucket is None:
+                continue
+            start = datetime.datetime.fromtimestamp(hour * 3600, tz=datetime.timezone.utc)
+            values = Feeding.objects.filter(
+                baby_date_id=self.baby_date_id,
+                feed_at__gte=start,
+                feed_at__lt=start + datetime.timedelta(hours=1),
+            ).aggregate(
+                count=models.Count('id'),
+                total=models.Sum('amount'),
+                first=models.Min('feed_at'),
+                last=models.Max('feed_at'),
+            )
+            bucket[:] = [
+                values['count'],
+                values['total'] or 0.0,
+                values['first'] and values['first'].timestamp(),
+                values['last'] and values['last'].timestamp(),
+            ]
+
+    def refresh_last(self) -> None:
+        self.last_feed_at = Feeding.objects.filter(
+            baby_date_id=self.baby_date_id).aggregate(last=models.Max('feed_at'))['last']
+
+    def get_metrics(self, now: datetime.datetime | None = None) -> FeedingMetrics:
+        """
+        计算 now 时的统计, 窗口按整点小时对齐, 包含当前不完整的小时
+        :param now: 默认为当前时间
+        """
+        if now is None:
+            now = timezone.now()
+        now_hour = self.get_hour(now)
+        windows = dict()
+        for hours in (24, self.WINDOW_HOURS):
+            count, total, first, last = 0, 0.0, None, None
+            for hour in range(now_hour - hours + 1, now_hour + 1):
+                bucket = self.get_bucket(hour)
+                if bucket is None or not bucket[0]:
+                    continue
+                count += bucket[0]
+                total += bucket[1]
+                first = bucket[2] if first is None else min(first, bucket[2])
+                last = bucket[3] if last is None else max(last, bucket[3])
+            interval = None
+            if count >= 2:
+                interval = datetime.timedelta(seconds=(last - first) / (count - 1))
+            windows[hours] = (count, total, interval)
+        count_24h, total_24h, interval_24h = windows[24]
+        count_7d, total_7d, interval_7d = windows[self.WINDOW_HOURS]
+        return FeedingMetrics(
+            last_feed_at=self.last_feed_at,
+            count_24h=count_24h,
+            total_24h=total_24h,
+            interval_24h=interval_24h,
+            interval_7d=interval_7d,
+            daily_total_7d=total_7d * 24 / self.WINDOW_HOURS if count_7d else None,
+        )
+
+    @classmethod
+    def record_changed(cls, baby_date_id: int, added: Feeding | None = None, removed: Feeding | None = None) -> None:
+        """
+        喂奶记录变化后更新统计, 新增的记录增量计入, 删除和修改重算受影响的小时
+        还没有统计的宝宝从原始记录建立
+        :param added: 新增或修改后的记录
+        :param removed: 删除或修改前的记录
+        """
+        with transaction.atomic():
+            stats = cls.objects.select_for_update().filter(baby_date_id=baby_date_id).first()
+            if stats is None:
+                # 只有删除时不建立, 级联删除宝宝时统计可能已被删除
+                if added is not None:
+                    cls.rebuild(baby_date_id)
+                return
+            if removed is None:
+                stats.add_feeding(added)  # type: ignore[arg-type]
+            else:
+                hours = {cls.get_hour(removed.feed_at)}
+                if added is not None:
+                    stats.advance(cls.get_hour(added.feed_at))
+                    hours.add(cls.get_hour(added.feed_at))
+                stats.refresh_hours(hours)
+                stats.refresh_last()
+            stats.save()
+
+    @classmethod
+    def rebuild(cls, baby_date_id: int | None = None, now: datetime.datetime | None = None) -> int:
+        """
+        从原始记录重建统计, 只读取最近 WINDOW_HOURS 小时的记录,
+        窗口内没有记录的宝宝另外查询最后一次喂奶的时间
+        :param baby_date_id: 只重建该宝宝的统计，默认为所有宝宝
+        :param now: 缓冲的最新小时, 默认为当前时间
+        :return: 重建的统计条数
+        """
+        if now is None:
+            now = timezone.now()
+        if baby_date_id is not None:
+            baby_date_ids = [baby_date_id]
+        else:
+            baby_date_ids = list(BabyDate.objects.values_list('pk', flat=True))
+        stats: dict[int, FeedingStats] = dict()
+        for pk in baby_date_ids:
+            stats[pk] = cls(baby_date_id=pk)
+            stats[pk].advance(cls.get_hour(now))
+
+        feedings = Feeding.objects.filter(
+            feed_at__gt=now - datetime.timedelta(hours=cls.WINDOW_HOURS))
+        if baby_date_id is not None:
+            feedings = feedings.filter(baby_date_id=baby_date_id)
+        for feeding in feedings.order_by('feed_at').iterator(chunk_size=2000):
+            stats[feeding.baby_date_id].add_feeding(feeding)
+        empty = [pk for pk, item in stats.items() if item.last_feed_at is None]
+        if empty:
+            last_feedings = Feeding.objects.filter(baby_date__in=empty).values(
+                'baby_date').annotate(last=models.Max('feed_at'))
+            for values in last_feedings:
+                stats[values['baby_date']].last_feed_at = values['last']
+
+        with transaction.atomic():
+            cls.objects.filter(baby_date__in=baby_date_ids).delete()
+            cls.objects.bulk_create(stats.values(), batch_size=1000)
+        return len(stats)
+
+
+class RecordTimeZone(models.Model):
+    """
+    记录的 local_date 和每日汇总按哪个时区计算, 只有一行
+    settings.TIME_ZONE 改变后, migrate 时由 babycare.signals 调用 sync 重新计算,
+    也可以用 refresh_local_dates 命令手动重新计算
+    """
+    name = models.CharField(max_length=64)
+
+    # 带有 local_date 的记录模型
+    MODELS = (Feeding, BreastBumping, Diaper, BodyTemperature, GrowthData, MiscRecord)
+
+    def __str__(self):
+        return self.name
+
+    @classmethod
+    def sync(cls, force: bool = False) -> bool:
+        """
+        当前时区与计算时使用的时区不同时, 重新计算所有记录的 local_date 并重建每日汇总
+        :param force: 时区相同也重新计算
+        :return: 是否重新计算
+        """
+        stored = cls.objects.first()
+        if not force and stored is not None and stored.name == settings.TIME_ZONE:
+            return False
+        with transaction.atomic():
+            for model in cls.MODELS:
+                model.refresh_local_dates()
+            DailyBabySummary.rebuild()
+            cls.objects.all().delete()
+            cls.objects.create(name=settings.TIME_ZONE)
+        return True
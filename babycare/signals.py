@@ -0,0 +1,202 @@
+from django.db.models import QuerySet
+from django.db.models.signals import post_delete, post_migrate, post_save, pre_delete, pre_save
+from django.dispatch import Signal
+
+from utils.events import baby_channel, publish, user_channel
+
+from .acl import invalidate_acl
+from .models import (
+    BabyDate, BabyRelation, BodyTemperature, BreastBumping, DailyBabySummary, Diaper, Feeding,
+    FeedingStats, GrowthData, MiscItem, MiscRecord, RecordTimeZone)
+
+
+# 增删改时递增所属宝宝 data_version 的模型
+DATA_VERSION_MODELS = (
+    Feeding, BreastBumping, BodyTemperature, GrowthData, Diaper, MiscRecord, MiscItem, BabyRelation)
+
+# BabyDate 的最近记录字段指向的模型
+LATEST_RECORD_MODELS = tuple(
+    BabyDate._meta.get_field(name).related_model for name in BabyDate.LATEST_RECORD_FIELDS)
+
+# bulk_create 等绕过 post_save 的批量写入完成后发送
+# 参数: baby_date_id, models (写入的模型集合), start, end (受影响的本地日期范围, 包含)
+records_bulk_changed = Signal()
+
+
+def is_baby_cascade(origin) -> bool:
+    """
+    post_delete 的 origin 是否为宝宝, 即记录随宝宝级联删除
+    这时不必逐条更新该宝宝的汇总、统计、最近记录和 data_version
+    """
+    model = origin.model if isinstance(origin, QuerySet) else type(origin)
+    return model is BabyDate
+
+
+def remember_summarized_record(sender, instance, raw=False, **kwargs):
+    """修改记录前保存数据库中的旧值 以便从旧日期的汇总中扣除"""
+    if raw or instance.pk is None:
+        return
+    instance._summary_previous = sender.objects.filter(pk=instance.pk).first()
+
+
+def update_summary_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_summary_previous', None)
+    if not created and previous is not None:
+        DailyBabySummary.remove_record(previous)
+    DailyBabySummary.add_record(instance)
+    instance._summary_previous = None
+
+
+def update_summary_on_delete(sender, instance, origin=None, **kwargs):
+    if is_baby_cascade(origin):
+        return
+    DailyBabySummary.remove_record(instance)
+
+
+def rebuild_summary_on_bulk_change(sender, baby_date_id, models, start, end, **kwargs):
+    if not models.isdisjoint(DailyBabySummary.RECORD_TIME_FIELDS):
+        DailyBabySummary.rebuild(baby_date_id=baby_date_id, start=start, end=end)
+
+
+def update_feeding_stats_on_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_summary_previous', None)
+    if created or previous is None:
+        FeedingStats.record_changed(instance.baby_date_id, added=instance)
+    elif (previous.feed_at, previous.amount) != (instance.feed_at, instance.amount):
+        FeedingStats.record_changed(instance.baby_date_id, added=instance, removed=previous)
+
+
+def update_feeding_stats_on_delete(sender, instance, origin=None, **kwargs):
+    if is_baby_cascade(origin):
+        return
+    FeedingStats.record_changed(instance.baby_date_id, removed=instance)
+
+
+def rebuild_feeding_stats_on_bulk_change(sender, baby_date_id, models, **kwargs):
+    if Feeding in models:
+        FeedingStats.rebuild(baby_date_id=baby_date_id)
+
+
+def refresh_latest_record(sender, instance, raw=False, origin=None, **kwargs):
+    """记录增删改后重新指向最新一条, 与记录的写入在同一事务中 (见 AtomicSaveModel)"""
+    if raw or is_baby_cascade(origin):
+        return
+    BabyDate.refresh_latest_records(instance.baby_date_id, [sender])
+
+
+def refresh_latest_records_on_bulk_change(sender, baby_date_id, models, **kwargs):
+    if not models.isdisjoint(LATEST_RECORD_MODELS):
+        BabyDate.refresh_latest_records(baby_date_id, models)
+
+
+def bump_data_version_on_change(sender, instance, raw=False, origin=None, **kwargs):
+    if raw or is_baby_cascade(origin):
+        return
+    BabyDate.bump_data_version(instance.baby_date_id)
+
+
+def bump_data_version_on_bulk_change(sender, baby_date_id, **kwargs):
+    BabyDate.bump_data_version(baby_date_id)
+
+
+def publish_change(sender, instance, created=None, raw=False, origin=None, **kwargs):
+    """推送宝宝的记录、用品和关系的变化, post_delete 没有 created 参数"""
+    if raw:
+        return
+    data = {
+        'type': sender._meta.model_name,
+        'action': 'deleted' if created is None else 'created' if created else 'updated',
+        'baby': instance.baby_date_id,
+        'id': instance.pk,
+    }
+    if not is_baby_cascade(origin):
+        publish(baby_channel(instance.baby_date_id), data)
+    if sender is BabyRelation:
+        # 申请人的权限变化, 其连接需要更新订阅的宝宝
+        publish(user_channel(instance.request_by_id), {**data, 'status': instance.status})
+
+
+def publish_bulk_change(sender, baby_date_id, models, start, end, **kwargs):
+    publish(baby_channel(baby_date_id), {
+        'type': 'bulk',
+        'action': 'created',
+        'baby': baby_date_id,
+        'models': sorted(model._meta.model_name for model in models),
+    })
+
+
+def invalidate_relation_acl(sender, instance, **kwargs):
+    """关系的申请、审批和删除都会改变申请人的权限"""
+    invalidate_acl(
+        instance.request_by_id,
+        instance._state.fields_cache.get('request_by'),
+    )
+
+
+def refresh_pending_counts(sender, instance, raw=False, origin=None, **kwargs):
+    """申请的新增和审批改变监护人的待审批数, 审批为监护人也改变申请人的"""
+    if raw or is_baby_cascade(origin):
+        return
+    BabyRelation.refresh_pending_counts(instance.baby_date_id, instance.request_by_id)
+
+
+def remember_baby_relation_users(sender, instance, **kwargs):
+    """删除宝宝前记下有关系的用户, 删除后一次更新他们的待审批数"""
+    instance._relation_user_ids = list(
+        BabyRelation.objects.filter(baby_date=instance).values_list('request_by', flat=True))
+
+
+def refresh_pending_counts_on_baby_delete(sender, instance, **kwargs):
+    user_ids = getattr(instance, '_relation_user_ids', None)
+    if user_ids:
+        BabyRelation.refresh_pending_counts(instance.pk, *user_ids)
+
+
+def sync_record_time_zone(sender, app_config, apps, **kwargs):
+    """TIME_ZONE 改变后的第一次 migrate 重新计算记录的 local_date 和每日汇总"""
+    if app_config.label != 'babycare':
+        return
+    try:
+        # 只迁移到 local_date 之前的版本时跳过
+        apps.get_model('babycare', 'RecordTimeZone')
+    except LookupError:
+        return
+    RecordTimeZone.sync()
+
+
+post_save.connect(invalidate_relation_acl, sender=BabyRelation)
+post_delete.connect(invalidate_relation_acl, sender=BabyRelation)
+post_save.connect(refresh_pending_counts, sender=BabyRelation)
+post_delete.connect(refresh_pending_counts, sender=BabyRelation)
+pre_delete.connect(remember_baby_relation_users, sender=BabyDate)
+post_delete.connect(refresh_pending_counts_on_baby_delete, sender=BabyDate)
+
+# 需要在 update_summary_on_save 清除修改前的记录之前连接
+post_save.connect(update_feeding_stats_on_save, sender=Feeding)
+post_delete.connect(update_feeding_stats_on_delete, sender=Feeding)
+
+for model in DailyBabySummary.RECORD_TIME_FIELDS:
+    pre_save.connect(remember_summarized_record, sender=model)
+    post_save.connect(update_summary_on_save, sender=model)
+    post_delete.connect(update_summary_on_delete, sender=model)
+
+for model in LATEST_RECORD_MODELS:
+    post_save.connect(refresh_latest_record, sender=model)
+    post_delete.connect(refresh_latest_record, sender=model)
+
+for model in DATA_VERSION_MODELS:
+    post_save.connect(bump_data_version_on_change, sender=model)
+    post_delete.connect(bump_data_version_on_change, sender=model)
+    post_save.connect(publish_change, sender=model)
+    post_delete.connect(publish_change, sender=model)
+
+records_bulk_changed.connect(rebuild_summary_on_bulk_change)
+records_bulk_changed.connect(rebuild_feeding_stats_on_bulk_change)
+records_bulk_changed.connect(refresh_latest_records_on_bulk_change)
+records_bulk_changed.connect(bump_data_version_on_bulk_change)
+records_bulk_changed.connect(publish_bulk_change)
+post_migrate.connect(sync_record_time_zone)
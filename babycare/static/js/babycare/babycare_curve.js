@@ -97,10 +97,24 @@ document.addEventListener('DOMContentLoaded', function () {
         "90%": {"color": "var(--bs-warning)", "dashArray": "7,3"},
         "97%": {"color": "var(--bs-danger)", "dashArray": "7,5,2,5"},
     };
-    document.querySelectorAll(".fenton-curve").forEach(function (element) {
+    // 同一个宝宝的三条曲线共用一次生长数据请求
+    const growthSeriesRequests = {};
+    // 服务端按宽度降采样, 约每 2 像素一个点
+    function fetchGrowthData(element) {
+        const points = `?points=${Math.floor(width / 2)}`;
+        const growthSeriesUrl = element.dataset.growthSeriesUrl && element.dataset.growthSeriesUrl + points;
+        if (!growthSeriesUrl) {
+            return fetch(element.dataset.curveDataUrl + points).then(response => response.json());
+        }
+        if (!(growthSeriesUrl in growthSeriesRequests)) {
+            growthSeriesRequests[growthSeriesUrl] = fetch(growthSeriesUrl).then(response => response.json());
+        }
+        return growthSeriesRequests[growthSeriesUrl].then(series => series[element.dataset.fentonType] || []);
+    }
+
+    function renderCurve(element) {
         const startDate = new Date(element.dataset.startDate);
         const fentonCurveUrl = element.dataset.fentonCurveUrl;
-        const curveDataUrl = element.dataset.curveDataUrl;
         const fentonType = element.dataset.fentonType;
         const unitName = fentonType === "weight" ? "kg" : "cm"
 
@@ -109,8 +123,7 @@ document.addEventListener('DOMContentLoaded', function () {
             return;
         }
 
-        fetch(curveDataUrl)
-            .then(response => response.json())
+        fetchGrowthData(element)
             .then(growthData => {
                 if (growthData.length === 0) {
                     element.textContent = "尚未记录宝宝相关数据";
@@ -228,7 +241,7 @@ document.addEventListener('DOMContentLoaded', function () {
                             .attr("r", 3)
                             .attr("fill", "var(--bs-primary)");
 
-                        d3.select(growthDataGroup.selectAll("circle").nodes()[0])
+                        d3.select(growthDataGroup.selectAll("circle").nodes().at(-1))
                             .attr("stroke", "var(--bs-secondary)")
                             .attr("stroke-width", 2)
                             .attr("r", 4);
@@ -259,5 +272,24 @@ document.addEventListener('DOMContentLoaded', function () {
                         element.append(svg.node());
                     });
             });
+    }
+
+    // 优先使用服务端渲染的 SVG(img.growth-chart), 加载失败时在客户端绘制
+    document.querySelectorAll(".fenton-curve").forEach(function (element) {
+        const chart = element.querySelector("img.growth-chart");
+        if (!chart) {
+            renderCurve(element);
+            return;
+        }
+        function fallback() {
+            chart.remove();
+            renderCurve(element);
+        }
+        // 脚本运行前已经失败的由 onerror 属性标记
+        if (chart.dataset.failed) {
+            fallback();
+        } else {
+            chart.addEventListener("error", fallback);
+        }
     });
 });
\ No newline at end of file
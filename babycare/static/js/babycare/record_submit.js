@@ -0,0 +1,53 @@
+/*
+ * 宝宝记录的表单(record-form类)用XHR提交, 只替换所在分区的记录表格(data-record-table), 不重新加载整个dashboard
+ * 表单无效时给出错的输入框加上is-invalid, 其他错误退回普通的表单提交
+*/
+document.addEventListener('DOMContentLoaded', function () {
+    const recordForms = document.querySelectorAll('form.record-form');
+    recordForms.forEach(function (form) {
+        form.addEventListener('submit', function (event) {
+            event.preventDefault();
+            const table = form.closest('.switcher-content').querySelector('[data-record-table]');
+            const button = form.querySelector('button[type="submit"]');
+            form.querySelectorAll('.is-invalid').forEach(function (input) {
+                input.classList.remove('is-invalid');
+            });
+            button.disabled = true;
+            fetch(form.action, {
+                method: 'POST',
+                body: new FormData(form),
+                credentials: 'same-origin',
+                headers: {
+                    'X-Requested-With': 'XMLHttpRequest',
+                    'Accept': 'text/html',
+                },
+            }).then(function (response) {
+                if (response.status === 400) {
+                    return response.json().then(function (data) {
+                        Object.keys(data.errors).forEach(function (name) {
+                            const input = form.querySelector(`[name="${name}"]`);
+                            if (input) {
+                                input.classList.add('is-invalid');
+                            }
+                        });
+                    });
+                }
+                if (!response.ok) {
+                    throw new Error(`submit failed: ${response.status}`);
+                }
+                return response.text().then(function (html) {
+                    table.innerHTML = html;
+                    table.querySelectorAll('[data-bs-toggle="tooltip"]').forEach(function (el) {
+                        new bootstrap.Tooltip(el);
+                    });
+                    form.reset();
+                });
+            }).catch(function (error) {
+                console.log(error);
+                form.submit();
+            }).finally(function () {
+                button.disabled = false;
+            });
+        });
+    });
+});
@@ -0,0 +1,296 @@
+"""
+生成用于压测的模拟数据
+
+按固定的随机种子生成用户、宝宝及其 BabyRelation 关系网、家庭成员关系,
+以及多年的喂养、尿布、体温、生长、用品记录, 购物清单和日历任务。
+所有记录攒成批次 bulk_create, 每批一个事务, 不触发 post_save;
+记录写完后对每个宝宝发送 records_bulk_changed 信号重建每日汇总等派生数据。
+同样的参数和种子在空库中生成的数据相同。
+"""
+import datetime
+import random
+import time
+from collections import defaultdict
+from typing import Callable
+
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.contrib.contenttypes.models import ContentType
+from django.db import models as db_models, transaction
+from django.utils import timezone
+
+from relation.models import Member, Relation
+from shopping_list.models import ItemCategory, ItemRecord, ShoppingList
+from task_calendar.models import TaskCalendar
+
+from . import models
+from .signals import records_bulk_changed
+
+
+GESTATION_DAYS = (238, 294)  # 出生时胎龄 34 到 42 周
+FEEDINGS_PER_DAY = 8
+DIAPERS_PER_DAY = 7
+MISC_ITEM_NAMES = ('维生素D', '铁剂', '益生菌', '钙剂', '鱼肝油', '奶粉')
+SHOPPING_CATEGORIES = ('奶粉', '纸尿裤', '湿巾', '衣物', '玩具', '药品', '洗护用品', '辅食')
+TASK_DESCRIPTIONS = ('疫苗接种', '儿保体检', '复查黄疸', '听力筛查', '购买奶粉', '预约理发')
+POOH_COLORS = ('金黄色', '黄褐色', '浅黄色', '绿色（正常）', '白色颗粒（奶瓣）')
+
+
+class BulkWriter:
+    """按模型缓存待插入的对象, 每攒够 batch_size 个在一个事务中写入"""
+
+    def __init__(self, batch_size: int = 5000):
+        self.batch_size = batch_size
+        self.pending: dict[type[db_models.Model], list] = defaultdict(list)
+        self.counts: dict[str, int] = defaultdict(int)
+
+    def add(self, obj: db_models.Model) -> None:
+        pending = self.pending[type(obj)]
+        pending.append(obj)
+        if len(pending) >= self.batch_size:
+            self.flush(type(obj))
+
+    def flush(self, model: type[db_models.Model] | None = None) -> None:
+        for m in [model] if model is not None else list(self.pending):
+            objs = self.pending.pop(m, [])
+            if objs:
+                with transaction.atomic():
+                    m.objects.bulk_create(objs, batch_size=self.batch_size)
+                self.counts[m._meta.label] += len(objs)
+
+
+class SyntheticDataGenerator:
+    """
+    :param users: 用户数, 宝宝的监护人和亲友从中选取
+    :param babies: 宝宝数
+    :param years: 每个宝宝最多的记录年数, 出生日期在此范围内随机
+    :param seed: 随机种子
+    :param prefix: 用户名、宝宝昵称和清单名的前缀, 避免与已有数据冲突
+    :param batch_size: 每批写入的记录数
+    :param log: 输出进度的函数
+    """
+
+    def __init__(
+            self,
+            users: int = 50,
+            babies: int = 20,
+            years: float = 1,
+            seed: int = 0,
+            prefix: str = 'syn',
+            batch_size: int = 5000,
+            log: Callable[[str], None] | None = None,
+        ):
+        if users < 2:
+            raise ValueError("至少需要 2 个用户")
+        self.user_count = users
+        self.baby_count = babies
+        self.days = max(int(years * 365), 1)
+        self.random = random.Random(seed)
+        self.prefix = f'{prefix}{seed}-'
+        self.writer = BulkWriter(batch_size)
+        self.log = log or (lambda message: None)
+        self.now = timezone.now().replace(microsecond=0)
+        self.guardians: dict[int, int] = dict()  # {baby_date_id: 主要监护人 user_id}
+
+    def generate(self, rebuild: bool = True) -> dict[str, int]:
+        """
+        :param rebuild: 是否发送 records_bulk_changed 重建派生数据
+        :return: {模型: 写入条数}
+        """
+        started = time.monotonic()
+        users = self.create_users()
+        babies = self.create_babies()
+        self.create_relations(users, babies)
+        for i, baby in enumerate(babies, start=1):
+            self.create_records(baby)
+            self.create_tasks(baby)
+            self.log(f"宝宝 {i}/{len(babies)} 的记录已生成")
+        self.create_shopping_lists(len(babies))
+        self.writer.flush()
+        if rebuild:
+            for baby in babies:
+                records_bulk_changed.send(
+                    sender=type(self),
+                    baby_date_id=baby.pk,
+                    models=frozenset(models.DailyBabySummary.RECORD_TIME_FIELDS),
+                    start=timezone.localtime(baby.birthday).date(),
+                    end=timezone.localdate(self.now),
+                )
+        self.log(f"共写入 {sum(self.writer.counts.values())} 条, 用时 {time.monotonic() - started:.1f}s")
+        return dict(self.writer.counts)
+
+    def create_users(self) -> list:
+        User = get_user_model()
+        # 哈希很慢, 所有模拟用户共用一个密码
+        password = make_password('password')
+        User.objects.bulk_create([
+            User(username=f'{self.prefix}u{i}', password=password)
+            for i in range(self.user_count)
+        ], batch_size=self.writer.batch_size)
+        users = list(User.objects.filter(
+            username__startswith=f'{self.prefix}u').order_by('pk'))
+        self.writer.counts[User._meta.label] += len(users)
+        Member.objects.bulk_create([
+            Member(user=user, gender=self.random.choice('MFU'))
+            for user in users
+        ], batch_size=self.writer.batch_size)
+        self.writer.counts[Member._meta.label] += len(users)
+        return users
+
+    def create_babies(self) -> list[models.BabyDate]:
+        today = timezone.localdate(self.now)
+        babies = []
+        for i in range(self.baby_count):
+            age_days = self.random.randint(1, self.days)
+            gestation = self.random.randint(*GESTATION_DAYS)
+            birth_date = today - datetime.timedelta(days=age_days)
+            lmp = birth_date - datetime.timedelta(days=gestation)
+            birthday = timezone.make_aware(datetime.datetime.combine(
+                birth_date, datetime.time(self.random.randint(0, 23), self.random.randint(0, 59))))
+            babies.append(models.BabyDate(
+                nickname=f'{self.prefix}b{i}',
+                last_menstrual_period=lmp,
+                estimated_due_date=lmp + datetime.timedelta(days=280),
+                birthday=birthday,
+                gender=self.random.choice('MF'),
+                ultrasound_fixed_days=self.random.randint(-7, 7),
+            ))
+        models.BabyDate.objects.bulk_create(babies)
+        babies = list(models.BabyDate.objects.filter(
+            nickname__startswith=f'{self.prefix}b').order_by('pk'))
+        self.writer.counts[models.BabyDate._meta.label] += len(babies)
+        return babies
+
+    def create_relations(self, users: list, babies: list[models.BabyDate]) -> None:
+        """
+        每个宝宝 1 到 2 个监护人(status=2, 两人为配偶), 若干亲人、关心的人,
+        少量待审批和已拒绝的申请; 亲人中的一部分记为监护人的父母
+        """
+        members = {m.user_id: m for m in Member.objects.filter(user__in=users)}
+        for baby in babies:
+            family = self.random.sample(users, min(len(users), self.random.randint(2, 8)))
+            guardians = family[:self.random.randint(1, 2)]
+            approver = guardians[0]
+            self.guardians[baby.pk] = approver.pk
+            approve_at = baby.birthday
+            for user in guardians:
+                self.writer.add(models.BabyRelation(
+                    baby_date=baby, request_by=user, status=2,
+                    approve_by=approver, approve_at=approve_at))
+            for user in family[len(guardians):]:
+                status = self.random.choices((3, 4, 0, 1), weights=(5, 3, 1, 1))[0]
+                approved = status != 0
+                self.writer.add(models.BabyRelation(
+                    baby_date=baby, request_by=user, status=status,
+                    approve_by=approver if approved else None,
+                    approve_at=approve_at if approved else None))
+                if status == 3 and self.random.random() < 0.5:
+                    self.writer.add(Relation(
+                        member1=members[user.pk], member2=members[approver.pk],
+                        relation_type='P'))
+            if len(guardians) == 2:
+                self.writer.add(Relation(
+                    member1=members[guardians[0].pk], member2=members[guardians[1].pk],
+                    relation_type='S', start_date=baby.last_menstrual_period))
+        self.writer.flush(models.BabyRelation)
+
+    def _times(self, day: datetime.datetime, count: int, jitter: int = 40) -> list[datetime.datetime]:
+        """一天中大致均匀分布的 count 个时间, 各自随机偏移至多 jitter 分钟"""
+        step = 24 * 60 // count
+        return [
+            day + datetime.timedelta(minutes=i * step + self.random.randint(0, jitter))
+            for i in range(count)
+        ]
+
+    def create_records(self, baby: models.BabyDate) -> None:
+        rand = self.random
+        models.MiscItem.objects.bulk_create([
+            models.MiscItem(baby_date=baby, item_name=name, created_by_id=self.guardians[baby.pk])
+            for name in rand.sample(MISC_ITEM_NAMES, rand.randint(1, 3))
+        ])
+        # MySQL 的 bulk_create 不会回填主键
+        items = list(models.MiscItem.objects.filter(baby_date=baby).order_by('pk'))
+        self.writer.counts[models.MiscItem._meta.label] += len(items)
+
+        birth = timezone.localtime(baby.birthday)
+        first_day = birth.replace(hour=0, minute=0, second=0) + datetime.timedelta(days=1)
+        days = (self.now - first_day).days
+        weight = rand.uniform(1.8, 3.8)
+        height = rand.uniform(42, 52)
+        head = rand.uniform(30, 35)
+        amount = rand.uniform(20, 40)
+        for d in range(days):
+            day = first_day + datetime.timedelta(days=d)
+            amount = min(amount + rand.uniform(0, 1.2), 220)
+            for at in self._times(day, FEEDINGS_PER_DAY + rand.randint(-1, 1)):
+                self.writer.add(models.Feeding(
+                    baby_date=baby, feed_at=at, amount=round(amount + rand.uniform(-15, 15), 0)))
+            for at in self._times(day, DIAPERS_PER_DAY + rand.randint(-2, 2)):
+                pooh = rand.choices('0123', weights=(5, 2, 2, 1))[0]
+                self.writer.add(models.Diaper(
+                    baby_date=baby, create_at=at,
+                    pooh_amount=pooh, pooh_color=None if pooh == '0' else rand.choice(POOH_COLORS),
+                    pee_amount=rand.choices('0123', weights=(1, 3, 5, 1))[0],
+                    pee_color=rand.choice('012')))
+            for at in self._times(day, rand.randint(1, 3), jitter=120):
+                fever = rand.random() < 0.02
+                self.writer.add(models.BodyTemperature(
+                    baby_date=baby, measure_at=at,
+                    temperature=round(rand.uniform(37.6, 39) if fever else rand.gauss(36.8, 0.2), 1),
+                    measurement=rand.choice(('temporal', 'tympanic', 'axillary'))))
+            for item in items:
+                if rand.random() < 0.9:
+                    self.writer.add(models.MiscRecord(
+                        baby_date=baby, misc_item=item,
+                        record_at=day + datetime.timedelta(hours=rand.randint(7, 21))))
+            if d % 7 == 0:
+                weight += rand.uniform(0.1, 0.25) if d < 180 else rand.uniform(0.02, 0.1)
+                height += rand.uniform(0.5, 1) if d < 180 else rand.uniform(0.1, 0.4)
+                head += rand.uniform(0.2, 0.4) if d < 180 else rand.uniform(0.02, 0.1)
+                self.writer.add(models.GrowthData(
+                    baby_date=baby, record_at=day + datetime.timedelta(hours=10),
+                    weight=round(weight, 2), height=round(height, 1),
+                    head_circumference=round(head, 1)))
+            if rand.random() < 0.3:
+                self.writer.add(models.BreastBumping(
+                    baby_date=baby, date=day + datetime.timedelta(hours=rand.randint(6, 22)),
+                    amount=round(rand.uniform(30, 150), 0)))
+
+    def create_tasks(self, baby: models.BabyDate) -> None:
+        content_type = ContentType.objects.get_for_model(models.BabyDate)
+        birth = baby.birthday
+        for _ in range(self.random.randint(5, 20)):
+            start = birth + datetime.timedelta(days=self.random.randint(0, max((self.now - birth).days, 1) + 30))
+            self.writer.add(TaskCalendar(
+                description=self.random.choice(TASK_DESCRIPTIONS),
+                start_date=start,
+                end_date=start + datetime.timedelta(days=self.random.randint(0, 7)),
+                frequency=self.random.choice(('one_time', 'one_time', 'weekly', 'monthly')),
+                is_completed=start < self.now and self.random.random() < 0.7,
+                create_by_id=self.guardians[baby.pk],
+                target_ct=content_type,
+                target_id=baby.pk,
+            ))
+
+    def create_shopping_lists(self, count: int) -> None:
+        lists = [
+            ShoppingList(name=f'{self.prefix}l{i}', description='模拟购物清单')
+            for i in range(count)
+        ]
+        ShoppingList.objects.bulk_create(lists)
+        lists = list(ShoppingList.objects.filter(
+            name__startswith=f'{self.prefix}l').order_by('pk'))
+        self.writer.counts[ShoppingList._meta.label] += len(lists)
+        categories = []
+        for shopping_list in lists:
+            for name in self.random.sample(SHOPPING_CATEGORIES, self.random.randint(2, 6)):
+                categories.append(ItemCategory(
+                    name=name, shopping_list=shopping_list,
+                    status=self.random.choice([s for s, _ in ItemCategory.STATUS_CHOICES])))
+        ItemCategory.objects.bulk_create(categories, batch_size=self.writer.batch_size)
+        self.writer.counts[ItemCategory._meta.label] += len(categories)
+        for category in ItemCategory.objects.filter(shopping_list__in=lists).order_by('pk'):
+            for i in range(self.random.randint(1, 5)):
+                self.writer.add(ItemRecord(
+                    name=f'{category.name}{i + 1}', category=category,
+                    quantity=self.random.randint(1, 6)))
@@ -3,20 +3,23 @@ from datetime import datetime, timedelta
 from django import template
 from django.utils import timezone
 
-from ..models import BabyDate
+from ..models import AgeSnapshot, BabyDate
 
 
 register = template.Library()
 
 @register.filter
-def get_gestational_age_weeks(baby_date: BabyDate, ultrasound_fixed: bool = False) -> str:
+def get_gestational_age_weeks(age: AgeSnapshot | BabyDate, ultrasound_fixed: bool = False) -> str:
     """
     获取孕周的周数
-    :param baby_date: BabyDate 实例
+    :param age: AgeSnapshot 实例, 传入 BabyDate 实例时按当前日期计算
     :param ultrasound_fixed: 是否使用超声定位反推的孕周初始日期
     :return: 孕周周数
     """
-    days = baby_date.get_gestational_age_days(date=None, ultrasound_fixed=ultrasound_fixed)
+    if isinstance(age, AgeSnapshot):
+        days = age.ultrasound_gestational_age_days if ultrasound_fixed else age.gestational_age_days
+    else:
+        days = age.get_gestational_age_days(date=None, ultrasound_fixed=ultrasound_fixed)
     days = days - 1
     return f"{days // 7}周{days % 7}天" if days >= 0 else f"尚未开始计算孕周"
 
@@ -40,4 +43,13 @@ def zh_timesince(dt: datetime, conference: datetime | None = None):
     if delta.seconds > 0:
         res += f"{delta.seconds // 3600}小时"
         res += f"{delta.seconds % 3600 // 60}分钟"
-    return res
\ No newline at end of file
+    return res
+
+@register.filter
+def zh_duration(delta: timedelta | None) -> str:
+    """时长, 精确到分钟, 如 2小时30分钟"""
+    if delta is None:
+        return ""
+    minutes = int(delta.total_seconds() // 60)
+    hours, minutes = divmod(minutes, 60)
+    return f"{hours}小时{minutes}分钟" if hours else f"{minutes}分钟"
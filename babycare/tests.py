@@ -1,10 +1,68 @@
-from django.test import TestCase
+import dataclasses
+import datetime
+import gzip
+import io
+import json
+from unittest import mock
+from zoneinfo import ZoneInfo
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import AsyncClient, Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
 from django.utils import timezone
 
-from babycare.models import BabyDate, EarlierThanLMPError, LaterThanBirthError, NotBornError
+from babycare import benchmarks, fenton, views
+from babycare.acl import get_acl
+from babycare.aggregates import aggregate_series
+from babycare.importers import EventImporter, iter_json_array
+from babycare.loaders import get_recent_by_baby, load_recent_section, load_recent_sections
+from babycare.synthetic import SyntheticDataGenerator
+from babycare.models import (
+    BabyDate, EarlierThanLMPError, LaterThanBirthError, NotBornError,
+    Feeding, BodyTemperature, Diaper, DailyBabySummary, FeedingStats, GrowthData, MiscItem, MiscRecord,
+    BabyRelation, RecordTimeZone)
+from iuser.models import User
+from shopping_list.models import ShoppingList
+from task_calendar.models import TaskCalendar
+from utils.datetime import get_local_date, get_range_of_date
+from utils.downsample import lttb, minmax
+from utils.events import TASKS_CHANNEL, baby_channel, user_channel
+from utils.pagination import KeysetPaginator
 
 
 class BabyDateTestCase(TestCase):
+    def create_baby_with_records(self, count):
+        user = User.objects.create_user(f'deleting{count}')
+        baby = BabyDate.objects.create(
+            nickname='deleting', last_menstrual_period=timezone.now().date() - timezone.timedelta(days=300))
+        BabyRelation.objects.create(baby_date=baby, request_by=user, status=2)
+        item = MiscItem.objects.create(baby_date=baby, item_name='维生素D', created_by=user)
+        now = timezone.now()
+        for i in range(count):
+            at = now - timezone.timedelta(hours=i)
+            Feeding.objects.create(baby_date=baby, amount=60, feed_at=at)
+            Diaper.objects.create(baby_date=baby, create_at=at)
+            BodyTemperature.objects.create(baby_date=baby, temperature=36.5, measure_at=at)
+            MiscRecord.objects.create(baby_date=baby, misc_item=item, record_at=at)
+        return baby
+
+    def test_delete_with_records(self):
+        # 级联删除的记录不再逐条更新宝宝的派生数据, 查询次数与记录数无关
+        baby = self.create_baby_with_records(1)
+        with CaptureQueriesContext(connection) as queries:
+            baby.delete()
+        baby = self.create_baby_with_records(25)
+        with self.assertNumQueries(len(queries)):
+            baby.delete()
+        self.assertFalse(DailyBabySummary.objects.exists())
+        self.assertFalse(FeedingStats.objects.exists())
+
     def test_get_gestational_age_days(self):
         baby_date = BabyDate(
             last_menstrual_period=timezone.now().date() - timezone.timedelta(days=30),
@@ -119,3 +177,1294 @@ class BabyDateTestCase(TestCase):
             baby_date.get_corrected_age_days(date_after_due),
             6
         )
+
+
+class RecentSectionsLoaderTestCase(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.babies = [
+            BabyDate.objects.create(
+                nickname=f'baby{i}',
+                last_menstrual_period=now.date() - timezone.timedelta(days=300),
+            )
+            for i in range(3)
+        ]
+        for i, baby in enumerate(self.babies):
+            for j in range(12 + i):
+                Feeding.objects.create(
+                    baby_date=baby, amount=j, feed_at=now - timezone.timedelta(hours=j))
+            BodyTemperature.objects.create(baby_date=baby, temperature=36.5)
+
+    def assert_matches_per_baby_queries(self, sections):
+        for baby in self.babies:
+            self.assertEqual(
+                sections[baby.pk]['feedings'],
+                list(Feeding.get_recent_feedings(baby.pk)),
+            )
+            self.assertEqual(
+                sections[baby.pk]['body_temperatures'],
+                list(BodyTemperature.get_recent_temp(baby.pk)),
+            )
+            self.assertEqual(sections[baby.pk]['diapers'], [])
+
+    def test_load_recent_sections(self):
+        # 每个分区一次查询 与宝宝数量无关
+        with self.assertNumQueries(5):
+            sections = load_recent_sections([baby.pk for baby in self.babies])
+        self.assert_matches_per_baby_queries(sections)
+
+    def test_equal_times_ordered_by_pk(self):
+        # 导入的记录时间经常相同, 取哪几条和顺序都应该确定
+        feed_at = timezone.now() + timezone.timedelta(hours=1)
+        feedings = Feeding.objects.bulk_create([
+            Feeding(baby_date=self.babies[0], amount=i, feed_at=feed_at) for i in range(10)
+        ])
+        recent = get_recent_by_baby(Feeding.objects.all(), [self.babies[0].pk], 'feed_at', 9)
+        self.assertEqual(
+            [feeding.pk for feeding in recent[self.babies[0].pk]],
+            [feeding.pk for feeding in reversed(feedings)][:9],
+        )
+
+    def test_section_matches_sections_with_equal_times(self):
+        # 提交后重新渲染的分区与整页的顺序和截断位置相同
+        feed_at = timezone.now() + timezone.timedelta(hours=1)
+        Feeding.objects.bulk_create([
+            Feeding(baby_date=self.babies[0], amount=i, feed_at=feed_at) for i in range(5)
+        ])
+        measure_at = timezone.now() + timezone.timedelta(hours=1)
+        BodyTemperature.objects.bulk_create([
+            BodyTemperature(baby_date=self.babies[0], temperature=36.5, measure_at=measure_at)
+            for _ in range(10)
+        ])
+        sections = load_recent_sections([self.babies[0].pk])[self.babies[0].pk]
+        for key in ('feedings', 'body_temperatures'):
+            with CaptureQueriesContext(connection) as queries:
+                self.assertEqual(load_recent_section(self.babies[0].pk, key), sections[key])
+            # SQLite 按索引倒序扫描时碰巧也是 pk 倒序, 其他数据库不保证, 所以检查排序条件
+            self.assertRegex(queries[0]['sql'], r'ORDER BY .*"id" DESC')
+        self.assertEqual(sections['feedings'], list(Feeding.get_recent_feedings(self.babies[0].pk)))
+        self.assertEqual(sections['body_temperatures'], list(BodyTemperature.get_recent_temp(self.babies[0].pk)))
+
+
+class DailyBabySummaryTestCase(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.today = get_local_date(self.now)
+        self.baby = BabyDate.objects.create(
+            nickname='baby',
+            last_menstrual_period=self.today - timezone.timedelta(days=300),
+        )
+
+    def get_summary(self, date=None):
+        return DailyBabySummary.objects.get(
+            baby_date=self.baby, date=date or self.today)
+
+    def test_feeding_create_edit_delete(self):
+        feeding = Feeding.objects.create(
+            baby_date=self.baby, amount=60, feed_at=self.now)
+        Feeding.objects.create(baby_date=self.baby, amount=40, feed_at=self.now)
+        summary = self.get_summary()
+        self.assertEqual(summary.feeding_count, 2)
+        self.assertEqual(summary.feeding_total, 100)
+
+        # 修改到前一天 应从当天扣除并计入前一天
+        feeding.feed_at = self.now - timezone.timedelta(days=1)
+        feeding.amount = 70
+        feeding.save()
+        self.assertEqual(self.get_summary().feeding_total, 40)
+        yesterday = self.get_summary(get_local_date(feeding.feed_at))
+        self.assertEqual(yesterday.feeding_count, 1)
+        self.assertEqual(yesterday.feeding_total, 70)
+
+        feeding.delete()
+        yesterday.refresh_from_db()
+        self.assertEqual(yesterday.feeding_count, 0)
+        self.assertEqual(yesterday.feeding_total, 0)
+
+    def test_diaper_counts(self):
+        Diaper.objects.create(baby_date=self.baby, pee_amount='2', pooh_amount='0')
+        Diaper.objects.create(baby_date=self.baby, pee_amount='1', pooh_amount='3')
+        summary = self.get_summary()
+        self.assertEqual(summary.diaper_count, 2)
+        self.assertEqual(summary.wet_diaper_count, 2)
+        self.assertEqual(summary.dirty_diaper_count, 1)
+
+    def test_temperature_min_max_last(self):
+        start = timezone.localtime(self.now).replace(hour=1)
+        temps = [
+            BodyTemperature.objects.create(
+                baby_date=self.baby, temperature=t,
+                measure_at=start + timezone.timedelta(hours=i))
+            for i, t in enumerate([36.8, 37.5, 36.4])
+        ]
+        summary = self.get_summary(start.date())
+        self.assertEqual(summary.temperature_count, 3)
+        self.assertEqual(summary.temperature_min, 36.4)
+        self.assertEqual(summary.temperature_max, 37.5)
+        self.assertEqual(summary.temperature_last, 36.4)
+
+        # 删除最高和最后一次读数后 应从当日剩余记录重新计算
+        temps[1].delete()
+        temps[2].delete()
+        summary.refresh_from_db()
+        self.assertEqual(summary.temperature_count, 1)
+        self.assertEqual(summary.temperature_min, 36.8)
+        self.assertEqual(summary.temperature_max, 36.8)
+        self.assertEqual(summary.temperature_last, 36.8)
+
+    def test_integer_temperature(self):
+        BodyTemperature.objects.create(baby_date=self.baby, temperature=37, measure_at=self.now)
+        summary = self.get_summary()
+        self.assertEqual((summary.temperature_min, summary.temperature_last), (37, 37))
+
+    def test_rebuild_matches_incremental(self):
+        for i in range(5):
+            Feeding.objects.create(
+                baby_date=self.baby, amount=10 * i,
+                feed_at=self.now - timezone.timedelta(hours=10 * i))
+            BodyTemperature.objects.create(
+                baby_date=self.baby, temperature=36 + i / 10,
+                measure_at=self.now - timezone.timedelta(hours=7 * i))
+        fields = [f.name for f in DailyBabySummary._meta.fields if f.name != 'id']
+        incremental = list(DailyBabySummary.objects.order_by('date').values(*fields))
+        DailyBabySummary.objects.all().delete()
+        DailyBabySummary.rebuild(baby_date_id=self.baby.pk)
+        rebuilt = list(DailyBabySummary.objects.order_by('date').values(*fields))
+        self.assertEqual(incremental, rebuilt)
+
+
+class LocalDateTestCase(TestCase):
+    def setUp(self):
+        self.baby = BabyDate.objects.create(
+            nickname='baby', last_menstrual_period=datetime.date(2025, 1, 1))
+        # UTC 16:30 是上海的次日 00:30
+        self.feed_at = datetime.datetime(2025, 6, 1, 16, 30, tzinfo=datetime.timezone.utc)
+
+    def test_save_and_bulk_create(self):
+        feeding = Feeding.objects.create(baby_date=self.baby, amount=60, feed_at=self.feed_at)
+        self.assertEqual(feeding.local_date, datetime.date(2025, 6, 2))
+        feeding.feed_at -= datetime.timedelta(hours=1)
+        feeding.save(update_fields=['feed_at'])
+        self.assertEqual(Feeding.objects.get(pk=feeding.pk).local_date, datetime.date(2025, 6, 1))
+        Diaper.objects.bulk_create([Diaper(baby_date=self.baby, create_at=self.feed_at)])
+        self.assertEqual(Diaper.objects.get().local_date, datetime.date(2025, 6, 2))
+
+    def test_time_zone_change(self):
+        Feeding.objects.create(baby_date=self.baby, amount=60, feed_at=self.feed_at)
+        self.assertFalse(RecordTimeZone.sync())
+        with self.settings(TIME_ZONE='UTC'):
+            self.assertTrue(RecordTimeZone.sync())
+            self.assertEqual(Feeding.objects.get().local_date, datetime.date(2025, 6, 1))
+            self.assertEqual(DailyBabySummary.objects.get().date, datetime.date(2025, 6, 1))
+            self.assertFalse(RecordTimeZone.sync())
+
+
+class FeedingStatsTestCase(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.baby = BabyDate.objects.create(
+            nickname='baby',
+            last_menstrual_period=get_local_date(self.now) - timezone.timedelta(days=300),
+        )
+
+    def feed(self, hours_ago, amount=60):
+        return Feeding.objects.create(
+            baby_date=self.baby, amount=amount,
+            feed_at=self.now - timezone.timedelta(hours=hours_ago))
+
+    def get_metrics(self):
+        return FeedingStats.objects.get(baby_date=self.baby).get_metrics(self.now)
+
+    def test_metrics(self):
+        for hours_ago in (0, 3, 6, 30, 100, 200):
+            self.feed(hours_ago)
+        metrics = self.get_metrics()
+        self.assertEqual(metrics.last_feed_at, self.now)
+        self.assertEqual(metrics.count_24h, 3)
+        self.assertEqual(metrics.total_24h, 180)
+        self.assertEqual(metrics.interval_24h, timezone.timedelta(hours=3))
+        # 200 小时前的记录在 7 天窗口之外
+        self.assertEqual(metrics.interval_7d, timezone.timedelta(hours=100 / 4))
+        self.assertAlmostEqual(metrics.daily_total_7d, 5 * 60 / 7)
+
+    def test_edit_delete_match_rebuild(self):
+        feedings = [self.feed(hours_ago, 10 * hours_ago) for hours_ago in (1, 2, 50)]
+        feedings[0].feed_at -= timezone.timedelta(hours=80)
+        feedings[0].save()
+        feedings[2].delete()
+        incremental = self.get_metrics()
+        self.assertEqual(incremental.count_24h, 1)
+        FeedingStats.rebuild(baby_date_id=self.baby.pk, now=self.now)
+        self.assertEqual(self.get_metrics(), incremental)
+
+        # 窗口内的记录都删除后 最后一次喂奶来自更早的记录
+        old = self.feed(300)
+        feedings[0].delete()
+        feedings[1].delete()
+        self.assertEqual(self.get_metrics().last_feed_at, old.feed_at)
+        self.assertIsNone(self.get_metrics().daily_total_7d)
+
+    def test_created_from_existing_records(self):
+        self.feed(5)
+        FeedingStats.objects.all().delete()
+        self.feed(1)
+        self.assertEqual(self.get_metrics().count_24h, 2)
+
+
+class LatestRecordsTestCase(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        self.baby = BabyDate.objects.create(
+            nickname='baby',
+            last_menstrual_period=get_local_date(self.now) - timezone.timedelta(days=300),
+        )
+
+    def get_baby(self):
+        return BabyDate.objects.get(pk=self.baby.pk)
+
+    def test_insert_edit_delete(self):
+        feedings = [
+            Feeding.objects.create(
+                baby_date=self.baby, amount=60, feed_at=self.now - timezone.timedelta(hours=hours_ago))
+            for hours_ago in (3, 1, 2)
+        ]
+        self.assertEqual(self.get_baby().last_feeding_id, feedings[1].pk)
+        feedings[0].feed_at = self.now
+        feedings[0].save()
+        self.assertEqual(self.get_baby().last_feeding_id, feedings[0].pk)
+        # 删除的是最新一条时指向前一条
+        feedings[0].delete()
+        self.assertEqual(self.get_baby().last_feeding_id, feedings[1].pk)
+        feedings[1].delete()
+        feedings[2].delete()
+        self.assertIsNone(self.get_baby().last_feeding_id)
+
+        # 用旧实例保存宝宝不会覆盖最近记录
+        temperature = BodyTemperature.objects.create(baby_date=self.baby, temperature=36.8)
+        self.baby.nickname = 'renamed'
+        self.baby.save()
+        self.assertEqual(self.get_baby().last_body_temperature_id, temperature.pk)
+
+    def test_save_rolled_back_with_derived_fields(self):
+        with mock.patch.object(BabyDate, 'refresh_latest_records', side_effect=RuntimeError):
+            with self.assertRaises(RuntimeError):
+                Feeding.objects.create(baby_date=self.baby, amount=60, feed_at=self.now)
+        # 记录和已经更新的每日汇总一起回滚
+        self.assertFalse(Feeding.objects.exists())
+        self.assertFalse(DailyBabySummary.objects.filter(feeding_count__gt=0).exists())
+
+    def test_repair_command(self):
+        growth = GrowthData.objects.create(baby_date=self.baby, weight=3.2)
+        diaper = Diaper.objects.create(baby_date=self.baby)
+        BabyDate.objects.update(last_growth_data=None, last_diaper=None)
+        call_command('repair_latest_records', stdout=io.StringIO())
+        baby = self.get_baby()
+        self.assertEqual((baby.last_growth_data_id, baby.last_diaper_id), (growth.pk, diaper.pk))
+
+
+class QueryPlanTestCase(TestCase):
+    """
+    热点查询的执行计划不能退化为全表扫描或临时表排序
+    SQLite 检查 EXPLAIN QUERY PLAN, MySQL 检查 EXPLAIN 的 type 和 Extra
+    """
+    BAD_PLAN_PATTERNS = {
+        'sqlite': [r'\bSCAN\b', r'USE TEMP B-TREE'],
+        'mysql': [r'\bALL\b', r'Using filesort', r'Using temporary'],
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        user = User.objects.create_user('plan')
+        babies = [
+            BabyDate.objects.create(
+                nickname=f'plan{i}',
+                last_menstrual_period=now.date() - timezone.timedelta(days=300),
+            )
+            for i in range(4)
+        ]
+        for baby in babies:
+            item = MiscItem.objects.create(baby_date=baby, item_name='AD', created_by=user)
+            for i in range(50):
+                at = now - timezone.timedelta(hours=3 * i)
+                Feeding.objects.create(baby_date=baby, amount=60, feed_at=at)
+                Diaper.objects.create(baby_date=baby, create_at=at)
+                BodyTemperature.objects.create(baby_date=baby, temperature=36.6, measure_at=at)
+                GrowthData.objects.create(baby_date=baby, weight=3, record_at=at)
+                MiscRecord.objects.create(baby_date=baby, misc_item=item, record_at=at)
+        cls.baby = babies[0]
+
+    def assertIndexedPlan(self, queryset):
+        patterns = self.BAD_PLAN_PATTERNS.get(connection.vendor)
+        if patterns is None:
+            self.skipTest(f"No plan checks for {connection.vendor}")
+        plan = queryset.explain()
+        for pattern in patterns:
+            self.assertNotRegex(plan, pattern, msg=f"{queryset.query}")
+
+    def test_get_recent_classmethods(self):
+        pk = self.baby.pk
+        for queryset in (
+            Feeding.get_recent_feedings(pk),
+            Diaper.get_recent_diapers(pk),
+            BodyTemperature.get_recent_temp(pk),
+            GrowthData.get_recent_growth_data(pk),
+            MiscRecord.get_recent_records(pk),
+        ):
+            with self.subTest(model=queryset.model.__name__):
+                self.assertIndexedPlan(queryset)
+
+    def test_list_view_querysets(self):
+        for view_class in (
+            views.BodyTemperatureListView,
+            views.GrowthDataListView,
+            views.DiaperListView,
+            views.MiscRecordListView,
+        ):
+            with self.subTest(view=view_class.__name__):
+                view = view_class()
+                view.kwargs = {'baby_date_id': self.baby.pk}
+                queryset = view.get_queryset()
+                self.assertIndexedPlan(queryset[:view.paginate_by])
+                # 深处的页面同样应该走索引
+                paginator = KeysetPaginator(queryset, view.keyset_field, view.paginate_by)
+                for _ in range(3):
+                    page = paginator.get_page(page.next_cursor if _ else None)
+                deep_queryset, _ = paginator.get_page_queryset(page.next_cursor)
+                self.assertIndexedPlan(deep_queryset)
+
+    def test_feeding_list_day_queryset(self):
+        self.assertIndexedPlan(
+            Feeding.objects.filter(
+                baby_date=self.baby.pk, local_date=get_local_date(timezone.now())
+            ).order_by('-feed_at')
+        )
+
+
+class GrowthSeriesTestCase(TestCase):
+    def setUp(self):
+        now = timezone.now()
+        self.user = User.objects.create_user('parent')
+        self.baby = BabyDate.objects.create(
+            nickname='growth',
+            last_menstrual_period=now.date() - timezone.timedelta(days=300),
+        )
+        BabyRelation.objects.create(
+            baby_date=self.baby, request_by=self.user,
+            status=BabyRelation.grantable_status()[0])
+        self.growth = GrowthData.objects.create(
+            baby_date=self.baby, weight=3.2, height=50,
+            record_at=now - timezone.timedelta(days=1))
+        GrowthData.objects.create(baby_date=self.baby, weight=3.4, record_at=now)
+        self.url = reverse('babycare:fetch_growth_series', args=[self.baby.pk])
+        self.client.force_login(self.user)
+
+    def test_all_series_in_one_response(self):
+        response = self.client.get(self.url)
+        data = response.json()
+        self.assertEqual([x['yData'] for x in data['weight']], [3.2, 3.4])
+        self.assertEqual([x['yData'] for x in data['height']], [50])
+        self.assertEqual(data['head_circumference'], [])
+        self.assertTrue(response['ETag'].startswith('"'))
+        self.assertIn('Last-Modified', response)
+
+    def test_conditional_get(self):
+        etag = self.client.get(self.url)['ETag']
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+
+        self.growth.head_circumference = 34
+        self.growth.save()
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_legacy_per_type_url(self):
+        url = reverse('babycare:fetch_fenton_data', args=['height', self.baby.pk])
+        self.assertEqual([x['yData'] for x in self.client.get(url).json()], [50])
+
+    def test_insufficient_permission(self):
+        self.client.force_login(User.objects.create_user('stranger'))
+        response = self.client.get(self.url)
+        self.assertEqual(response.json(), {'error': 'Insufficient permission'})
+        self.assertNotIn('ETag', response)
+
+
+class DownsampleTestCase(TestCase):
+    def setUp(self):
+        self.xs = list(range(1000))
+        self.ys = [i % 50 for i in self.xs]
+        self.ys[500] = 100
+
+    def test_lttb(self):
+        indexes = lttb(self.xs, self.ys, 100)
+        self.assertEqual(len(indexes), 100)
+        self.assertEqual((indexes[0], indexes[-1]), (0, 999))
+        self.assertEqual(indexes, sorted(indexes))
+        self.assertIn(500, indexes)
+        self.assertEqual(lttb(self.xs[:10], self.ys[:10], 100), list(range(10)))
+
+    def test_minmax_keeps_extremes(self):
+        indexes = minmax(self.xs, self.ys, 100)
+        self.assertLessEqual(len(indexes), 100)
+        self.assertIn(500, indexes)
+        self.assertIn(self.ys.index(0, 1), indexes)
+
+    def test_time_series_view(self):
+        user = User.objects.create_user('series')
+        baby = BabyDate.objects.create(
+            nickname='series', last_menstrual_period=timezone.now().date() - timezone.timedelta(days=300))
+        BabyRelation.objects.create(baby_date=baby, request_by=user, status=2)
+        start = timezone.now() - timezone.timedelta(days=100)
+        BodyTemperature.objects.bulk_create(
+            BodyTemperature(
+                baby_date=baby, measure_at=start + timezone.timedelta(hours=i),
+                temperature=39.5 if i == 777 else 36.5 + i % 5 / 10)
+            for i in range(2000))
+        self.client.force_login(user)
+        url = reverse('babycare:fetch_time_series', args=[baby.pk, 'body-temperature'])
+        data = self.client.get(url, {'points': 100}).json()
+        self.assertLessEqual(len(data), 100)
+        self.assertIn(39.5, [point['yData'] for point in data])
+        with self.settings(BABYCARE_SERIES_MAX_POINTS=300):
+            self.assertLessEqual(len(self.client.get(url, {'points': 5000}).json()), 300)
+        # 只取回请求范围内的记录
+        day = get_local_date(start) + timezone.timedelta(days=10)
+        data = self.client.get(url, {'start': day, 'end': day}).json()
+        self.assertEqual(len(data), 24)
+        self.assertEqual(data, sorted(data, key=lambda point: point['datetime']))
+        self.assertEqual(self.client.get(url, {'start': '2020-01-01'}).status_code, 400)
+        url = reverse('babycare:fetch_time_series', args=[baby.pk, 'unknown'])
+        self.assertIn('error', self.client.get(url).json())
+
+
+class AggregateSeriesTestCase(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user('aggregate')
+        self.baby = BabyDate.objects.create(
+            nickname='aggregate', last_menstrual_period=datetime.date(2025, 1, 1))
+        BabyRelation.objects.create(baby_date=self.baby, request_by=self.user, status=2)
+        tz = ZoneInfo(settings.TIME_ZONE)
+        # 本地时间 6 月 1 日 23:30 在 UTC 是同一天, 6 月 2 日 00:30 在 UTC 仍是 6 月 1 日
+        for day, hour, amount in ((1, 8, 10), (1, 23, 20), (2, 0, 30), (9, 12, 5)):
+            Feeding.objects.create(
+                baby_date=self.baby, amount=amount,
+                feed_at=datetime.datetime(2025, 6, day, hour, 30, tzinfo=tz))
+        self.client.force_login(self.user)
+        self.url = reverse('babycare:fetch_aggregate', args=[self.baby.pk, 'feeding'])
+
+    def test_local_day_buckets(self):
+        with self.assertNumQueries(1):
+            result = aggregate_series(
+                self.baby.pk, 'feeding', 'day', ['sum', 'count', 'max'],
+                start=datetime.date(2025, 6, 1), end=datetime.date(2025, 6, 30))
+        self.assertEqual(result['t'], ['2025-06-01', '2025-06-02', '2025-06-09'])
+        self.assertEqual(result['sum'], [30, 30, 5])
+        self.assertEqual(result['count'], [2, 1, 1])
+        self.assertEqual(result['max'], [20, 30, 5])
+
+    def test_view(self):
+        response = self.client.get(self.url, {
+            'bucket': 'week', 'agg': 'avg,count', 'start': '2025-06-01', 'end': '2025-06-30'})
+        data = response.json()
+        # 6 月 1 日是周日, 属于 5 月 26 日开始的一周
+        self.assertEqual(data['t'], ['2025-05-26', '2025-06-02', '2025-06-09'])
+        self.assertEqual(data['avg'], [15, 30, 5])
+        response = self.client.get(self.url, {'bucket': 'hour', 'start': '2025-06-02', 'end': '2025-06-02'})
+        self.assertEqual(response.json()['t'], ['2025-06-02T00:00:00+08:00'])
+
+    def test_hour_buckets_without_time_zone_conversion(self):
+        with CaptureQueriesContext(connection) as queries:
+            result = aggregate_series(
+                self.baby.pk, 'feeding', 'hour', ['sum'],
+                start=datetime.date(2025, 6, 1), end=datetime.date(2025, 6, 2))
+        # 数据库只按 UTC 截断, 不依赖时区表
+        self.assertNotIn(settings.TIME_ZONE, queries[0]['sql'])
+        self.assertEqual(result['t'], [
+            '2025-06-01T08:00:00+08:00', '2025-06-01T23:00:00+08:00', '2025-06-02T00:00:00+08:00'])
+        self.assertEqual(result['sum'], [10, 20, 30])
+
+    def test_invalid(self):
+        for params in ({'bucket': 'year'}, {'agg': 'median'}, {'start': '2025-13-01'},
+                       {'bucket': 'hour', 'start': '2000-01-01', 'end': '2025-01-01'}):
+            self.assertEqual(self.client.get(self.url, params).status_code, 400)
+        url = reverse('babycare:fetch_aggregate', args=[self.baby.pk, 'miscrecord'])
+        self.assertEqual(self.client.get(url, {'agg': 'sum'}).status_code, 400)
+        self.client.force_login(User.objects.create_user('stranger'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class GrowthChartTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.user = User.objects.create_user('parent')
+        self.baby = BabyDate.objects.create(
+            nickname='chart', gender='M',
+            last_menstrual_period=now.date() - timezone.timedelta(days=280),
+        )
+        BabyRelation.objects.create(baby_date=self.baby, request_by=self.user, status=2)
+        for days, weight in ((14, 3.2), (7, 3.5), (0, 3.9)):
+            GrowthData.objects.create(
+                baby_date=self.baby, weight=weight, record_at=now - timezone.timedelta(days=days))
+        self.url = reverse('babycare:growth_chart', args=[self.baby.pk, 'weight'])
+        self.client.force_login(self.user)
+
+    def test_render_and_cache(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        svg = response.content.decode()
+        self.assertEqual(svg.count('<circle'), 3)
+        # 5 条百分位曲线和 1 条生长数据折线
+        self.assertEqual(svg.count('<polyline'), 6)
+        self.assertIn('3.9 kg', svg)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.client.get(self.url).content.decode(), svg)
+        self.assertFalse(any('babycare_growthdata"."record_at"' in q['sql'] for q in ctx.captured_queries))
+
+        response = self.client.get(self.url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+        GrowthData.objects.create(baby_date=self.baby, weight=4.1)
+        self.assertEqual(self.client.get(self.url).content.decode().count('<circle'), 4)
+
+    def test_theme(self):
+        light = self.client.get(self.url).content.decode()
+        dark = self.client.get(self.url, {'theme': 'dark'}).content.decode()
+        self.client.cookies['theme'] = 'auto'
+        auto = self.client.get(self.url).content.decode()
+        self.assertNotIn('#343a40', light)
+        self.assertNotIn('#e9ecef', dark)
+        self.assertIn('prefers-color-scheme: dark', auto)
+
+    def test_messages_and_permission(self):
+        self.baby.gender = None
+        self.baby.save()
+        self.assertContains(self.client.get(self.url), '填入宝宝性别后才能查看曲线')
+        url = reverse('babycare:growth_chart', args=[self.baby.pk, 'notes'])
+        self.assertEqual(self.client.get(url).status_code, 404)
+        self.client.force_login(User.objects.create_user('stranger'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class FentonTestCase(TestCase):
+    def test_reference_values(self):
+        table = fenton.get_table('M', 'weight')
+        self.assertEqual(table.weeks[0], 22)
+        self.assertEqual(table.weeks[-1], 50)
+        self.assertAlmostEqual(fenton.z_score('M', 'weight', 40, 3.578), 0)
+        self.assertAlmostEqual(fenton.percentile('M', 'weight', 40, 2.726), 3)
+        self.assertAlmostEqual(fenton.percentile('F', 'height', 40, 53.34), 90)
+        self.assertIsNone(fenton.z_score('M', 'weight', 60, 5))
+        self.assertIsNone(fenton.z_score(None, 'weight', 40, 3.5))
+
+    def test_interpolation_between_weeks(self):
+        table = fenton.get_table('M', 'weight')
+        median = (table.curves_at(40)[2] + table.curves_at(41)[2]) / 2
+        self.assertAlmostEqual(fenton.z_score('M', 'weight', 40.5, median), 0)
+        # 超出 97% 曲线时外推
+        self.assertGreater(fenton.z_score('M', 'weight', 40, 5), 1.881)
+
+    def test_annotate_and_find_faltering(self):
+        lmp = timezone.now().date() - timezone.timedelta(days=40 * 7)
+        baby = BabyDate.objects.create(
+            nickname='fenton', gender='M', last_menstrual_period=lmp)
+        table = fenton.get_table('M', 'weight')
+        for weeks, percentile_index in ((36, 3), (38, 2), (40, 0)):
+            GrowthData.objects.create(
+                baby_date=baby,
+                weight=table.curves_at(weeks)[percentile_index],
+                record_at=timezone.now() - timezone.timedelta(weeks=40 - weeks),
+            )
+        with self.assertNumQueries(1):
+            records = fenton.annotate_growth_data(GrowthData.objects.all())
+        self.assertEqual([round(r.weight_percentile) for r in records], [90, 50, 3])
+        self.assertIsNone(records[0].height_z)
+        faltering = fenton.find_growth_faltering(records)
+        self.assertEqual(list(faltering), [baby.pk])
+
+
+class AgeSnapshotTestCase(TestCase):
+    def assert_matches_methods(self, baby_date):
+        today = get_local_date(timezone.now())
+        age = baby_date.get_age_snapshot(today)
+        self.assertEqual(age.is_born, baby_date.is_born(today))
+        self.assertEqual(age.is_preterm, baby_date.is_preterm())
+        self.assertEqual(age.days_to_due, baby_date.days_to_due(today))
+        self.assertEqual(age.gestational_age_days, baby_date.get_gestational_age_days(today))
+        self.assertEqual(
+            age.ultrasound_gestational_age_days,
+            baby_date.get_gestational_age_days(today, ultrasound_fixed=True),
+        )
+        if age.is_born:
+            self.assertEqual(age.chronological_age_days, baby_date.get_chronological_age_days(today))
+            self.assertEqual(age.corrected_age_days, baby_date.get_corrected_age_days(today))
+        else:
+            self.assertIsNone(age.chronological_age_days)
+            self.assertIsNone(age.corrected_age_days)
+        return age
+
+    def test_not_born(self):
+        age = self.assert_matches_methods(BabyDate(
+            last_menstrual_period=timezone.now().date() - timezone.timedelta(days=200),
+            ultrasound_fixed_days=3,
+        ))
+        self.assertFalse(age.is_due_passed)
+
+    def test_term_baby(self):
+        self.assert_matches_methods(BabyDate(
+            last_menstrual_period=timezone.now().date() - timezone.timedelta(days=300),
+            birthday=timezone.now() - timezone.timedelta(days=20),
+        ))
+
+    def test_preterm_baby(self):
+        age = self.assert_matches_methods(BabyDate(
+            last_menstrual_period=timezone.now().date() - timezone.timedelta(days=300),
+            birthday=timezone.now() - timezone.timedelta(days=60),
+        ))
+        self.assertTrue(age.is_preterm)
+        self.assertTrue(age.is_due_passed)
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            age.is_born = False  # type: ignore
+
+
+class BabyACLTestCase(TestCase):
+    def setUp(self):
+        lmp = timezone.now().date() - timezone.timedelta(days=300)
+        self.guardian = User.objects.create_user('guardian')
+        self.relative = User.objects.create_user('relative')
+        self.babies = [
+            BabyDate.objects.create(nickname=f'acl{i}', last_menstrual_period=lmp)
+            for i in range(3)
+        ]
+        for baby in self.babies[:2]:
+            BabyRelation.objects.create(
+                baby_date=baby, request_by=self.guardian, status=2)
+        self.pending = BabyRelation.objects.create(
+            baby_date=self.babies[0], request_by=self.relative, status=0)
+
+    def test_one_query_for_all_checks(self):
+        guardian = User.objects.get(pk=self.guardian.pk)
+        with self.assertNumQueries(1):
+            self.assertTrue(self.babies[0].can_be_edited_by(guardian))
+            self.assertTrue(self.babies[1].can_be_accessed_by(guardian))
+            self.assertFalse(self.babies[2].can_be_accessed_by(guardian))
+            self.assertTrue(self.pending.can_be_approved_by(guardian))
+            self.assertEqual(
+                sorted(get_acl(guardian).accessible_ids()),
+                [self.babies[0].pk, self.babies[1].pk],
+            )
+
+    def test_invalidated_when_relation_changes(self):
+        relative = User.objects.get(pk=self.relative.pk)
+        self.assertFalse(self.babies[0].can_be_accessed_by(relative))
+        self.pending.request_by = relative
+        self.pending.status = 3
+        self.pending.save()
+        self.assertTrue(self.babies[0].can_be_accessed_by(relative))
+        self.pending.delete()
+        self.assertFalse(self.babies[0].can_be_accessed_by(relative))
+
+    def test_cache_across_requests(self):
+        cache.clear()
+        with self.settings(BABYCARE_ACL_CACHE_TIMEOUT=60):
+            get_acl(User(pk=self.relative.pk))
+            with self.assertNumQueries(0):
+                acl = get_acl(User(pk=self.relative.pk))
+            self.assertFalse(acl.can_access(self.babies[0].pk))
+            self.pending.status = 3
+            self.pending.save()
+            relative = User(pk=self.relative.pk)
+            self.assertTrue(self.babies[0].can_be_accessed_by(relative))
+
+
+class PendingApprovalTestCase(TestCase):
+    def setUp(self):
+        lmp = timezone.now().date() - timezone.timedelta(days=300)
+        self.guardian = User.objects.create_user('guardian')
+        self.babies = [
+            BabyDate.objects.create(nickname=f'pending{i}', last_menstrual_period=lmp)
+            for i in range(3)
+        ]
+        for baby in self.babies[:2]:
+            BabyRelation.objects.create(baby_date=baby, request_by=self.guardian, status=2)
+        self.requesters = [User.objects.create_user(f'requester{i}') for i in range(3)]
+        self.pending = [
+            BabyRelation.objects.create(baby_date=baby, request_by=requester, status=0)
+            for baby, requester in zip(self.babies, self.requesters)
+        ]
+
+    def get_count(self, user):
+        return User.objects.get(pk=user.pk).pending_approval_count
+
+    def test_inbox_in_one_query(self):
+        guardian = User.objects.get(pk=self.guardian.pk)
+        grantable_ids = get_acl(guardian).grantable_ids()
+        with self.assertNumQueries(1):
+            inbox = list(BabyRelation.get_pending_inbox(grantable_ids))
+            names = [(relation.request_by.username, relation.baby_date.nickname) for relation in inbox]
+        self.assertEqual(names, [('requester0', 'pending0'), ('requester1', 'pending1')])
+
+    def test_count_follows_relations(self):
+        self.assertEqual(self.get_count(self.guardian), 2)
+        self.assertEqual(self.get_count(self.requesters[0]), 0)
+        # 批准为监护人后, 申请人也能看到同一宝宝的其他申请
+        other = BabyRelation.objects.create(
+            baby_date=self.babies[0], request_by=self.requesters[2], status=0)
+        self.assertEqual(self.get_count(self.guardian), 3)
+        self.pending[0].status = 2
+        self.pending[0].save()
+        self.assertEqual(self.get_count(self.guardian), 2)
+        self.assertEqual(self.get_count(self.requesters[0]), 1)
+        other.delete()
+        self.assertEqual(self.get_count(self.guardian), 1)
+        self.assertEqual(self.get_count(self.requesters[0]), 0)
+
+    def test_delete_baby(self):
+        BabyRelation.objects.create(baby_date=self.babies[0], request_by=self.requesters[1], status=2)
+        self.assertEqual(self.get_count(self.requesters[1]), 1)
+        self.babies[0].delete()
+        self.assertEqual(self.get_count(self.guardian), 1)
+        self.assertEqual(self.get_count(self.requesters[1]), 0)
+
+    def test_index_and_badge(self):
+        self.client.force_login(self.guardian)
+        response = self.client.get(reverse('babycare:index'))
+        self.assertContains(response, 'requester0 申请关联 pending0')
+        self.assertContains(response, 'requester1 申请关联 pending1')
+        self.assertNotContains(response, 'requester2')
+        self.assertContains(response, 'title="待审批的关联申请">2</span>')
+
+
+class KeysetPaginationTestCase(TestCase):
+    def setUp(self):
+        self.baby = BabyDate.objects.create(
+            nickname='pages',
+            last_menstrual_period=timezone.now().date() - timezone.timedelta(days=300),
+        )
+        now = timezone.now()
+        # 每两条记录的时间相同, 检验 id 作为次级排序
+        for i in range(25):
+            BodyTemperature.objects.create(
+                baby_date=self.baby, temperature=36 + i / 100,
+                measure_at=now - timezone.timedelta(minutes=i // 2))
+        self.expected = list(
+            BodyTemperature.objects.filter(baby_date=self.baby).order_by('-measure_at', '-pk'))
+        self.paginator = KeysetPaginator(
+            BodyTemperature.objects.filter(baby_date=self.baby), 'measure_at', 10, total_cap=20)
+
+    def test_forward_and_backward(self):
+        pages = [self.paginator.get_page(None)]
+        self.assertFalse(pages[0].has_previous())
+        while pages[-1].next_cursor:
+            with self.assertNumQueries(2):
+                pages.append(self.paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([len(page) for page in pages], [10, 10, 5])
+        self.assertEqual([obj for page in pages for obj in page], self.expected)
+        self.assertEqual(pages[0].approximate_total, '20+')
+
+        previous = self.paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual(previous.object_list, pages[1].object_list)
+        first = self.paginator.get_page(previous.previous_cursor)
+        self.assertEqual(first.object_list, pages[0].object_list)
+        self.assertFalse(first.has_previous())
+
+    def test_invalid_cursor_is_first_page(self):
+        page = self.paginator.get_page('not-a-cursor')
+        self.assertEqual(page.object_list, self.expected[:10])
+
+    def test_list_view(self):
+        url = reverse('babycare:body_temperatures_list', args=[self.baby.pk])
+        response = self.client.get(url)
+        self.assertEqual(len(response.context['body_temperatures']), 8)
+        response = self.client.get(url, {'cursor': response.context['page_obj'].next_cursor})
+        self.assertEqual(list(response.context['body_temperatures']), self.expected[8:16])
+        self.assertContains(response, '上一页')
+
+
+class EventImporterTestCase(TestCase):
+    def setUp(self):
+        lmp = timezone.now().date() - timezone.timedelta(days=300)
+        self.user = User.objects.create_user('importer')
+        self.baby = BabyDate.objects.create(nickname='import', last_menstrual_period=lmp)
+        self.other = BabyDate.objects.create(nickname='other', last_menstrual_period=lmp)
+        BabyRelation.objects.create(baby_date=self.baby, request_by=self.user, status=2)
+        self.item = MiscItem.objects.create(
+            baby_date=self.baby, item_name='维生素D', created_by=self.user)
+
+    def test_csv(self):
+        rows = [
+            'model,baby_date,time,amount,misc_item,temperature',
+            f'feeding,{self.baby.pk},2025-06-01T08:00:00+08:00,60,,',
+            f'feeding,{self.baby.pk},2025-06-01T11:00:00+08:00,,,',
+            f'feeding,{self.other.pk},2025-06-01T11:00:00+08:00,60,,',
+            f'miscrecord,{self.baby.pk},2025-06-01T12:00:00+08:00,,维生素D,',
+            f'bodytemperature,{self.baby.pk},2025-06-01T12:00:00+08:00,,,37.1',
+        ]
+        importer = EventImporter(user=User.objects.get(pk=self.user.pk), batch_size=2)
+        result = importer.import_stream(io.StringIO('\n'.join(rows)), 'csv')
+        self.assertEqual(
+            result.created, {'feeding': 1, 'miscrecord': 1, 'bodytemperature': 1})
+        self.assertEqual([row for row, _ in result.errors], [3, 4])
+        self.assertIn('amount', result.errors[0][1])
+        self.assertEqual(MiscRecord.objects.get().misc_item, self.item)
+        self.assertFalse(Feeding.objects.filter(baby_date=self.other).exists())
+
+    def test_fixture_json_rebuilds_summary(self):
+        # 旧版 generate_data.py 的记录时间字段名为 date
+        records = [
+            {'model': 'babycare.feeding', 'pk': i + 1, 'fields': {
+                'baby_date': self.baby.pk, 'amount': 50 + i,
+                'date': f'2025-06-0{1 + i % 2}T10:00:00+08:00'}}
+            for i in range(5)
+        ]
+        importer = EventImporter(user=self.user, batch_size=2)
+        # 权限只查询 1 次, 每批 3 次 (保存点和插入), 重建汇总 8 次, 重建喂奶统计 6 次,
+        # 更新最近记录 1 次, 递增 data_version 1 次
+        with self.assertNumQueries(26):
+            result = importer.import_stream(io.StringIO(json.dumps(records)), 'json')
+        self.assertEqual(result.created_count, 5)
+        summaries = DailyBabySummary.objects.filter(baby_date=self.baby).order_by('date')
+        self.assertEqual(
+            [(s.feeding_count, s.feeding_total) for s in summaries],
+            [(3, 50 + 52 + 54), (2, 51 + 53)],
+        )
+
+    def test_signal_per_baby(self):
+        BabyRelation.objects.create(baby_date=self.other, request_by=self.user, status=2)
+        rows = [
+            'model,baby_date,time,amount,misc_item,temperature',
+            f'feeding,{self.baby.pk},2025-06-01T08:00:00+08:00,60,,',
+            f'bodytemperature,{self.other.pk},2025-06-03T12:00:00+08:00,,,37.1',
+        ]
+        importer = EventImporter(user=self.user)
+        with mock.patch('babycare.importers.records_bulk_changed.send') as send:
+            importer.import_stream(io.StringIO('\n'.join(rows)), 'csv')
+        sent = {call.kwargs['baby_date_id']: call.kwargs for call in send.call_args_list}
+        self.assertEqual(sent[self.baby.pk]['models'], frozenset([Feeding]))
+        self.assertEqual(sent[self.other.pk]['models'], frozenset([BodyTemperature]))
+        self.assertEqual(sent[self.other.pk]['start'], datetime.date(2025, 6, 3))
+
+    def test_iter_json_array_small_chunks(self):
+        data = [{'a': i, 's': 'x' * i} for i in range(20)]
+        stream = io.StringIO(json.dumps(data, indent=2))
+        self.assertEqual(list(iter_json_array(stream, chunk_size=7)), data)
+        with self.assertRaises(ValueError):
+            list(iter_json_array(io.StringIO('[{"a": 1} {"a": 2}]')))
+
+    def test_view(self):
+        self.client.force_login(self.user)
+        upload = SimpleUploadedFile(
+            'temps.csv', 'measure_at,temperature\n2025-06-01 08:00,36.8\n'.encode())
+        response = self.client.post(reverse('babycare:bulk_import_records'), {
+            'file': upload, 'model': 'bodytemperature', 'baby_date': self.baby.pk})
+        self.assertEqual(response.json()['created'], {'bodytemperature': 1})
+        upload = SimpleUploadedFile('temps.csv', b'measure_at,temperature\n')
+        response = self.client.post(reverse('babycare:bulk_import_records'), {
+            'file': upload, 'model': 'bodytemperature', 'baby_date': self.other.pk})
+        self.assertEqual(response.status_code, 403)
+
+
+class ExportTestCase(TestCase):
+    def setUp(self):
+        lmp = timezone.now().date() - timezone.timedelta(days=300)
+        self.user = User.objects.create_user('exporter')
+        self.baby = BabyDate.objects.create(nickname='export', last_menstrual_period=lmp)
+        self.copy = BabyDate.objects.create(nickname='copy', last_menstrual_period=lmp)
+        for baby in (self.baby, self.copy):
+            BabyRelation.objects.create(baby_date=baby, request_by=self.user, status=2)
+        item = MiscItem.objects.create(baby_date=self.baby, item_name='铁剂', created_by=self.user)
+        MiscItem.objects.create(baby_date=self.copy, item_name='铁剂', created_by=self.user)
+        now = timezone.now()
+        for i in range(3):
+            day = now - timezone.timedelta(days=i)
+            Feeding.objects.create(baby_date=self.baby, amount=60 + i, feed_at=day)
+            Diaper.objects.create(baby_date=self.baby, pee_amount='2', create_at=day)
+            MiscRecord.objects.create(baby_date=self.baby, misc_item=item, record_at=day)
+        self.url = reverse('babycare:export_records', args=[self.baby.pk])
+        self.client.force_login(self.user)
+
+    def get_content(self, response) -> str:
+        self.assertNotIn('Content-Length', response)
+        return b''.join(response.streaming_content).decode()
+
+    def test_ndjson_round_trip(self):
+        content = self.get_content(self.client.get(self.url))
+        self.assertEqual(len(content.splitlines()), 9)
+        result = EventImporter(user=self.user, baby_date_id=self.copy.pk).import_stream(
+            io.StringIO(content), 'ndjson')
+        self.assertEqual(
+            result.created, {'feeding': 3, 'diaper': 3, 'miscrecord': 3}, result.errors)
+        self.assertEqual(
+            list(Feeding.objects.filter(baby_date=self.copy).order_by('feed_at')
+                 .values_list('amount', 'feed_at')),
+            list(Feeding.objects.filter(baby_date=self.baby).order_by('feed_at')
+                 .values_list('amount', 'feed_at')),
+        )
+
+    def test_csv_gzip_date_range(self):
+        today = timezone.localdate()
+        response = self.client.get(self.url, {
+            'format': 'csv', 'gzip': '1', 'start': today.isoformat()})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        content = gzip.decompress(b''.join(response.streaming_content)).decode()
+        rows = content.splitlines()
+        self.assertTrue(rows[0].startswith('model,pk,baby_date,time,misc_item,'))
+        self.assertEqual(len(rows), 4)
+        result = EventImporter(user=self.user, baby_date_id=self.copy.pk).import_stream(
+            io.StringIO(content), 'csv')
+        self.assertEqual(result.created_count, 3, result.errors)
+
+    def test_forbidden(self):
+        stranger = User.objects.create_user('stranger')
+        self.client.force_login(stranger)
+        self.assertEqual(self.client.get(self.url).status_code, 403)
+
+
+class BatchSubmitTestCase(TestCase):
+    def setUp(self):
+        lmp = timezone.now().date() - timezone.timedelta(days=300)
+        self.user = User.objects.create_user('batch')
+        self.baby = BabyDate.objects.create(nickname='batch', last_menstrual_period=lmp)
+        self.twin = BabyDate.objects.create(nickname='twin', last_menstrual_period=lmp)
+        self.other = BabyDate.objects.create(nickname='other', last_menstrual_period=lmp)
+        for baby in (self.baby, self.twin):
+            BabyRelation.objects.create(baby_date=baby, request_by=self.user, status=2)
+        self.item = MiscItem.objects.create(
+            baby_date=self.baby, item_name='维生素D', created_by=self.user)
+        self.client.force_login(self.user)
+        self.url = reverse('babycare:fetch_submit_batch')
+
+    def post(self, records):
+        return self.client.post(
+            self.url, json.dumps({'records': records}), content_type='application/json')
+
+    def test_mixed_records(self):
+        records = [
+            {'type': 'feeding', 'client_id': 'a', 'fields': {
+                'baby_date': self.baby.pk, 'amount': 60, 'feed_at': '2025-06-01T08:00:00+08:00'}},
+            {'type': 'feeding', 'fields': {'baby_date': self.twin.pk, 'amount': 70}},
+            {'type': 'bodytemperature', 'fields': {
+                'baby_date': self.twin.pk, 'temperature': '37.2', 'measurement': 'axillary'}},
+            {'type': 'miscrecord', 'fields': {'baby_date': self.baby.pk, 'misc_item': self.item.pk}},
+            {'type': 'miscrecord', 'fields': {'baby_date': self.twin.pk, 'misc_item': self.item.pk}},
+            {'type': 'feeding', 'fields': {'baby_date': self.baby.pk}},
+            {'type': 'feeding', 'fields': {'baby_date': self.other.pk, 'amount': 60}},
+            {'type': 'unknown', 'fields': {}},
+        ]
+        response = self.post(records)
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['results']
+        self.assertEqual(
+            [r['status'] for r in results],
+            ['created', 'created', 'created', 'created',
+             'invalid', 'invalid', 'forbidden', 'invalid'])
+        self.assertEqual(results[0]['client_id'], 'a')
+        self.assertIn('misc_item', results[4]['errors'])
+        self.assertIn('amount', results[5]['errors'])
+        feeding = Feeding.objects.get(pk=results[0]['id'])
+        self.assertEqual(feeding.feed_at.isoformat(), '2025-06-01T00:00:00+00:00')
+        self.assertEqual(Feeding.objects.filter(baby_date=self.twin).count(), 1)
+        self.assertFalse(Feeding.objects.filter(baby_date=self.other).exists())
+        self.assertEqual(DailyBabySummary.objects.get(
+            baby_date=self.baby, date=get_local_date(feeding.feed_at)).feeding_count, 1)
+
+    def test_signal_per_baby(self):
+        records = [
+            {'type': 'feeding', 'fields': {
+                'baby_date': self.baby.pk, 'amount': 60, 'feed_at': '2025-06-01T08:00:00+08:00'}},
+            {'type': 'bodytemperature', 'fields': {
+                'baby_date': self.twin.pk, 'temperature': '37.2', 'measurement': 'axillary'}},
+        ]
+        with mock.patch('babycare.batch.records_bulk_changed.send') as send:
+            self.assertEqual(self.post(records).status_code, 200)
+        sent = {call.kwargs['baby_date_id']: call.kwargs['models'] for call in send.call_args_list}
+        self.assertEqual(sent, {
+            self.baby.pk: frozenset([Feeding]), self.twin.pk: frozenset([BodyTemperature])})
+
+    def test_query_count_independent_of_size(self):
+        def count_queries(n):
+            records = [
+                {'type': 'feeding', 'fields': {'baby_date': self.baby.pk, 'amount': 60}},
+                {'type': 'miscrecord', 'fields': {'baby_date': self.baby.pk, 'misc_item': self.item.pk}},
+            ] * n
+            with mock.patch('babycare.batch.records_bulk_changed.send'):
+                with CaptureQueriesContext(connection) as ctx:
+                    self.assertEqual(self.post(records).status_code, 200)
+            return len(ctx)
+        self.assertEqual(count_queries(1), count_queries(20))
+
+    def test_bad_body(self):
+        response = self.client.post(self.url, 'not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(
+            self.url, json.dumps({'records': {}}), content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+
+class SubmitFragmentTestCase(TestCase):
+    def setUp(self):
+        lmp = timezone.now().date() - timezone.timedelta(days=300)
+        self.user = User.objects.create_user('fragment')
+        self.babies = [
+            BabyDate.objects.create(nickname=f'baby{i}', last_menstrual_period=lmp)
+            for i in range(3)
+        ]
+        for baby in self.babies:
+            BabyRelation.objects.create(baby_date=baby, request_by=self.user, status=2)
+            Feeding.objects.create(baby_date=baby, amount=10)
+        self.baby = self.babies[0]
+        self.client.force_login(self.user)
+        self.url = reverse('babycare:fetch_submit_feeding')
+
+    def test_redirect_without_xhr(self):
+        response = self.client.post(self.url, {'baby_date': self.baby.pk, 'amount': 60})
+        self.assertRedirects(
+            response, reverse('dashboard:index') + '?babycare_active=baby-feeding',
+            fetch_redirect_response=False)
+
+    def test_table_fragment(self):
+        response = self.client.post(
+            self.url, {'baby_date': self.baby.pk, 'amount': 60},
+            headers={'X-Requested-With': 'XMLHttpRequest'})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'babycare/includes/feedings_list_table.html')
+        self.assertEqual(response.context['feedings'][0].amount, 60)
+        self.assertEqual(len(response.context['feedings']), 2)
+        self.assertNotContains(response, '<html')
+
+    def test_json_row(self):
+        response = self.client.post(
+            reverse('babycare:fetch_submit_misc_record'),
+            {'baby_date': self.baby.pk, 'misc_item': MiscItem.objects.create(
+                baby_date=self.baby, item_name='维生素D', created_by=self.user).pk},
+            headers={'X-Requested-With': 'XMLHttpRequest', 'Accept': 'application/json'})
+        data = response.json()
+        self.assertEqual(data['section'], 'misc-record')
+        self.assertEqual(data['record']['model'], 'babycare.miscrecord')
+        self.assertEqual(data['record']['pk'], MiscRecord.objects.get().pk)
+
+    def test_invalid(self):
+        response = self.client.post(
+            self.url, {'baby_date': self.baby.pk},
+            headers={'X-Requested-With': 'XMLHttpRequest'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('amount', response.json()['errors'])
+
+    def test_query_count_independent_of_babies(self):
+        def count_queries():
+            with CaptureQueriesContext(connection) as ctx:
+                self.client.post(
+                    self.url, {'baby_date': self.baby.pk, 'amount': 60},
+                    headers={'X-Requested-With': 'XMLHttpRequest'})
+            return len(ctx)
+        before = count_queries()
+        lmp = timezone.now().date() - timezone.timedelta(days=300)
+        for i in range(5):
+            baby = BabyDate.objects.create(nickname=f'more{i}', last_menstrual_period=lmp)
+            BabyRelation.objects.create(baby_date=baby, request_by=self.user, status=2)
+        self.assertEqual(count_queries(), before)
+
+
+class SectionFragmentCacheTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        lmp = timezone.now().date() - timezone.timedelta(days=300)
+        self.user = User.objects.create_user('sections')
+        self.babies = [
+            BabyDate.objects.create(nickname=f'sections{i}', last_menstrual_period=lmp)
+            for i in range(3)
+        ]
+        for baby in self.babies:
+            BabyRelation.objects.create(baby_date=baby, request_by=self.user, status=2)
+        self.baby = self.babies[0]
+        Feeding.objects.create(
+            baby_date=self.baby, amount=40, feed_at=timezone.now() - timezone.timedelta(hours=2))
+        self.client = Client(enforce_csrf_checks=True)
+        self.client.force_login(self.user)
+
+    def get_dashboard(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(reverse('dashboard:index'))
+        self.assertEqual(response.status_code, 200)
+        return response, len(ctx)
+
+    def test_data_version_bumped(self):
+        version = BabyDate.objects.get(pk=self.baby.pk).data_version
+        feeding = Feeding.objects.create(baby_date=self.baby, amount=50)
+        feeding.delete()
+        MiscItem.objects.create(baby_date=self.baby, item_name='维生素D', created_by=self.user)
+        self.assertEqual(BabyDate.objects.get(pk=self.baby.pk).data_version, version + 3)
+        # 用旧实例保存不会使版本回退
+        self.baby.nickname = 'renamed'
+        self.baby.save()
+        self.assertEqual(BabyDate.objects.get(pk=self.baby.pk).data_version, version + 3)
+
+    def test_cache_hit_skips_queries(self):
+        response, first = self.get_dashboard()
+        self.assertContains(response, '40.0 ml')
+        response, second = self.get_dashboard()
+        self.assertLess(second, first)
+        # CSRF 字段和距离上次喂奶的时间不来自缓存
+        self.assertGreaterEqual(
+            response.content.decode().count('csrfmiddlewaretoken'), 5 * len(self.babies))
+        self.assertContains(response, '距离上次喂奶过去了 2小时')
+        self.assertNotContains(response, '<!--live:')
+
+        Feeding.objects.create(baby_date=self.baby, amount=70)
+        response, third = self.get_dashboard()
+        self.assertContains(response, '70.0 ml')
+        self.assertGreater(third, second)
+
+    def test_submit_with_cached_csrf(self):
+        self.get_dashboard()
+        response, _ = self.get_dashboard()
+        token = response.context['csrf_token']
+        response = self.client.post(
+            reverse('babycare:fetch_submit_feeding'),
+            {'baby_date': self.baby.pk, 'amount': 60, 'csrfmiddlewaretoken': str(token)})
+        self.assertEqual(response.status_code, 302)
+
+
+class AsyncViewsTestCase(TestCase):
+    def setUp(self):
+        cache.clear()
+        lmp = timezone.now().date() - timezone.timedelta(days=300)
+        self.user = User.objects.create_user('async')
+        requester = User.objects.create_user('requester')
+        self.babies = [
+            BabyDate.objects.create(nickname=f'async{i}', last_menstrual_period=lmp)
+            for i in range(2)
+        ]
+        for baby in self.babies:
+            BabyRelation.objects.create(baby_date=baby, request_by=self.user, status=2)
+            BabyRelation.objects.create(baby_date=baby, request_by=requester, status=0)
+            Feeding.objects.create(baby_date=baby, amount=40)
+            BodyTemperature.objects.create(baby_date=baby, temperature=36.8)
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    async def test_dashboard(self):
+        expected = await sync_to_async(self.client.get)(reverse('dashboard:index'))
+        response = await self.async_client.get(reverse('dashboard:async_index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [baby['baby_date'] for baby in response.context['babies']],
+            [baby['baby_date'] for baby in expected.context['babies']],
+        )
+        self.assertContains(response, '40.0 ml', count=len(self.babies))
+
+    async def test_babycare_index(self):
+        expected = await sync_to_async(self.client.get)(reverse('babycare:index'))
+        response = await self.async_client.get(reverse('babycare:async_index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['babies'], expected.context['babies'])
+        # 所有监护的宝宝的申请都需要审批
+        self.assertEqual(len(response.context['to_approve']), len(self.babies))
+        self.assertContains(response, 'requester 申请关联 async1')
+
+    async def test_anonymous(self):
+        await self.async_client.alogout()
+        response = await self.async_client.get(reverse('dashboard:async_index'))
+        self.assertTemplateUsed(response, 'dashboard/public_index.html')
+        response = await self.async_client.get(reverse('babycare:async_index'))
+        self.assertEqual(response.status_code, 404)
+
+
+class LiveEventsTestCase(TestCase):
+    def setUp(self):
+        lmp = timezone.now().date() - timezone.timedelta(days=300)
+        self.user = User.objects.create_user('live')
+        self.baby = BabyDate.objects.create(nickname='live', last_menstrual_period=lmp)
+        self.other = BabyDate.objects.create(nickname='other', last_menstrual_period=lmp)
+        BabyRelation.objects.create(baby_date=self.baby, request_by=self.user, status=2)
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    def test_publish_on_commit(self):
+        backend = mock.Mock()
+        with mock.patch('utils.events.get_backend', return_value=backend):
+            with self.captureOnCommitCallbacks(execute=True):
+                feeding = Feeding.objects.create(baby_date=self.baby, amount=40)
+                self.assertFalse(backend.publish.called)
+            backend.publish.assert_called_once_with(baby_channel(self.baby.pk), {
+                'type': 'feeding', 'action': 'created', 'baby': self.baby.pk, 'id': feeding.pk,
+            })
+            backend.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                relation = BabyRelation.objects.create(
+                    baby_date=self.other, request_by=self.user, status=0)
+                relation.status = 1
+                relation.save()
+            self.assertEqual(backend.publish.call_args.args[0], user_channel(self.user.pk))
+            self.assertEqual(backend.publish.call_args.args[1]['status'], 1)
+            backend.reset_mock()
+            with self.captureOnCommitCallbacks(execute=True):
+                TaskCalendar.objects.create(
+                    description='live', start_date=timezone.now(), end_date=timezone.now(),
+                    create_by=self.user)
+            self.assertEqual(backend.publish.call_args.args[0], TASKS_CHANNEL)
+
+    def test_record_table(self):
+        Feeding.objects.create(baby_date=self.baby, amount=40)
+        response = self.client.get(
+            reverse('babycare:fetch_record_table', args=[self.baby.pk, 'baby-feeding']))
+        self.assertContains(response, '40.0 ml')
+        response = self.client.get(
+            reverse('babycare:fetch_record_table', args=[self.other.pk, 'baby-feeding']))
+        self.assertEqual(response.status_code, 404)
+        response = self.client.get(
+            reverse('babycare:fetch_record_table', args=[self.baby.pk, 'unknown']))
+        self.assertEqual(response.status_code, 404)
+
+
+class SyntheticDataTestCase(TestCase):
+    def test_generate(self):
+        counts = SyntheticDataGenerator(users=6, babies=2, years=0.1, seed=3).generate()
+        babies = BabyDate.objects.filter(nickname__startswith='syn3-')
+        self.assertEqual(babies.count(), 2)
+        for baby in babies:
+            guardian = baby.relations.filter(status=2).first().request_by
+            self.assertTrue(get_acl(guardian).can_grant(baby.pk))
+            self.assertFalse(baby.feedings.filter(feed_at__lt=baby.birthday).exists())
+        self.assertEqual(counts['babycare.Feeding'], Feeding.objects.count())
+        self.assertEqual(
+            sum(DailyBabySummary.objects.values_list('feeding_count', flat=True)),
+            Feeding.objects.count(),
+        )
+
+    def test_seeded(self):
+        def snapshot(seed):
+            SyntheticDataGenerator(
+                users=3, babies=1, years=0.05, seed=seed, prefix='p').generate(rebuild=False)
+            baby = BabyDate.objects.get(nickname=f'p{seed}-b0')
+            return list(baby.feedings.order_by('feed_at').values_list('amount', flat=True))
+
+        first = snapshot(5)
+        BabyDate.objects.all().delete()
+        User.objects.all().delete()
+        ShoppingList.objects.all().delete()
+        self.assertEqual(snapshot(5), first)
+
+
+class QueryBudgetTestCase(TestCase):
+    """热点视图的查询次数不超过预算, 且不随宝宝数量增长"""
+
+    def count_queries(self, size: str, **params) -> dict[str, int]:
+        ctx = benchmarks.prepare(size, **params)
+        client = Client()
+        client.force_login(ctx.user)
+        async_client = AsyncClient()
+        async_client.force_login(ctx.user)
+        counts = dict()
+        for name, func in benchmarks.get_cases(ctx, client, async_client).items():
+            with CaptureQueriesContext(connection) as queries:
+                func()
+            counts[name] = len(queries)
+            budget = benchmarks.get_budget(name, ctx)
+            self.assertLessEqual(len(queries), budget, f'{name} ({size})')
+        return counts
+
+    def test_budgets(self):
+        one = self.count_queries('1-baby', years=0.05)
+        many = self.count_queries('10-babies', years=0.05)
+        self.assertEqual(one, many)
@@ -17,10 +17,25 @@ urlpatterns = [
          name='fetch_submit_diaper'),
     path('fetch/submit_misc_record/', views.fetch_submit_misc_record,
          name='fetch_submit_misc_record'),
+    path('fetch/submit_batch/', views.fetch_submit_batch,
+         name='fetch_submit_batch'),
+    path('fetch/record-table/<int:baby_date_id>/<str:section>/',
+         views.fetch_record_table, name='fetch_record_table'),
     path('fetch/fenton-data/<str:fenton_type>/<int:baby_date_id>/',
         views.fetch_fenton_data, name='fetch_fenton_data'), 
+    path('fetch/growth-series/<int:baby_date_id>/',
+        views.fetch_growth_series, name='fetch_growth_series'),
+    path('fetch/time-series/<int:baby_date_id>/<str:series>/',
+        views.fetch_time_series, name='fetch_time_series'),
+    path('fetch/aggregate/<int:baby_date_id>/<str:model_name>/',
+        views.fetch_aggregate, name='fetch_aggregate'),
+    path('charts/growth/<int:baby_date_id>/<str:metric>.svg',
+        views.growth_chart, name='growth_chart'),
 
+    path('import/', views.bulk_import_records, name='bulk_import_records'),
+    path('export/<int:baby_date_id>/', views.export_records, name='export_records'),
     path('', views.index, name='index'),
+    path('async/', views.async_index, name='async_index'),
     path('create/', views.create_baby_date, name='create_baby_date'),
     path('feedings/<int:baby_date_id>/',
          views.feeding_list, name='feedings_list'),
@@ -15,7 +15,7 @@ def generate_feeding_data():
             record['pk'] = i * 8 + j + 1
             record['fields'] = fields = dict()
             fields['baby_date'] = 1  # 假设第一个宝宝
-            fields['date'] = (date + datetime.timedelta(hours=j * 3)).isoformat()
+            fields['feed_at'] = (date + datetime.timedelta(hours=j * 3)).isoformat()
             fields['amount'] = round(random.uniform(60, 120), 2)  # 喂养量在60到120毫升之间
             fields['note'] = f"喂养记录 {i * 8 + j + 1}"
             feedings.append(record)
@@ -34,7 +34,7 @@ def generate_body_temperature_data():
             record['pk'] = i * 3 + j + 1
             record['fields'] = fields = dict()
             fields['baby_date'] = 1  # 假设第一个宝宝
-            fields['date'] = (date + datetime.timedelta(hours=j * 8)).isoformat()
+            fields['measure_at'] = (date + datetime.timedelta(hours=j * 8)).isoformat()
             fields['temperature'] = round(random.uniform(36.5, 36.9), 1)
             fields['measurement'] = random.choice(['temporal', 'tympanic', 'axillary'])
             fields['notes'] = f"测温 {i * 3 + j + 1}"
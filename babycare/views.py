@@ -1,21 +1,41 @@
+import asyncio
+import io
+import json
 from typing import Any, Dict
-from datetime import timedelta, datetime, time
+from datetime import date, timedelta, datetime, time
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
 from django.utils import timezone, dateparse, decorators
 from django.shortcuts import render, redirect
-from django.http import HttpRequest, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, Http404, HttpResponseForbidden, JsonResponse
+from django.http import HttpRequest, HttpResponse, HttpResponseBadRequest, HttpResponseRedirect, Http404, HttpResponseForbidden, JsonResponse, StreamingHttpResponse
 from django.urls import reverse
-from django.views.decorators.http import require_POST
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition, require_POST
 from django.views.generic.list import ListView
-from django.db.models import Sum
+from django.db.models import Count, Max
+from django.core import serializers
 from django.contrib.messages import add_message, constants as messages
 from django.utils.html import escape
 
-from babycare import models
+from babycare import exporters, models
+from babycare.aggregates import aggregate_series
+from babycare.batch import MAX_BATCH_SIZE, submit_batch
+from babycare.charts import THEMES, get_growth_chart
+from babycare.importers import IMPORT_MODELS, EventImporter, guess_format
+from babycare.loaders import alist, get_recent_by_baby, load_feeding_stats, load_recent_section
 from babycare.modelforms import (
     FeedingForm, FeedingWithTimeForm, BreastBumpingForm, BodyTemperatureForm, GrowthDataForm, BabyDateForm, DiaperForm, MiscRecordForm)
 from iuser.decorators import login_or_404
-from utils.datetime import get_local_date, get_range_of_date
+from utils.datetime import get_local_date
+from utils.downsample import lttb, minmax
+from utils.pagination import KeysetPaginationMixin
+
+
+# 首页的宝宝卡片需要的最近记录, 随宝宝关系一起查询
+INDEX_BABY_RELATED = ['baby_date'] + [
+    f'baby_date__{name}' for name in models.BabyDate.LATEST_RECORD_FIELDS
+]
 
 
 # Create your views here.
@@ -24,54 +44,82 @@ def index(request: HttpRequest) -> HttpResponse:
     context = dict()
     context['active'] = 'babycare'
 
-    guardianings = models.BabyRelation.objects.filter(
-        request_by=request.user, 
-        status=models.BabyRelation.REQUEST_STATUS[2][0]
-    )
-    for guardianing in guardianings:
-        to_approve = models.BabyRelation.objects.filter(
-            baby_date=guardianing.baby_date,
-            status=models.BabyRelation.REQUEST_STATUS[0][0]
-        )
-        if context.get('to_approve') is None:
-            context['to_approve'] = to_approve
-        else:
-            to_approve.union(models.BabyRelation.objects.filter(
-                baby_date=guardianing.baby_date,
-                status=models.BabyRelation.REQUEST_STATUS[0][0]
-            ))
+    # 所有可授权的宝宝的待审批申请, 一次查询
+    to_approve = list(models.BabyRelation.get_pending_inbox(request.baby_acl.grantable_ids()))  # type: ignore[attr-defined]
+    if to_approve:
+        context['to_approve'] = to_approve
 
-    context['babies'] = babies = []
     relations = models.BabyRelation.objects.filter(
         request_by=request.user,
         status__in=models.BabyRelation.accessible_status(),
-    ).select_related('baby_date')
+    ).select_related(*INDEX_BABY_RELATED)
+    # 每个宝宝最近一个有喂奶记录的日期的汇总
+    baby_date_ids = [relation.baby_date_id for relation in relations]
+    last_feeding_summaries = get_recent_by_baby(
+        models.DailyBabySummary.objects.filter(feeding_count__gt=0),
+        baby_date_ids,
+        'date',
+        1,
+    )
+    context['babies'] = _build_index_babies(
+        relations, last_feeding_summaries, load_feeding_stats(baby_date_ids))
+    return render(request, 'babycare/index.html', context)
+
+
+@login_or_404
+async def async_index(request: HttpRequest) -> HttpResponse:
+    """
+    index 的异步版本, 在 ASGI 下并发查询宝宝关系、待审批的申请和各宝宝的最近汇总与喂奶统计
+    """
+    context = dict()
+    context['active'] = 'babycare'
+
+    acl = await request.ababy_acl()  # type: ignore[attr-defined]
+    baby_date_ids = acl.accessible_ids()
+    relations, to_approve, last_feeding_summaries, feeding_stats = await asyncio.gather(
+        alist(models.BabyRelation.objects.filter(
+            request_by=request.user,
+            status__in=models.BabyRelation.accessible_status(),
+        ).select_related(*INDEX_BABY_RELATED)),
+        alist(models.BabyRelation.get_pending_inbox(acl.grantable_ids())),
+        sync_to_async(get_recent_by_baby)(
+            models.DailyBabySummary.objects.filter(feeding_count__gt=0), baby_date_ids, 'date', 1),
+        sync_to_async(load_feeding_stats)(baby_date_ids),
+    )
+    if to_approve:
+        context['to_approve'] = to_approve
+    context['babies'] = _build_index_babies(
+        relations, last_feeding_summaries, feeding_stats)
+    return render(request, 'babycare/index.html', context)
+
+
+def _build_index_babies(
+        relations,
+        last_feeding_summaries: dict,
+        feeding_stats: dict,
+    ) -> list[tuple]:
+    now = timezone.now()
+    babies = []
     for relation in relations:
         baby_date = relation.baby_date
         nickname = relation.baby_date.nickname
-        feedings = models.Feeding.objects.filter(
-            baby_date=baby_date.pk)
-        if feedings.exists():
-            last_feeding = feedings.latest()
-            last_feeding_date = get_local_date(last_feeding.feed_at)
-            last_feeding_day_range = get_range_of_date(last_feeding_date)
-            last_feedings = models.Feeding.objects.filter(
-                feed_at__range=last_feeding_day_range)
-            last_feedings_amount = sum(map(lambda x: x.amount, last_feedings))
+        summaries = last_feeding_summaries[baby_date.pk]
+        if summaries:
+            last_feedings_amount = summaries[0].feeding_total
+            last_feeding_date = summaries[0].date
         else:
             last_feedings_amount = None
             last_feeding_date = None
-        body_temperatures = models.BodyTemperature.objects.filter(
-            baby_date=baby_date.pk)
-        if body_temperatures.exists():
-            last_body_temperature = body_temperatures.latest()
+        last_body_temperature = baby_date.last_body_temperature
+        if last_body_temperature is not None:
             last_body_temperature_date = get_local_date(
                 last_body_temperature.measure_at)
         else:
-            last_body_temperature = None
-            last_body_temperature_date = None        
-        babies.append((baby_date, nickname, last_feedings_amount, last_feeding_date, last_body_temperature, last_body_temperature_date, relation))
-    return render(request, 'babycare/index.html', context)
+            last_body_temperature_date = None
+        stats = feeding_stats.get(baby_date.pk)
+        feeding_metrics = stats.get_metrics(now) if stats is not None else None
+        babies.append((baby_date, nickname, last_feedings_amount, last_feeding_date, last_body_temperature, last_body_temperature_date, relation, feeding_metrics))
+    return babies
 
 @login_or_404
 def create_baby_date(request: HttpRequest) -> HttpResponse:
@@ -188,6 +236,156 @@ def approve_baby_date_relate_request(request: HttpRequest) -> HttpResponse:
         return redirect('babycare:index')
 
 
+@login_or_404
+@require_POST
+def bulk_import_records(request: HttpRequest) -> HttpResponse:
+    """
+    批量导入记录, 上传的文件字段为 file
+    POST 参数:
+        format: csv, json 或 ndjson, 默认根据文件扩展名判断
+        model: 行中没有 model 时使用的记录类型, 如 feeding
+        baby_date: 指定后所有记录都导入到该宝宝
+    返回各类型的导入条数和每行的错误
+    """
+    upload = request.FILES.get('file')
+    if upload is None:
+        return JsonResponse({'error': '缺少文件'}, status=400)
+    fmt = request.POST.get('format') or guess_format(upload.name or '')
+    if fmt is None:
+        return JsonResponse({'error': '无法判断文件格式'}, status=400)
+    default_model = request.POST.get('model') or None
+    if default_model is not None and default_model not in IMPORT_MODELS:
+        return JsonResponse({'error': f'不支持的记录类型: {default_model}'}, status=400)
+    baby_date_id = request.POST.get('baby_date') or None
+    if baby_date_id is not None:
+        if not baby_date_id.isdigit():
+            return JsonResponse({'error': '无效的 baby_date'}, status=400)
+        baby_date_id = int(baby_date_id)
+        if not request.baby_acl.can_edit(baby_date_id):  # type: ignore[attr-defined]
+            return HttpResponseForbidden()
+
+    importer = EventImporter(
+        user=request.user, baby_date_id=baby_date_id, default_model=default_model)
+    stream = io.TextIOWrapper(upload.file, encoding='utf-8-sig', newline='')  # type: ignore[arg-type]
+    try:
+        result = importer.import_stream(stream, fmt)
+    except ValueError as e:
+        data = importer.result.as_dict()
+        data['error'] = f'文件格式错误: {e}'
+        return JsonResponse(data, status=400)
+    return JsonResponse(result.as_dict())
+
+
+@login_or_404
+def export_records(request: HttpRequest, baby_date_id: int) -> HttpResponse:
+    """
+    流式导出宝宝的全部记录
+    GET 参数:
+        format: ndjson (默认) 或 csv
+        start, end: 本地日期范围 YYYY-MM-DD (包含)
+        gzip: 为 1 时 gzip 压缩
+    """
+    if not request.baby_acl.can_access(baby_date_id):  # type: ignore[attr-defined]
+        return HttpResponseForbidden()
+    fmt = request.GET.get('format', 'ndjson')
+    if fmt not in exporters.FORMATS:
+        return HttpResponseBadRequest(f'不支持的格式: {fmt}')
+    dates = dict()
+    for key in ('start', 'end'):
+        value = request.GET.get(key)
+        try:
+            dates[key] = dateparse.parse_date(value) if value else None
+        except ValueError:
+            dates[key] = None
+        if value and dates[key] is None:
+            return HttpResponseBadRequest(f'无效的日期: {key}')
+    gzip = request.GET.get('gzip') == '1'
+
+    response = StreamingHttpResponse(
+        exporters.export_records(baby_date_id, fmt, gzip=gzip, **dates),
+        content_type='application/gzip' if gzip else f'{exporters.CONTENT_TYPES[fmt]}; charset=utf-8',
+    )
+    filename = exporters.get_filename(baby_date_id, fmt, gzip)
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+@login_or_404
+@require_POST
+def fetch_submit_batch(request: HttpRequest) -> HttpResponse:
+    """
+    一次提交多条记录, 可以包含不同类型和不同宝宝的记录, 用于离线时积累的记录一次性上传
+    请求体为 JSON: {"records": [{"type": "feeding", "fields": {"baby_date": 1, "amount": 60}, "client_id": "a1"}, ...]}
+    返回 {"results": [{"index": 0, "client_id": "a1", "status": "created", "id": 123}, ...]}
+    单条记录的错误不影响其他记录, 整个请求体无效时返回 400
+    """
+    try:
+        data = json.loads(request.body)
+    except (ValueError, UnicodeDecodeError):
+        return JsonResponse({'error': '请求体不是有效的 JSON'}, status=400)
+    records = data.get('records') if isinstance(data, dict) else None
+    if not isinstance(records, list):
+        return JsonResponse({'error': '缺少 records 列表'}, status=400)
+    if len(records) > MAX_BATCH_SIZE:
+        return JsonResponse({'error': f'一次最多提交 {MAX_BATCH_SIZE} 条记录'}, status=400)
+    results = submit_batch(request.baby_acl, records)  # type: ignore[attr-defined]
+    return JsonResponse({'results': results})
+
+
+# 提交记录后重新渲染的分区: {dashboard 上的分区 id: (load_recent_section 的键, 表格模板)}
+SUBMIT_SECTIONS = {
+    'baby-feeding': ('feedings', 'babycare/includes/feedings_list_table.html'),
+    'body-temperature': ('body_temperatures', 'babycare/includes/body_temperatures_list_table.html'),
+    'growth-data': ('growth_data', 'babycare/includes/growth_datas_list_table.html'),
+    'diaper': ('diapers', 'babycare/includes/diapers_list_table.html'),
+    'misc-record': ('misc_records', 'babycare/includes/misc_records_list_table.html'),
+}
+
+
+def submit_response(request: HttpRequest, form, active: str) -> HttpResponse:
+    """
+    fetch_submit_* 提交后的响应
+    普通表单提交重定向到 dashboard 并打开 active 分区;
+    XHR 请求 (X-Requested-With: XMLHttpRequest) 不再渲染整个 dashboard:
+        默认返回该宝宝该分区重新渲染的记录表格, 由页面替换原表格
+        Accept 优先 application/json 时返回新记录 {"section": ..., "record": {"model", "pk", "fields"}}
+        表单无效时返回 400 和 {"errors": {字段: [错误, ...]}}
+    :param form: 已校验的表单, 有效时其 instance 为已保存的记录
+    :param active: dashboard 上的分区 id
+    """
+    if request.headers.get('X-Requested-With') != 'XMLHttpRequest':
+        url = reverse('dashboard:index')
+        url += f'?babycare_active={active}'
+        return HttpResponseRedirect(url)
+    if form.errors:
+        return JsonResponse({'errors': form.errors.get_json_data()}, status=400)
+    record = form.instance
+    section = SUBMIT_SECTIONS.get(active)
+    if section is None or request.get_preferred_type(['text/html', 'application/json']) == 'application/json':
+        return JsonResponse({
+            'section': active,
+            'record': serializers.serialize('python', [record])[0],
+        })
+    key, template_name = section
+    return render(request, template_name, {
+        key: load_recent_section(record.baby_date_id, key),
+    })
+
+
+@login_or_404
+def fetch_record_table(request: HttpRequest, baby_date_id: int, section: str) -> HttpResponse:
+    """
+    某个宝宝的一个分区的最近记录表格, 供收到变化通知的页面局部刷新
+    :param section: SUBMIT_SECTIONS 中的分区 id, 如 baby-feeding
+    """
+    if section not in SUBMIT_SECTIONS or not request.baby_acl.can_access(baby_date_id):  # type: ignore
+        raise Http404()
+    key, template_name = SUBMIT_SECTIONS[section]
+    return render(request, template_name, {
+        key: load_recent_section(baby_date_id, key),
+    })
+
+
 @require_POST
 def fetch_submit_feeding(request: HttpRequest) -> HttpResponse:
     """
@@ -196,20 +394,13 @@ def fetch_submit_feeding(request: HttpRequest) -> HttpResponse:
     form = FeedingForm(request.POST)
     if form.is_valid():
         feeding = form.save(commit=False)
-        relation = models.BabyRelation.objects.filter(
-            baby_date=feeding.baby_date,
-            request_by=request.user,
-            status__in=models.BabyRelation.editable_status(),
-        ).exists()
-        if relation:
+        if feeding.baby_date.can_be_edited_by(request.user):
             feeding.save()
         else:
             return HttpResponseForbidden()
     else:
         print(form.errors)
-    url = reverse('dashboard:index')
-    url += f'?babycare_active=baby-feeding'
-    return HttpResponseRedirect(url)
+    return submit_response(request, form, 'baby-feeding')
 
 
 @require_POST
@@ -220,20 +411,13 @@ def fetch_submit_breast_bumping(request: HttpRequest) -> HttpResponse:
     form = BreastBumpingForm(request.POST)
     if form.is_valid():
         breast_bumping = form.save(commit=False)
-        relation = models.BabyRelation.objects.filter(
-            baby_date=breast_bumping.baby_date,
-            request_by=request.user,
-            status__in=models.BabyRelation.editable_status(),
-        ).exists()
-        if relation:
+        if breast_bumping.baby_date.can_be_edited_by(request.user):
             breast_bumping.save()
         else:
             return HttpResponseForbidden()
     else:
         print(form.errors)
-    url = reverse('dashboard:index')
-    url += f'?babycare_active=breast-bumping'
-    return HttpResponseRedirect(url)
+    return submit_response(request, form, 'breast-bumping')
 
 
 @require_POST
@@ -244,20 +428,13 @@ def fetch_submit_body_temperature(request: HttpRequest) -> HttpResponse:
     form = BodyTemperatureForm(request.POST)
     if form.is_valid():
         body_temperature = form.save(commit=False)
-        relation = models.BabyRelation.objects.filter(
-            baby_date=body_temperature.baby_date,
-            request_by=request.user,
-            status__in=models.BabyRelation.editable_status(),
-        ).exists()
-        if relation:
+        if body_temperature.baby_date.can_be_edited_by(request.user):
             body_temperature.save()
         else:
             return HttpResponseForbidden()
     else:
         print(form.errors)
-    url = reverse('dashboard:index')
-    url += f'?babycare_active=body-temperature'
-    return HttpResponseRedirect(url)
+    return submit_response(request, form, 'body-temperature')
 
 
 @require_POST
@@ -268,112 +445,287 @@ def fetch_submit_growth_data(request: HttpRequest) -> HttpResponse:
     form = GrowthDataForm(request.POST)
     if form.is_valid():
         growth_data = form.save(commit=False)
-        relation = models.BabyRelation.objects.filter(
-            baby_date=growth_data.baby_date,
-            request_by=request.user,
-            status__in=models.BabyRelation.editable_status(),
-        ).exists()
-        if relation:
+        if growth_data.baby_date.can_be_edited_by(request.user):
             growth_data.save()
         else:
             return HttpResponseForbidden()
     else:
         print(form.errors)
-    url = reverse('dashboard:index')
-    url += f'?babycare_active=growth-data'
-    return HttpResponseRedirect(url)
+    return submit_response(request, form, 'growth-data')
 
 @require_POST
 def fetch_submit_diaper(request: HttpRequest) -> HttpResponse:
     form = DiaperForm(request.POST)
     if form.is_valid():
         diaper = form.save(commit=False)
-        relation = models.BabyRelation.objects.filter(
-            baby_date=diaper.baby_date,
-            request_by=request.user,
-            status__in=models.BabyRelation.editable_status(),
-        ).exists()
-        if relation:
+        if diaper.baby_date.can_be_edited_by(request.user):
             diaper.save()
         else:
             return HttpResponseForbidden()
     else:
         print(form.errors)
-    url = reverse('dashboard:index')
-    url += f'?babycare_active=diaper'
-    return HttpResponseRedirect(url)
+    return submit_response(request, form, 'diaper')
 
 @require_POST
 def fetch_submit_misc_record(request: HttpRequest) -> HttpResponse:
     form = MiscRecordForm(request.POST)
     if form.is_valid():
         misc_record = form.save(commit=False)
-        relation = models.BabyRelation.objects.filter(
-            baby_date=misc_record.baby_date,
-            request_by=request.user,
-            status__in=models.BabyRelation.editable_status(),
-        ).exists()
-        if relation:
+        if misc_record.baby_date.can_be_edited_by(request.user):
             misc_record.save()
         else:
             return HttpResponseForbidden()
     else:
         print(form.errors)
-    url = reverse('dashboard:index')
-    url += f'?babycare_active=misc-record'
-    return HttpResponseRedirect(url)
+    return submit_response(request, form, 'misc-record')
+
+
+# 生长曲线的三种数据
+GROWTH_SERIES_FIELDS = ('weight', 'height', 'head_circumference')
+
+
+def _get_growth_series_state(request: HttpRequest, baby_date_id: int) -> dict | None:
+    """
+    获取宝宝生长数据的版本信息, 用于条件请求的 ETag 和 Last-Modified
+    同一请求内 etag_func 和 last_modified_func 共用一次查询
+    :return: 没有访问权限时返回 None
+    """
+    cache_attr = f'_growth_series_state_{baby_date_id}'
+    if not hasattr(request, cache_attr):
+        state = None
+        if models.BabyDate(pk=baby_date_id).can_be_accessed_by(request.user):
+            state = models.GrowthData.objects.filter(
+                baby_date=baby_date_id
+            ).aggregate(
+                count=Count('id'),
+                last_id=Max('id'),
+                last_modified=Max('updated_at'),
+            )
+        setattr(request, cache_attr, state)
+    return getattr(request, cache_attr)
+
+
+def growth_series_etag(request: HttpRequest, baby_date_id: int, **kwargs) -> str | None:
+    state = _get_growth_series_state(request, baby_date_id)
+    if state is None:
+        return None
+    # 数量覆盖删除, 最大 id 覆盖新增, 最大修改时间覆盖编辑
+    last_modified = state['last_modified']
+    last_modified = last_modified.timestamp() if last_modified else 0
+    return f"{baby_date_id}-{state['count']}-{state['last_id'] or 0}-{last_modified}"
+
+
+def growth_series_last_modified(request: HttpRequest, baby_date_id: int, **kwargs) -> datetime | None:
+    state = _get_growth_series_state(request, baby_date_id)
+    return state and state['last_modified']
+
+
+def get_series_points(request: HttpRequest) -> int:
+    """
+    时间序列接口返回的最多点数, ?points= 可以设置更少的点数
+    不超过 BABYCARE_SERIES_MAX_POINTS, 历史记录再长响应大小也有上限
+    """
+    max_points = getattr(settings, 'BABYCARE_SERIES_MAX_POINTS', 500)
+    try:
+        points = int(request.GET.get('points', max_points))
+    except ValueError:
+        points = max_points
+    return min(max(points, 3), max_points)
+
+
+def downsample_values(values: list[dict], time_field: str, field: str, points: int, method=lttb) -> list[dict]:
+    """
+    去掉 field 为空的记录并降采样
+    :param values: 按时间排序的 values() 结果
+    :param method: utils.downsample 中的 lttb 或 minmax
+    """
+    values = [value for value in values if value[field] is not None]
+    indexes = method(
+        [value[time_field].timestamp() for value in values],
+        [value[field] for value in values],
+        points,
+    )
+    return [values[i] for i in indexes]
+
+
+def _serialize_growth_values(values, field: str, points: int) -> list[dict]:
+    return [
+        {
+            'datetime': get_local_date(value['record_at']).strftime('%Y-%m-%d'),
+            'yData': value[field],
+            'notes': value['notes'],
+        }
+        for value in downsample_values(list(values), 'record_at', field, points)
+    ]
 
 
+def _check_growth_series_access(request: HttpRequest, baby_date_id: int) -> JsonResponse | None:
+    if _get_growth_series_state(request, baby_date_id) is not None:
+        return None
+    if not models.BabyDate.objects.filter(id=baby_date_id).exists():
+        return JsonResponse({'error': 'Invalid baby date id'})
+    return JsonResponse({'error': 'Insufficient permission'})
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=growth_series_etag, last_modified_func=growth_series_last_modified)
 def fetch_fenton_data(
         request: HttpRequest, 
         fenton_type: str, 
         baby_date_id: int,
     ) -> JsonResponse:
-    try:
-        baby_date = models.BabyDate.objects.get(id=baby_date_id)
-    except models.BabyDate.DoesNotExist:
-        return JsonResponse({'error': 'Invalid baby date id'})
-    if not baby_date.can_be_accessed_by(request.user):
+    """
+    单项生长曲线数据, 保留以兼容旧页面, 新页面使用 fetch_growth_series
+    点数超过 ?points= 时用 LTTB 降采样
+    """
+    error = _check_growth_series_access(request, baby_date_id)
+    if error is not None:
+        return error
+    if fenton_type not in GROWTH_SERIES_FIELDS:
+        return JsonResponse({'error': 'Invalid fenton type f{fenton_type}'})
+    values = models.GrowthData.objects.filter(
+        baby_date=baby_date_id,
+        **{f'{fenton_type}__isnull': False},
+    ).order_by('record_at').values('record_at', fenton_type, 'notes')
+    return JsonResponse(
+        _serialize_growth_values(values, fenton_type, get_series_points(request)), safe=False)
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=growth_series_etag, last_modified_func=growth_series_last_modified)
+def fetch_growth_series(request: HttpRequest, baby_date_id: int) -> JsonResponse:
+    """
+    一次查询返回宝宝的体重、身高和头围三条生长曲线数据
+    数据未变化时由 condition 直接返回 304, 不做序列化
+    每条曲线的点数超过 ?points= 时用 LTTB 降采样
+    """
+    error = _check_growth_series_access(request, baby_date_id)
+    if error is not None:
+        return error
+    values = list(models.GrowthData.objects.filter(
+        baby_date=baby_date_id
+    ).order_by('record_at').values('record_at', *GROWTH_SERIES_FIELDS, 'notes'))
+    points = get_series_points(request)
+    return JsonResponse({
+        field: _serialize_growth_values(values, field, points)
+        for field in GROWTH_SERIES_FIELDS
+    })
+
+
+# {序列名: (模型, 时间字段, 数值字段, 降采样方法)}
+# 体温保留每个桶的最高和最低读数, 不会漏掉发烧
+TIME_SERIES = {
+    'body-temperature': (models.BodyTemperature, 'measure_at', 'temperature', minmax),
+    'feeding': (models.Feeding, 'feed_at', 'amount', lttb),
+}
+
+
+@cache_control(private=True, no_cache=True)
+def fetch_time_series(request: HttpRequest, baby_date_id: int, series: str) -> JsonResponse:
+    """
+    宝宝某项记录在一段本地日期内的时间序列, 按时间正序, 点数超过 ?points= 时降采样
+    ?start=2025-06-01&end=2025-08-29, 默认为截至今天的 BABYCARE_SERIES_DEFAULT_DAYS 天,
+    最长 BABYCARE_SERIES_MAX_DAYS 天, 查询只取回范围内的记录; 更长的范围使用 fetch_aggregate
+    :param series: TIME_SERIES 中的序列名, 如 body-temperature
+    """
+    if series not in TIME_SERIES:
+        return JsonResponse({'error': f'Invalid series {series}'})
+    if not models.BabyDate(pk=baby_date_id).can_be_accessed_by(request.user):
         return JsonResponse({'error': 'Insufficient permission'})
-    qs = models.GrowthData.objects.filter(baby_date=baby_date)
-    if fenton_type == 'weight':
-        values = qs.filter(weight__isnull=False
-                  ).order_by('-record_at'
-                             ).values('record_at', 'weight', 'notes')
-        return JsonResponse(list(map(
-            lambda x: {
-                'datetime': get_local_date(x['record_at']).strftime('%Y-%m-%d'),
-                'yData': x['weight'],
-                'notes': x['notes'],
-            },
-            values,
-        )), safe=False)
-    elif fenton_type == 'height':
-        values = qs.filter(height__isnull=False
-                  ).order_by('-record_at'
-                             ).values('record_at', 'height', 'notes')
-        return JsonResponse(list(map(
-            lambda x: {
-                'datetime': get_local_date(x['record_at']).strftime('%Y-%m-%d'),
-                'yData': x['height'],
-                'notes': x['notes'],
-            },
-            values,
-        )), safe=False)
-    elif fenton_type == 'head_circumference':
-        values = qs.filter(head_circumference__isnull=False
-                  ).order_by('-record_at'
-                             ).values('record_at', 'head_circumference', 'notes')
-        return JsonResponse(list(map(
-            lambda x: {
-                'datetime': get_local_date(x['record_at']).strftime('%Y-%m-%d'),
-                'yData': x['head_circumference'],
-                'notes': x['notes'],
-            },
-            values,
-        )), safe=False)
-    return JsonResponse({'error': 'Invalid fenton type f{fenton_type}'})
+    default_days = getattr(settings, 'BABYCARE_SERIES_DEFAULT_DAYS', 90)
+    max_days = getattr(settings, 'BABYCARE_SERIES_MAX_DAYS', 366)
+    try:
+        end = date.fromisoformat(request.GET['end']) if request.GET.get('end') else timezone.localdate()
+        start = (
+            date.fromisoformat(request.GET['start']) if request.GET.get('start')
+            else end - timedelta(days=default_days - 1)
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if start > end or (end - start).days + 1 > max_days:
+        return JsonResponse({'error': f'start 不能晚于 end, 最多 {max_days} 天'}, status=400)
+    model, time_field, field, method = TIME_SERIES[series]
+    values = list(model.objects.filter(
+        baby_date=baby_date_id,
+        local_date__range=(start, end),
+    ).order_by(time_field).values(time_field, field))
+    return JsonResponse([
+        {'datetime': value[time_field].isoformat(), 'yData': value[field]}
+        for value in downsample_values(values, time_field, field, get_series_points(request), method)
+    ], safe=False)
+
 
+@login_or_404
+@cache_control(private=True, no_cache=True)
+def fetch_aggregate(request: HttpRequest, baby_date_id: int, model_name: str) -> JsonResponse:
+    """
+    按时间桶汇总记录, 如最近 90 天每天的喂奶总量:
+    ?bucket=day&agg=sum,count&field=amount&start=2025-06-01&end=2025-08-29
+    参数见 aggregates.aggregate_series, agg 以逗号分隔, 参数无效时返回 400
+    """
+    if not request.baby_acl.can_access(baby_date_id):  # type: ignore
+        raise Http404()
+    try:
+        start, end = (
+            date.fromisoformat(request.GET[key]) if request.GET.get(key) else None
+            for key in ('start', 'end')
+        )
+        result = aggregate_series(
+            baby_date_id,
+            model_name,
+            bucket=request.GET.get('bucket', 'day'),
+            aggregates=[name for name in request.GET.get('agg', '').split(',') if name],
+            field=request.GET.get('field') or None,
+            start=start,
+            end=end,
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    return JsonResponse(result)
+
+
+def _get_growth_chart_theme(request: HttpRequest) -> str:
+    """?theme= 优先, 其次是页面主题的 cookie"""
+    theme = request.GET.get('theme') or request.COOKIES.get('theme')
+    return theme if theme in THEMES else 'light'
+
+
+def growth_chart_version(request: HttpRequest, baby_date_id: int) -> str | None:
+    """
+    生长曲线的版本, 包含生长数据和宝宝的性别、末次月经
+    同一请求内只查询一次
+    :return: 没有访问权限时返回 None
+    """
+    cache_attr = f'_growth_chart_baby_{baby_date_id}'
+    etag = growth_series_etag(request, baby_date_id)
+    if etag is None:
+        return None
+    if not hasattr(request, cache_attr):
+        setattr(request, cache_attr, models.BabyDate.objects.filter(pk=baby_date_id).first())
+    baby_date = getattr(request, cache_attr)
+    if baby_date is None:
+        return None
+    return f"{etag}-{baby_date.gender}-{baby_date.last_menstrual_period:%Y%m%d}"
+
+
+def growth_chart_etag(request: HttpRequest, baby_date_id: int, metric: str, **kwargs) -> str | None:
+    version = growth_chart_version(request, baby_date_id)
+    return version and f"{version}-{metric}-{_get_growth_chart_theme(request)}"
+
+
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=growth_chart_etag)
+def growth_chart(request: HttpRequest, baby_date_id: int, metric: str) -> HttpResponse:
+    """
+    服务端渲染的生长曲线 SVG, 供 <img> 直接引用
+    :param metric: weight, height 或 head_circumference
+    """
+    version = growth_chart_version(request, baby_date_id)
+    if metric not in GROWTH_SERIES_FIELDS or version is None:
+        raise Http404()
+    baby_date = getattr(request, f'_growth_chart_baby_{baby_date_id}')
+    svg = get_growth_chart(baby_date, metric, version, _get_growth_chart_theme(request))
+    return HttpResponse(svg, content_type='image/svg+xml')
 
 
 @require_POST
@@ -417,15 +769,15 @@ def feeding_list(request: HttpRequest, baby_date_id: int):
     context['previous_day'] = feed_date - timedelta(1)
     if feed_date < timezone.localdate():
         context['next_day'] = feed_date + timedelta(1)
-    context['feedings'] = feedings = models.Feeding.objects.filter(baby_date=baby_date_id).filter(
-        feed_at__range=get_range_of_date(feed_date)).order_by('-feed_at')
-    if feedings:
-        context['feedings_total'] = feedings.aggregate(Sum('amount'))
+    context['feedings'] = models.Feeding.objects.filter(
+        baby_date=baby_date_id, local_date=feed_date).order_by('-feed_at')
+    context['feeding_summary'] = models.DailyBabySummary.objects.filter(
+        baby_date=baby_date_id, date=feed_date, feeding_count__gt=0).first()
     return render(request, 'babycare/feedings_list.html', context)
 
 
 decorators.method_decorator(login_or_404, name='dispatch')
-class BodyTemperatureListView(ListView):
+class BodyTemperatureListView(KeysetPaginationMixin, ListView):
     """
     View to list all body temperatures.
     """
@@ -433,6 +785,7 @@ class BodyTemperatureListView(ListView):
     template_name = 'babycare/body_temperatures_list.html'
     context_object_name = 'body_temperatures'
     paginate_by = 8
+    keyset_field = 'measure_at'
 
     def get_queryset(self):
         return models.BodyTemperature.objects.filter(baby_date=self.kwargs['baby_date_id']).order_by('-measure_at')
@@ -444,7 +797,7 @@ class BodyTemperatureListView(ListView):
 
 
 decorators.method_decorator(login_or_404, name='dispatch')
-class GrowthDataListView(ListView):
+class GrowthDataListView(KeysetPaginationMixin, ListView):
     """
     View to list all growth data.
     """
@@ -452,6 +805,7 @@ class GrowthDataListView(ListView):
     template_name = 'babycare/growth_datas_list.html'
     context_object_name = 'growth_data'
     paginate_by = 10
+    keyset_field = 'record_at'
 
     def get_queryset(self):
         return models.GrowthData.objects.filter(baby_date=self.kwargs['baby_date_id']).order_by('-record_at')
@@ -463,7 +817,7 @@ class GrowthDataListView(ListView):
 
 
 decorators.method_decorator(login_or_404, name='dispatch')
-class DiaperListView(ListView):
+class DiaperListView(KeysetPaginationMixin, ListView):
     """
     View to list all growth data.
     """
@@ -471,6 +825,7 @@ class DiaperListView(ListView):
     template_name = 'babycare/diapers_list.html'
     context_object_name = 'diapers'
     paginate_by = 10
+    keyset_field = 'create_at'
 
     def get_queryset(self):
         return models.Diaper.objects.filter(baby_date=self.kwargs['baby_date_id']).order_by('-create_at')
@@ -482,14 +837,15 @@ class DiaperListView(ListView):
 
 
 decorators.method_decorator(login_or_404, name='dispatch')
-class MiscRecordListView(ListView):
+class MiscRecordListView(KeysetPaginationMixin, ListView):
     model = models.MiscRecord
     template_name = 'babycare/misc_records_list.html'
     context_object_name = 'misc_records'
     paginate_by = 10
+    keyset_field = 'record_at'
 
     def get_queryset(self):
-        return models.MiscRecord.objects.filter(baby_date=self.kwargs['baby_date_id']).order_by('-record_at')
+        return models.MiscRecord.objects.filter(baby_date=self.kwargs['baby_date_id']).select_related('misc_item').order_by('-record_at')
 
     def get_context_data(self, **kwargs: Any) -> dict[str, Any]:
         context = super().get_context_data(**kwargs)
@@ -0,0 +1,58 @@
+/*
+ * 订阅变化通知(SSE), 宝宝记录变化时只重新加载对应宝宝对应分区的记录表格,
+ * 计划、清单和权限变化或错过了通知(reset)时显示刷新提示
+*/
+document.addEventListener('DOMContentLoaded', function () {
+    const notice = document.getElementById('live-update-notice');
+    if (!notice || !window.EventSource) {
+        return;
+    }
+    // 通知中的 type 对应的分区 id
+    const sections = {
+        feeding: 'baby-feeding',
+        bodytemperature: 'body-temperature',
+        growthdata: 'growth-data',
+        diaper: 'diaper',
+        miscrecord: 'misc-record',
+    };
+
+    function refreshTable(babyDateId, section) {
+        const baby = document.getElementById(`baby${babyDateId}`);
+        const table = baby && baby.querySelector(`#${section} [data-record-table]`);
+        if (!table) {
+            return;
+        }
+        const url = notice.dataset.recordTableUrl
+            .replace('/0/', `/${babyDateId}/`)
+            .replace('/section/', `/${section}/`);
+        fetch(url, {credentials: 'same-origin'}).then(function (response) {
+            if (!response.ok) {
+                throw new Error(`load failed: ${response.status}`);
+            }
+            return response.text();
+        }).then(function (html) {
+            table.innerHTML = html;
+            table.querySelectorAll('[data-bs-toggle="tooltip"]').forEach(function (el) {
+                new bootstrap.Tooltip(el);
+            });
+        }).catch(function (error) {
+            console.log(error);
+        });
+    }
+
+    const source = new EventSource(notice.dataset.eventsUrl);
+    source.addEventListener('change', function (event) {
+        const data = JSON.parse(event.data);
+        const types = data.type === 'bulk' ? data.models : [data.type];
+        const known = types.filter(function (type) { return type in sections; });
+        known.forEach(function (type) {
+            refreshTable(data.baby, sections[type]);
+        });
+        if (known.length < types.length) {
+            notice.hidden = false;
+        }
+    });
+    source.addEventListener('reset', function () {
+        notice.hidden = false;
+    });
+});
@@ -32,6 +32,14 @@ document.addEventListener('DOMContentLoaded', function () {
                 break;
         }
         setCookie('theme', currentTheme);
+        // 服务端渲染的生长曲线按主题着色
+        document.querySelectorAll('img.growth-chart').forEach(function (chart) {
+            const url = new URL(chart.src);
+            if (url.searchParams.get('theme') !== currentTheme) {
+                url.searchParams.set('theme', currentTheme);
+                chart.src = url.toString();
+            }
+        });
     }
 
     onThemeChange();
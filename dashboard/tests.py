@@ -1,3 +1,47 @@
+import asyncio
+
 from django.test import TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from babycare.models import BabyDate, BabyRelation
+from iuser.models import User
+from utils.events import TASKS_CHANNEL, baby_channel, get_backend
+
+
+class EventsViewTestCase(TestCase):
+    def setUp(self):
+        lmp = timezone.now().date() - timezone.timedelta(days=300)
+        self.user = User.objects.create_user('live')
+        self.baby = BabyDate.objects.create(nickname='live', last_menstrual_period=lmp)
+        self.other = BabyDate.objects.create(nickname='other', last_menstrual_period=lmp)
+        BabyRelation.objects.create(baby_date=self.baby, request_by=self.user, status=2)
+        self.client.force_login(self.user)
+        self.async_client.force_login(self.user)
+
+    async def test_stream(self):
+        response = await self.async_client.get(reverse('dashboard:events'))
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        chunks: asyncio.Queue[bytes] = asyncio.Queue()
+
+        async def consume():
+            async for chunk in response:
+                await chunks.put(chunk)
+
+        # 与 ASGI 服务器一样在任务中读取, 连接断开时取消任务
+        task = asyncio.create_task(consume())
+        self.assertEqual(await chunks.get(), b': connected\n\n')
+        backend = get_backend()
+        backend.publish(baby_channel(self.other.pk), {'id': 1})
+        backend.publish(TASKS_CHANNEL, {'id': 2})
+        chunk = await chunks.get()
+        self.assertIn(b'event: change', chunk)
+        self.assertIn(b'data: {"id":2}', chunk)
+        task.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await task
+        self.assertFalse(backend.subscriptions)
 
-# Create your tests here.
+    def test_wsgi(self):
+        response = self.client.get(reverse('dashboard:events'))
+        self.assertEqual(response.status_code, 204)
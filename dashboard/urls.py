@@ -5,4 +5,6 @@ from . import views
 app_name = 'dashboard'
 urlpatterns = [
     path('', views.index, name='index'),
+    path('async/', views.async_index, name='async_index'),
+    path('events/', views.events, name='events'),
 ]
\ No newline at end of file
@@ -1,11 +1,22 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import render
-from django.http import HttpRequest, HttpResponse
+from django.http import HttpRequest, HttpResponse, StreamingHttpResponse
+from django.utils import timezone
 
-from babycare.models import BabyRelation, BabyDate, Feeding, BodyTemperature, GrowthData, Diaper, MiscRecord
-from babycare.modelforms import FeedingForm, BodyTemperatureForm, GrowthDataForm, DiaperForm, MiscRecordForm
+from babycare.acl import BabyACL
+from babycare.models import BabyDate
+from babycare.fragments import arender_baby_sections, render_baby_sections
+from babycare.loaders import alist
 from task_calendar.models import TaskCalendar
 from task_calendar.modelforms import TaskCalendarForm
 from shopping_list.models import ShoppingList
+from iuser.decorators import login_or_404
+from utils.events import (
+    SHOPPING_LISTS_CHANNEL, TASKS_CHANNEL, baby_channel, get_backend, iter_sse, user_channel,
+)
 
 
 def index(request: HttpRequest) -> HttpResponse:
@@ -29,36 +40,88 @@ def index(request: HttpRequest) -> HttpResponse:
     if request.session.get_expiry_age() <= 7*24*3600:
         request.session.set_expiry(7 * 24 * 3600)
 
-    baby_dates = BabyRelation.objects.filter(
-        request_by=request.user,
-        status__in=BabyRelation.accessible_status()
-    ).values_list('baby_date', flat=True)
-    context['babies'] = babies = []
-    for baby_date in BabyDate.objects.filter(id__in=baby_dates):
+    baby_dates = list(BabyDate.objects.filter(
+        id__in=request.baby_acl.accessible_ids()))  # type: ignore
+    context['babies'] = _build_babies(baby_dates, render_baby_sections(request, baby_dates))
+    return render(request, 'dashboard/index.html', context)
+
+
+async def async_index(request: HttpRequest) -> HttpResponse:
+    """
+    index 的异步版本, 在 ASGI 下并发加载计划、清单和宝宝的记录分区
+    渲染模板时不能再查询数据库, 所有数据都在渲染前加载完
+    """
+    user = await request.auser()  # type: ignore[attr-defined]
+    if user.is_anonymous:
+        return render(request, 'dashboard/public_index.html')
+    # 模板中的 request.user 不能在异步上下文中同步加载, 换成已加载的用户
+    request.user = user
+
+    context = dict()
+    context['active'] = 'index'
+    context['task_form'] = TaskCalendarForm()
+    context['babycare_active'] = request.GET.get(
+        'babycare_active', 'baby-feeding')
+
+    if await request.session.aget_expiry_age() <= 7*24*3600:
+        await request.session.aset_expiry(7 * 24 * 3600)
+
+    context['task_calendars'], context['shopping_lists'], context['babies'] = await asyncio.gather(
+        alist(TaskCalendar.objects.all().order_by('-start_date')),
+        alist(ShoppingList.get_recent_lists()),
+        _aload_babies(request),
+    )
+    return render(request, 'dashboard/index.html', context)
+
+
+async def _aload_babies(request: HttpRequest) -> list[dict]:
+    acl = await request.ababy_acl()  # type: ignore[attr-defined]
+    baby_dates = await alist(BabyDate.objects.filter(id__in=acl.accessible_ids()))
+    return _build_babies(baby_dates, await arender_baby_sections(request, baby_dates))
+
+
+def _build_babies(baby_dates: list[BabyDate], sections: dict[int, dict[str, str]]) -> list[dict]:
+    today = timezone.localdate()
+    babies = []
+    for baby_date in baby_dates:
         baby = dict()
         baby['baby_date'] = baby_date
+        baby['age'] = baby_date.get_age_snapshot(today)
+        baby['sections'] = sections[baby_date.pk]
+        babies.append(baby)
+    return babies
 
-        baby['feedings'] = Feeding.get_recent_feedings(baby_date.pk)
-        baby['feeding_form'] = FeedingForm(initial={'baby_date': baby_date.pk})
-            
-        baby['body_temperatures'] = BodyTemperature.get_recent_temp(
-            baby_date.pk)
-        baby['body_temperature_form'] = BodyTemperatureForm(
-            initial={'baby_date': baby_date.pk})
-        
-        baby['growth_data'] = GrowthData.get_recent_growth_data(baby_date.pk)
-        baby['growth_data_form'] = GrowthDataForm(
-            initial={'baby_date': baby_date.pk})
-
-        baby['diapers'] = Diaper.get_recent_diapers(baby_date.pk)
-        baby['diaper_form'] = DiaperForm(
-            initial={'baby_date': baby_date.pk}
-        )
-
-        baby['misc_records'] = MiscRecord.get_recent_records(baby_date.pk)
-        baby['misc_record_form'] = MiscRecordForm(
-            initial={'baby_date': baby_date.pk}
-        )
 
-        babies.append(baby)
-    return render(request, 'dashboard/index.html', context)
+@login_or_404
+async def events(request: HttpRequest) -> HttpResponse:
+    """
+    当前用户可访问的宝宝、计划和清单的变化通知, Server-Sent Events 流
+    只推送变化的类型和 id, 页面收到后自行加载数据
+    长连接只能在 ASGI 下运行, WSGI 下返回 204, EventSource 收到 204 后不再重连
+    """
+    if not isinstance(request, ASGIRequest):
+        return HttpResponse(status=204)
+    user = request.user
+    acl = await request.ababy_acl()  # type: ignore[attr-defined]
+    subscription = get_backend().subscribe(_get_channels(user.pk, acl))
+
+    async def on_event(event):
+        if event.channel == user_channel(user.pk):
+            # 权限变化, 重新加载并更新订阅的宝宝
+            acl = await sync_to_async(BabyACL.load)(user.pk)
+            subscription.channels = _get_channels(user.pk, acl)
+
+    response = StreamingHttpResponse(
+        iter_sse(subscription, on_event=on_event), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'  # nginx 不缓冲
+    return response
+
+
+def _get_channels(user_id: int, acl: BabyACL) -> set[str]:
+    return {
+        user_channel(user_id),
+        TASKS_CHANNEL,
+        SHOPPING_LISTS_CHANNEL,
+        *(baby_channel(pk) for pk in acl.accessible_ids()),
+    }
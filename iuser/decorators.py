@@ -1,9 +1,20 @@
+from asgiref.sync import iscoroutinefunction
 from django.http import HttpRequest, Http404
 
 def login_or_404(fn):
+    if iscoroutinefunction(fn):
+        async def _async_wrapper(request: HttpRequest, *args, **kwargs):
+            user = await request.auser()  # type: ignore[attr-defined]
+            if user.is_anonymous:
+                raise Http404()
+            # 模板中的 request.user 不能在异步上下文中同步加载, 换成已加载的用户
+            request.user = user
+            return await fn(request, *args, **kwargs)
+        return _async_wrapper
+
     def _wrapper(request: HttpRequest, *args, **kwargs):
         if request.user.is_anonymous:
             raise Http404()
         else:
             return fn(request, *args, **kwargs)
-    return _wrapper
\ No newline at end of file
+    return _wrapper
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 11:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('iuser', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='pending_approval_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
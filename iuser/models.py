@@ -2,6 +2,9 @@ from django.db import models
 from django.contrib.auth.models import AbstractUser
 
 # Create your models here.
-class User(AbstractUser):    
+class User(AbstractUser):
+    # 可以审批的宝宝关系申请数, 由 babycare.signals 在关系变化时更新, 用于导航栏
+    pending_approval_count = models.PositiveIntegerField(default=0, editable=False)
+
     def __str__(self):
         return self.username
\ No newline at end of file
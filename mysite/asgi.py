@@ -5,6 +5,25 @@ It exposes the ASGI callable as a module-level variable named ``application``.
 
 For more information on this file, see
 https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
+
+运行方式 (需要另外安装 uvicorn 或 daphne, 设置模块需要明确指定):
+
+    DJANGO_SETTINGS_MODULE=mysite.settings.prod \
+        uvicorn mysite.asgi:application --host 0.0.0.0 --port 8000 --workers 4 --lifespan off
+
+    DJANGO_SETTINGS_MODULE=mysite.settings.prod \
+        daphne -b 0.0.0.0 -p 8000 mysite.asgi:application
+
+- dashboard:async_index (/dashboard/async/) 和 babycare:async_index (/babycare/async/)
+  是异步视图, 用 asyncio.gather 并发加载各部分数据; 其他同步视图在线程中运行, 功能不受影响。
+- 自定义中间件 (MetricsMiddleware, BabyACLMiddleware) 同时支持同步和异步,
+  DEBUG 时的 debug_toolbar 也支持异步, 异步视图不会因为中间件退回到线程中运行。
+- Django 的异步 ORM 仍在同一个线程中依次执行查询, 并发加载的收益主要是等待数据库时不阻塞其他请求,
+  单个请求的耗时与同步版本接近, 可以用 benchmark_views 命令比较 WSGI 和 ASGI 版本。
+- dashboard:events (/dashboard/events/) 是变化通知的 SSE 长连接, 只能在 ASGI 下使用;
+  多个 worker 时 EVENTS_BACKEND 需要设为 utils.events.CacheBackend 并配置共享的 CACHES。
+- 数据库连接在 ASGI 下不能跨请求复用, 保持 CONN_MAX_AGE = 0, 需要复用时使用数据库连接池。
+- ASGI 服务器不处理静态文件, 部署时由 nginx 等提供 collectstatic 后的 STATIC_ROOT。
 """
 
 import os
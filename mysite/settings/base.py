@@ -49,11 +49,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'utils.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'babycare.middleware.BabyACLMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'debug_toolbar.middleware.DebugToolbarMiddleware',
@@ -133,6 +135,39 @@ LOGIN_REDIRECT_URL = 'dashboard'
 LOGIN_URL = 'login'
 LOGOUT_URL = 'logout'
 
+# Babycare
+# 跨请求缓存用户权限的秒数, 0 表示只在单个请求内缓存
+# 多进程部署开启时需要配置共享的 CACHES
+BABYCARE_ACL_CACHE_TIMEOUT = 0
+# dashboard 上宝宝记录分区 HTML 片段的缓存时间(秒), 0 表示不缓存
+# 键中包含宝宝的 data_version, 记录变化后自动失效, 进程内缓存也不会显示旧数据
+BABYCARE_FRAGMENT_CACHE_TIMEOUT = 24 * 3600
+# 服务端渲染的生长曲线 SVG 的缓存时间(秒), 0 表示不缓存, 键中包含生长数据的版本
+BABYCARE_CHART_CACHE_TIMEOUT = 7 * 24 * 3600
+# 时间序列接口每条序列最多返回的点数, 更长的序列降采样
+BABYCARE_SERIES_MAX_POINTS = 500
+# 时间序列接口默认和最长的本地日期范围(天)
+BABYCARE_SERIES_DEFAULT_DAYS = 90
+BABYCARE_SERIES_MAX_DAYS = 366
+
+# Metrics
+# 耗时(秒)或查询次数超过以下值的请求会连同最慢的 METRICS_SLOWEST_SQL 条 SQL 记入日志
+METRICS_SLOW_REQUEST_SECONDS = 1.0
+METRICS_SLOW_REQUEST_QUERIES = 50
+METRICS_SLOWEST_SQL = 3
+# /metrics/ 默认关闭, 开启后只允许 is_staff 用户或带有 Authorization: Bearer <METRICS_BEARER_TOKEN> 的请求
+# 不按 INTERNAL_IPS 放行: 在 nginx 等本机反向代理之后, 所有外部请求的 REMOTE_ADDR 都是 127.0.0.1
+METRICS_ENDPOINT_ENABLED = False
+METRICS_BEARER_TOKEN = None
+
+# Events
+# 变化通知的分发后端, LocalBackend 只在进程内分发,
+# 多进程部署使用 utils.events.CacheBackend 并配置共享的 CACHES
+EVENTS_BACKEND = 'utils.events.LocalBackend'
+EVENTS_OPTIONS = {}
+# SSE 流空闲时发送心跳的间隔(秒)
+EVENTS_KEEPALIVE_SECONDS = 15
+
 # Message
 from django.contrib.messages import constants as messages
 MESSAGE_TAGS = {
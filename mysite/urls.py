@@ -20,6 +20,8 @@ from django.views.generic import RedirectView
 
 from debug_toolbar.toolbar import debug_toolbar_urls
 
+from utils.metrics import metrics_view
+
 urlpatterns = [
     path('', RedirectView.as_view(url='/dashboard/', permanent=False), name='home'),
     path('0725accounts/', include('iuser.urls')),
@@ -28,4 +30,5 @@ urlpatterns = [
     path('shopping_list/', include('shopping_list.urls')),
     path('task_calendar/', include('task_calendar.urls')),
     path('babycare/', include('babycare.urls')),
+    path('metrics/', metrics_view, name='metrics'),
 ] + debug_toolbar_urls()
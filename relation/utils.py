@@ -19,7 +19,8 @@ def get_ancestors(member: Member) -> dict[Member, list[Ancestor]]:
         ancestor = to_visit.pop()
         mem = ancestor.member
         degree = ancestor.degree
-        for relation in Relation.objects.filter(member2=mem, relation_type='P'):
+        for relation in Relation.objects.filter(
+                member2=mem, relation_type='P').select_related('member1'):
             if relation.member1 not in ancestors:
                 ancestors[relation.member1] = ancestors[mem] + [
                     Ancestor(relation.member1, degree + 1)]
@@ -0,0 +1,33 @@
+from django.db.models.signals import post_delete, post_save
+
+from utils.events import SHOPPING_LISTS_CHANNEL, publish
+
+from .models import ItemCategory, ItemRecord, ShoppingList
+
+
+# 通知中指向上级的字段, 不需要额外查询
+PARENT_FIELDS = {
+    ShoppingList: None,
+    ItemCategory: 'shopping_list',
+    ItemRecord: 'category',
+}
+
+
+def publish_shopping_list_change(sender, instance, created=None, raw=False, **kwargs):
+    """推送清单、品类和单品的变化, post_delete 没有 created 参数"""
+    if raw:
+        return
+    data = {
+        'type': sender._meta.model_name,
+        'action': 'deleted' if created is None else 'created' if created else 'updated',
+        'id': instance.pk,
+    }
+    parent = PARENT_FIELDS[sender]
+    if parent is not None:
+        data[parent] = getattr(instance, f'{parent}_id')
+    publish(SHOPPING_LISTS_CHANNEL, data)
+
+
+for model in PARENT_FIELDS:
+    post_save.connect(publish_shopping_list_change, sender=model)
+    post_delete.connect(publish_shopping_list_change, sender=model)
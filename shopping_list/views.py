@@ -25,7 +25,7 @@ def shopping_list_detail_inplace(request, shopping_list_id):
 def shopping_list_edit(request, shopping_list_id):
     context = dict()
     context['shopping_list'] = shopping_list = get_object_or_404(
-        ShoppingList, id=shopping_list_id)
+        ShoppingList.objects.prefetch_related('categories__items'), id=shopping_list_id)
     context['cates'] = cates = dict()
     for item_category in shopping_list.categories.all():  # type: ignore
         item_category.context = ItemCategoryForm(
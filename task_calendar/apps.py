@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class TaskCalendarConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'task_calendar'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,21 @@
+from django.db.models.signals import post_delete, post_save
+
+from utils.events import TASKS_CHANNEL, publish
+
+from .models import TaskCalendar
+
+
+def publish_task_change(sender, instance, created=None, raw=False, **kwargs):
+    """推送计划的新增、状态变化和删除, post_delete 没有 created 参数"""
+    if raw:
+        return
+    publish(TASKS_CHANNEL, {
+        'type': 'taskcalendar',
+        'action': 'deleted' if created is None else 'created' if created else 'updated',
+        'id': instance.pk,
+        'is_completed': instance.is_completed,
+    })
+
+
+post_save.connect(publish_task_change, sender=TaskCalendar)
+post_delete.connect(publish_task_change, sender=TaskCalendar)
@@ -0,0 +1,97 @@
+"""
+测量一段代码的耗时、SQL 查询次数和内存峰值, 并输出可跨提交比较的 JSON 报告
+"""
+import datetime
+import json
+import platform
+import subprocess
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable
+
+import django
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+@dataclass
+class Measurement:
+    name: str
+    size: str
+    wall_ms: float  # 多次运行中的最小值
+    queries: int
+    peak_kb: float  # tracemalloc 统计的 Python 内存峰值
+    budget: int | None = None
+    extra: dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def over_budget(self) -> bool:
+        return self.budget is not None and self.queries > self.budget
+
+
+def measure(
+        name: str,
+        size: str,
+        func: Callable[[], Any],
+        repeat: int = 3,
+        budget: int | None = None,
+    ) -> Measurement:
+    """
+    运行 func repeat 次, 耗时取最小值, 查询次数和内存峰值取最后一次
+    内存单独再运行一次测量, 避免 tracemalloc 的开销计入耗时
+    """
+    wall = float('inf')
+    queries = 0
+    for _ in range(max(repeat, 1)):
+        with CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            func()
+            wall = min(wall, time.perf_counter() - started)
+        queries = len(ctx)
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measurement(
+        name=name,
+        size=size,
+        wall_ms=round(wall * 1000, 3),
+        queries=queries,
+        peak_kb=round(peak / 1024, 1),
+        budget=budget,
+    )
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True, timeout=5,
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def write_report(path: str | Path, measurements: list[Measurement], **meta) -> dict:
+    """
+    写入 JSON 报告, 包含提交、数据库和版本信息以便比较
+    :param meta: 额外写入报告的信息, 如各数据规模的行数
+    """
+    report = {
+        'created_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'commit': _git_commit(),
+        'database': connection.vendor,
+        'python': platform.python_version(),
+        'django': django.get_version(),
+        **meta,
+        'results': [
+            dict(asdict(m), over_budget=m.over_budget) for m in measurements
+        ],
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return report
@@ -0,0 +1,65 @@
+"""
+时间序列的降采样, 把任意长度的序列缩减到不超过目标点数
+
+lttb: Largest-Triangle-Three-Buckets, 保留视觉形状, 适合生长数据、喂奶量等趋势曲线
+minmax: 每个桶保留最小值和最大值, 不会漏掉峰值, 适合体温等需要看到异常读数的序列
+两者都返回被选中的点的下标, 调用方按下标取原始记录, 首尾两点总是保留。
+x 需要单调排列 (升序或降序均可), 一般为时间戳。
+"""
+from typing import Sequence
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> list[int]:
+    """
+    :param threshold: 目标点数, 小于 3 或不小于序列长度时不降采样
+    :return: 选中点的下标, 与输入顺序一致
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 3:
+        return list(range(n))
+    selected = [0]
+    # 除首尾两点外, 其余点平均分到 threshold - 2 个桶中
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        # 下一个桶的平均点, 最后一个桶的下一个为末点
+        next_start = end
+        next_end = min(int((i + 2) * every) + 1, n)
+        if next_start >= n - 1:
+            avg_x, avg_y = xs[n - 1], ys[n - 1]
+        else:
+            count = next_end - next_start
+            avg_x = sum(xs[next_start:next_end]) / count
+            avg_y = sum(ys[next_start:next_end]) / count
+        ax, ay = xs[a], ys[a]
+        best, best_area = start, -1.0
+        for j in range(start, end):
+            area = abs((ax - avg_x) * (ys[j] - ay) - (ax - xs[j]) * (avg_y - ay))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(n - 1)
+    return selected
+
+
+def minmax(xs: Sequence[float], ys: Sequence[float], threshold: int) -> list[int]:
+    """
+    :param threshold: 目标点数, 每个桶 2 个点, 小于 4 或不小于序列长度时不降采样
+    :return: 选中点的下标, 与输入顺序一致
+    """
+    n = len(xs)
+    if threshold >= n or threshold < 4:
+        return list(range(n))
+    selected = {0, n - 1}
+    buckets = (threshold - 2) // 2
+    every = (n - 2) / buckets
+    for i in range(buckets):
+        start = int(i * every) + 1
+        end = int((i + 1) * every) + 1
+        indexes = range(start, end)
+        selected.add(min(indexes, key=ys.__getitem__))
+        selected.add(max(indexes, key=ys.__getitem__))
+    return sorted(selected)
@@ -0,0 +1,255 @@
+"""
+数据变化通知的发布/订阅, 通过 Server-Sent Events 推送给浏览器
+
+publish(channel, data) 在当前事务提交后把事件交给后端, 后端把事件分发给订阅了该频道的连接。
+后端由 EVENTS_BACKEND 设置, EVENTS_OPTIONS 为其初始化参数:
+    utils.events.LocalBackend: 只在当前进程内分发, 适合单进程部署和开发
+    utils.events.CacheBackend: 事件按序号写入 Django cache, 各进程轮询读取,
+        多进程部署时需要配置共享的 CACHES (如 Redis, Memcached)
+订阅者处理不过来或错过了事件时, 流中会发送 reset 事件, 客户端应重新加载数据。
+"""
+import asyncio
+import itertools
+import json
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Iterable
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.module_loading import import_string
+
+
+TASKS_CHANNEL = 'tasks'
+SHOPPING_LISTS_CHANNEL = 'shopping_lists'
+
+
+def baby_channel(baby_date_id: int) -> str:
+    return f'baby:{baby_date_id}'
+
+
+def user_channel(user_id: int) -> str:
+    """用户自己的频道, 用于通知其权限变化"""
+    return f'user:{user_id}'
+
+
+@dataclass(frozen=True)
+class Event:
+    id: int
+    channel: str
+    data: dict[str, Any]
+
+
+class LocalSubscription:
+    """
+    LocalBackend 的订阅, 只能在创建它的事件循环中读取
+    发布可能来自任意线程, 通过 call_soon_threadsafe 放入队列
+    """
+
+    def __init__(self, backend: 'LocalBackend', channels: Iterable[str], max_queue: int):
+        self.backend = backend
+        self.channels = set(channels)
+        self.overflowed = False
+        self.loop = asyncio.get_running_loop()
+        self.queue: asyncio.Queue[Event] = asyncio.Queue(max_queue)
+
+    def deliver(self, event: Event) -> None:
+        self.loop.call_soon_threadsafe(self._put, event)
+
+    def _put(self, event: Event) -> None:
+        if event.channel not in self.channels:
+            return
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+
+    async def get(self, timeout: float) -> Event | None:
+        """等待下一个事件, 超时返回 None"""
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    def close(self) -> None:
+        self.backend.unsubscribe(self)
+
+
+class LocalBackend:
+    """进程内的后端"""
+
+    def __init__(self, max_queue: int = 100):
+        self.max_queue = max_queue
+        self.lock = threading.Lock()
+        self.subscriptions: set[LocalSubscription] = set()
+        self.ids = itertools.count(1)
+
+    def publish(self, channel: str, data: dict[str, Any]) -> Event:
+        with self.lock:
+            event = Event(next(self.ids), channel, data)
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            try:
+                subscription.deliver(event)
+            except RuntimeError:  # 事件循环已关闭
+                self.unsubscribe(subscription)
+        return event
+
+    def subscribe(self, channels: Iterable[str]) -> LocalSubscription:
+        subscription = LocalSubscription(self, channels, self.max_queue)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription: LocalSubscription) -> None:
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+
+class CacheSubscription:
+    """CacheBackend 的订阅, 从订阅时的序号开始轮询"""
+
+    def __init__(self, backend: 'CacheBackend', channels: Iterable[str]):
+        self.backend = backend
+        self.channels = set(channels)
+        self.overflowed = False
+        self.last_id = backend.cache.get(backend.SEQ_KEY, 0)
+        self.pending: list[Event] = []
+        self.missing_since: float | None = None
+
+    async def get(self, timeout: float) -> Event | None:
+        deadline = time.monotonic() + timeout
+        while not self.pending:
+            await self.poll()
+            remaining = deadline - time.monotonic()
+            if self.pending or remaining <= 0:
+                break
+            await asyncio.sleep(min(self.backend.poll_interval, remaining))
+        return self.pending.pop(0) if self.pending else None
+
+    async def poll(self) -> None:
+        cache = self.backend.cache
+        seq = await cache.aget(self.backend.SEQ_KEY, 0)
+        if seq <= self.last_id:
+            return
+        keys = [self.backend.event_key(i) for i in range(self.last_id + 1, seq + 1)]
+        values = await cache.aget_many(keys)
+        for event_id, key in enumerate(keys, self.last_id + 1):
+            if key not in values:
+                # 序号已递增但事件还没写入, 稍后再读; 等待过久说明已过期或丢失
+                if self.missing_since is None:
+                    self.missing_since = time.monotonic()
+                if time.monotonic() - self.missing_since < self.backend.missing_timeout:
+                    return
+                self.overflowed = True
+            else:
+                channel, data = values[key]
+                if channel in self.channels:
+                    self.pending.append(Event(event_id, channel, data))
+            self.missing_since = None
+            self.last_id = event_id
+
+    def close(self) -> None:
+        pass
+
+
+class CacheBackend:
+    """
+    通过共享 cache 跨进程分发的后端
+    :param alias: CACHES 中的名称
+    :param poll_interval: 轮询间隔(秒)
+    :param ttl: 事件在 cache 中保留的秒数, 应远大于 poll_interval
+    """
+    SEQ_KEY = 'events:seq'
+
+    def __init__(self, alias: str = 'default', poll_interval: float = 1.0, ttl: int = 60):
+        self.cache = caches[alias]
+        self.poll_interval = poll_interval
+        self.ttl = ttl
+        self.missing_timeout = max(poll_interval * 5, 1.0)
+
+    @staticmethod
+    def event_key(event_id: int) -> str:
+        return f'events:{event_id}'
+
+    def publish(self, channel: str, data: dict[str, Any]) -> Event:
+        self.cache.add(self.SEQ_KEY, 0, None)
+        event_id = self.cache.incr(self.SEQ_KEY)
+        self.cache.set(self.event_key(event_id), (channel, data), self.ttl)
+        return Event(event_id, channel, data)
+
+    def subscribe(self, channels: Iterable[str]) -> CacheSubscription:
+        return CacheSubscription(self, channels)
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            backend_class = import_string(
+                getattr(settings, 'EVENTS_BACKEND', 'utils.events.LocalBackend'))
+            _backend = backend_class(**getattr(settings, 'EVENTS_OPTIONS', {}))
+        return _backend
+
+
+def reset_backend() -> None:
+    """设置变化后重新创建后端, 供测试使用"""
+    global _backend
+    with _backend_lock:
+        _backend = None
+
+
+def publish(channel: str, data: dict[str, Any]) -> None:
+    """
+    发布事件, 在事务中调用时等到提交后才发布, 回滚则不发布
+    :param data: 可以 JSON 序列化的简短通知, 如 {'type': 'feeding', 'action': 'created', 'id': 1}
+    """
+    transaction.on_commit(lambda: get_backend().publish(channel, data))
+
+
+def format_sse(data: Any = None, event: str | None = None, id: int | None = None, comment: str | None = None) -> bytes:
+    lines = []
+    if comment is not None:
+        lines.append(f': {comment}')
+    if id is not None:
+        lines.append(f'id: {id}')
+    if event is not None:
+        lines.append(f'event: {event}')
+    if data is not None:
+        lines.append(f'data: {json.dumps(data, ensure_ascii=False, separators=(",", ":"))}')
+    return ('\n'.join(lines) + '\n\n').encode()
+
+
+async def iter_sse(
+        subscription,
+        keepalive: float | None = None,
+        on_event=None,
+    ) -> AsyncIterator[bytes]:
+    """
+    把订阅转换为 SSE 流, 连接断开时取消订阅
+    :param keepalive: 没有事件时发送注释行的间隔, 防止代理断开空闲连接
+    :param on_event: 每个事件发送前调用的异步函数, 如更新订阅的频道
+    """
+    if keepalive is None:
+        keepalive = getattr(settings, 'EVENTS_KEEPALIVE_SECONDS', 15)
+    try:
+        yield format_sse(comment='connected')
+        while True:
+            event = await subscription.get(keepalive)
+            if subscription.overflowed:
+                subscription.overflowed = False
+                yield format_sse({'type': 'reset'}, event='reset')
+            if event is None:
+                yield format_sse(comment='ping')
+                continue
+            if on_event is not None:
+                await on_event(event)
+            yield format_sse(event.data, event='change', id=event.id)
+    finally:
+        subscription.close()
@@ -0,0 +1,156 @@
+"""
+基于游标(keyset)的分页
+
+按 (时间字段, id) 倒序分页, 翻页时用上一页边界记录的 (时间, id) 作为条件,
+不需要 COUNT(*) 也没有 OFFSET, 任意深度的页面与第一页的代价相同。
+游标对客户端是不透明的 base64 字符串。
+"""
+import base64
+import binascii
+import json
+from typing import Any
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q, QuerySet
+
+
+class KeysetPage:
+    """与 django.core.paginator.Page 类似, 供模板中的 page_obj 使用"""
+    is_keyset = True
+
+    def __init__(
+            self,
+            object_list: list,
+            has_next: bool,
+            has_previous: bool,
+            next_cursor: str | None,
+            previous_cursor: str | None,
+            approximate_total: str | None = None,
+        ):
+        self.object_list = object_list
+        self._has_next = has_next
+        self._has_previous = has_previous
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.approximate_total = approximate_total
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self._has_next or self._has_previous
+
+
+class KeysetPaginator:
+    """
+    :param queryset: 待分页的查询集, 原有的排序会被 (-field, -pk) 替换
+    :param field: 排序的时间字段名
+    :param per_page: 每页条数
+    :param total_cap: 估算总数时最多数到的条数, None 表示不估算总数
+    """
+    NEXT = 'n'
+    PREVIOUS = 'p'
+
+    def __init__(self, queryset: QuerySet, field: str, per_page: int, total_cap: int | None = None):
+        self.queryset = queryset
+        self.field = field
+        self.per_page = per_page
+        self.total_cap = total_cap
+
+    def encode_cursor(self, direction: str, obj) -> str:
+        value = getattr(obj, self.field)
+        if hasattr(value, 'isoformat'):
+            # DjangoJSONEncoder 会把时间截断到毫秒, 边界记录就会被跳过或重复
+            value = value.isoformat()
+        raw = json.dumps([direction, value, obj.pk])
+        return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+    def decode_cursor(self, cursor: str | None) -> tuple[str, Any, Any] | None:
+        """无法解析的游标视为第一页"""
+        if not cursor:
+            return None
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+            direction, value, pk = json.loads(raw)
+            model_field = self.queryset.model._meta.get_field(self.field)
+            value = model_field.to_python(value)
+            pk = self.queryset.model._meta.pk.to_python(pk)
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            return None
+        if direction not in (self.NEXT, self.PREVIOUS) or value is None:
+            return None
+        return direction, value, pk
+
+    def get_page_queryset(self, cursor: str | None) -> tuple[QuerySet, str | None]:
+        """
+        获取某个游标对应页面的查询集, 多取一条用于判断是否还有下一页
+        :return: (查询集, 方向) 第一页的方向为 None
+        """
+        decoded = self.decode_cursor(cursor)
+        field = self.field
+        if decoded is None:
+            queryset = self.queryset.order_by(f'-{field}', '-pk')
+            return queryset[:self.per_page + 1], None
+        direction, value, pk = decoded
+        if direction == self.NEXT:
+            # field <= value 让数据库可以在 (baby_date, field) 索引上直接定位
+            queryset = self.queryset.filter(
+                Q(**{f'{field}__lt': value}) | Q(pk__lt=pk),
+                **{f'{field}__lte': value},
+            ).order_by(f'-{field}', '-pk')
+        else:
+            queryset = self.queryset.filter(
+                Q(**{f'{field}__gt': value}) | Q(pk__gt=pk),
+                **{f'{field}__gte': value},
+            ).order_by(field, 'pk')
+        return queryset[:self.per_page + 1], direction
+
+    def get_approximate_total(self) -> str | None:
+        if self.total_cap is None:
+            return None
+        count = self.queryset.order_by()[:self.total_cap].count()
+        return f'{count}+' if count >= self.total_cap else str(count)
+
+    def get_page(self, cursor: str | None) -> KeysetPage:
+        queryset, direction = self.get_page_queryset(cursor)
+        object_list = list(queryset)
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[:self.per_page]
+        if direction == self.PREVIOUS:
+            object_list.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, direction is not None
+        return KeysetPage(
+            object_list,
+            has_next=has_next,
+            has_previous=has_previous,
+            next_cursor=self.encode_cursor(self.NEXT, object_list[-1]) if has_next and object_list else None,
+            previous_cursor=self.encode_cursor(self.PREVIOUS, object_list[0]) if has_previous and object_list else None,
+            approximate_total=self.get_approximate_total(),
+        )
+
+
+class KeysetPaginationMixin:
+    """
+    让 ListView 使用游标分页, 视图需设置 keyset_field 和 paginate_by
+    模板 dashboard/includes/pagination.html 会根据 page_obj.is_keyset 渲染翻页链接
+    """
+    keyset_field: str
+    keyset_total_cap: int | None = 1000
+    cursor_kwarg = 'cursor'
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(
+            queryset, self.keyset_field, page_size, self.keyset_total_cap)
+        page = paginator.get_page(self.request.GET.get(self.cursor_kwarg))  # type: ignore
+        return paginator, page, page.object_list, page.has_other_pages()
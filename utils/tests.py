@@ -0,0 +1,82 @@
+from asgiref.sync import sync_to_async
+from django.db import connection
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from babycare.models import BabyDate, BabyRelation
+from iuser.models import User
+from utils.events import CacheBackend, LocalBackend, baby_channel
+from utils.metrics import REGISTRY
+
+
+class EventBackendTestCase(TestCase):
+    async def test_backends(self):
+        for backend in (LocalBackend(), CacheBackend(poll_interval=0.01)):
+            subscription = backend.subscribe([baby_channel(1)])
+            # 发布可能来自其他线程
+            await sync_to_async(backend.publish, thread_sensitive=False)(
+                baby_channel(2), {'id': 1})
+            await sync_to_async(backend.publish, thread_sensitive=False)(
+                baby_channel(1), {'id': 2})
+            event = await subscription.get(1)
+            self.assertEqual(event.data, {'id': 2})
+            self.assertIsNone(await subscription.get(0.05))
+            subscription.close()
+
+
+class MetricsTestCase(TestCase):
+    def setUp(self):
+        REGISTRY.reset()
+        self.user = User.objects.create_user('metrics')
+        self.baby = BabyDate.objects.create(
+            nickname='metrics', last_menstrual_period=timezone.now().date() - timezone.timedelta(days=300))
+        BabyRelation.objects.create(baby_date=self.baby, request_by=self.user, status=2)
+        self.client.force_login(self.user)
+
+    def test_records_view_metrics(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('babycare:index'))
+        metrics = REGISTRY.views['babycare:index']
+        self.assertEqual(metrics.duration.count, 1)
+        self.assertEqual(metrics.queries.sum, len(queries))
+        self.assertEqual(metrics.size.sum, len(response.content))
+        self.assertEqual(metrics.statuses, {'2xx': 1})
+
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        with self.settings(METRICS_ENDPOINT_ENABLED=True):
+            text = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('django_requests_total{view="babycare:index",status="2xx"} 1', text)
+        self.assertIn('django_request_sql_queries_bucket{view="babycare:index",le="+Inf"} 1', text)
+
+    async def test_async_view_metrics(self):
+        # 异步视图的查询在 sync_to_async 的线程中执行
+        await self.async_client.aforce_login(self.user)
+        response = await self.async_client.get(reverse('babycare:async_index'))
+        self.assertEqual(response.status_code, 200)
+        metrics = REGISTRY.views['babycare:async_index']
+        self.assertEqual(metrics.queries.count, 1)
+        self.assertGreater(metrics.queries.sum, 0)
+        self.assertGreater(metrics.sql_duration.sum, 0)
+
+    def test_endpoint_access(self):
+        url = reverse('metrics')
+        # 本机反向代理之后 REMOTE_ADDR 总是 127.0.0.1, 不能作为放行条件
+        with self.settings(METRICS_ENDPOINT_ENABLED=True, METRICS_BEARER_TOKEN='secret'):
+            self.assertEqual(self.client.get(url, REMOTE_ADDR='127.0.0.1').status_code, 404)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer wrong').status_code, 404)
+            self.assertEqual(self.client.get(url, HTTP_AUTHORIZATION='Bearer secret').status_code, 200)
+        # 默认关闭
+        self.client.force_login(User.objects.create_user('staff', is_staff=True))
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+    def test_slow_request_logged(self):
+        with self.settings(METRICS_SLOW_REQUEST_QUERIES=0):
+            # 设置在中间件初始化时读取, 需要重新加载中间件
+            self.client.handler.load_middleware()
+            with self.assertLogs('utils.metrics', 'WARNING') as logs:
+                self.client.get(reverse('babycare:index'))
+        self.client.handler.load_middleware()
+        self.assertIn('babycare:index', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])